@@ -0,0 +1,62 @@
+"""Boot Django against a throwaway SQLite database for benchmarks."""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "e_commerce.settings")
+
+
+def setup(db_path=None):
+    """Point the default database at a fresh file (never db.sqlite3) and migrate it."""
+    import django
+    from django.conf import settings
+
+    path = db_path or os.path.join(tempfile.mkdtemp(prefix="shop-bench-"), "bench.sqlite3")
+    settings.DATABASES["default"]["NAME"] = path
+    settings.ALLOWED_HOSTS = ["*"]
+    django.setup()
+
+    from django.core.management import call_command
+    call_command("migrate", verbosity=0)
+    return path
+
+
+def seed_catalog(n, categories=20, brands=50, batch_size=5000):
+    from shop.models import Category, Product
+
+    Category.objects.bulk_create([Category(name=f"Category {i}") for i in range(categories)], ignore_conflicts=True)
+    cats = list(Category.objects.all())
+    rng = random.Random(42)
+    batch = []
+    for i in range(n):
+        batch.append(Product(
+            name=f"Product {i} {rng.choice(['phone', 'laptop', 'watch', 'tablet'])}",
+            brand=f"Brand {rng.randrange(brands)}",
+            category=rng.choice(cats),
+            description=f"Generated product number {i}",
+            price=Decimal(rng.randrange(500, 90000)),
+            stock=rng.randrange(0, 50),
+            rating=Decimal(rng.randrange(10, 50)) / 10,
+        ))
+        if len(batch) >= batch_size:
+            Product.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        Product.objects.bulk_create(batch)
+
+
+def timeit(fn, repeat=50):
+    """Run ``fn`` ``repeat`` times; return (median ms, p95 ms)."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
@@ -0,0 +1,136 @@
+"""
+Catalog reads: native async views under ASGI vs the sync views under WSGI.
+
+Both servers are uvicorn (pip install uvicorn) in a child process on the
+same seeded database; the WSGI run uses uvicorn's WSGI interface and its
+thread pool. An asyncio client holds N keep-alive connections open and
+reports requests/sec and latency percentiles for each concurrency level.
+
+    python benchmarks/bench_async_catalog.py --connections 100 250 500 1000 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+import _django
+
+# (uvicorn interface, application, URL prefix of the views under test)
+SERVERS = {
+    "asgi": ("asgi3", "e_commerce.asgi:application", "/api/shop/async"),
+    "wsgi": ("wsgi", "e_commerce.wsgi:application", "/api/shop"),
+}
+PATHS = ["/products/?page_size=20", "/products/{pk}/", "/categories/"]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def serve(mode, db_path, port):
+    """Child process: boot Django on the seeded database and run uvicorn."""
+    _django.setup(db_path)
+    import uvicorn
+
+    interface, app, _ = SERVERS[mode]
+    uvicorn.run(app, host="127.0.0.1", port=port, interface=interface, log_level="error", backlog=4096)
+
+
+async def client(host, port, paths, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    i = 0
+    try:
+        while time.perf_counter() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            start = time.perf_counter()
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            if not head.startswith(b"HTTP/1.1 200"):
+                errors.append(head.split(b"\r\n", 1)[0])
+            latencies.append((time.perf_counter() - start) * 1000)
+    except (ConnectionError, asyncio.IncompleteReadError) as exc:
+        errors.append(repr(exc))
+    finally:
+        writer.close()
+
+
+async def load(port, paths, connections, duration):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        client("127.0.0.1", port, paths[i % len(paths):] + paths[:i % len(paths)], deadline, latencies, errors)
+        for i in range(connections)
+    ])
+    return latencies, errors, time.perf_counter() - start
+
+
+def run_server(mode, db_path):
+    port = free_port()
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", mode, "--db", db_path, "--port", str(port)])
+    prefix = SERVERS[mode][2]
+    for _ in range(200):
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}{prefix}/categories/").read()
+            return proc, port, prefix
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError(f"{mode} server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--connections", type=int, nargs="+", default=[100, 250, 500, 1000])
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--serve", choices=SERVERS, help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        return serve(args.serve, args.db, args.port)
+
+    db_path = _django.setup()
+    _django.seed_catalog(args.products)
+    from shop.models import Product
+    pk = Product.objects.order_by("id").values_list("pk", flat=True).first()
+
+    print(f"{'server':>6} {'conns':>6} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for mode in SERVERS:
+        proc, port, prefix = run_server(mode, db_path)
+        paths = [prefix + p.format(pk=pk) for p in PATHS]
+        try:
+            for connections in args.connections:
+                latencies, errors, elapsed = asyncio.run(load(port, paths, connections, args.duration))
+                if not latencies:
+                    print(f"{mode:>6} {connections:>6} {'-':>9} {'-':>8} {'-':>8} {len(errors):>7}")
+                    continue
+                print(f"{mode:>6} {connections:>6} {len(latencies) / elapsed:>9.0f} "
+                      f"{statistics.median(latencies):>8.2f} {percentile(latencies, 99):>8.2f} {len(errors):>7}")
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
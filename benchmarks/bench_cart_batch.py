@@ -0,0 +1,58 @@
+"""
+N per-item add_to_cart calls vs one /cart/batch/ call.
+
+    python benchmarks/bench_cart_batch.py --items 5 20 50
+"""
+import argparse
+import time
+
+import _django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, nargs="+", default=[5, 20, 50])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    _django.setup()
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIClient
+
+    from shop.models import CartItem, Product
+
+    _django.seed_catalog(max(args.items))
+    user = get_user_model().objects.create_user("bench", password="bench")
+    client = APIClient()
+    client.force_authenticate(user)
+    ids = list(Product.objects.values_list("pk", flat=True))
+
+    def per_item(n):
+        for pk in ids[:n]:
+            client.post(f"/api/shop/cart/add/{pk}/", {"quantity": 1}, format="json")
+
+    def batch(n):
+        ops = [{"op": "add", "product_id": pk, "quantity": 1} for pk in ids[:n]]
+        client.post("/api/shop/cart/batch/", {"operations": ops}, format="json")
+
+    print(f"{'items':>6} {'per-item ms':>12} {'queries':>8} {'batch ms':>10} {'queries':>8} {'speedup':>8}")
+    for n in args.items:
+        row = []
+        for fn in (per_item, batch):
+            elapsed, queries = [], 0
+            for _ in range(args.repeat):
+                CartItem.objects.all().delete()
+                with CaptureQueriesContext(connection) as ctx:
+                    start = time.perf_counter()
+                    fn(n)
+                    elapsed.append((time.perf_counter() - start) * 1000)
+                queries = len(ctx)
+            row.append((min(elapsed), queries))
+        (single_ms, single_q), (batch_ms, batch_q) = row
+        print(f"{n:>6} {single_ms:>12.1f} {single_q:>8} {batch_ms:>10.1f} {batch_q:>8} {single_ms / batch_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Pages/sec for the parallel crawl against saved result pages served locally.
+
+Serves scraping/fixtures/ for --queries x --pages search pages with
+--latency seconds per page (standing in for a browser's load/render
+time) and crawls them with 1..N plain-HTTP page workers. Each
+SeleniumWorker is one Chrome, so the scaling is the same there, only
+with a larger per-page latency.
+
+    python benchmarks/bench_crawl.py --queries 8 --pages 5 --latency 0.2
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import _django  # noqa: F401  (puts the repo root on sys.path)
+
+from scraping.crawl import HTTPWorker, crawl, search_url
+from scraping.standin import StandInServer
+
+FIXTURES = os.path.join(_django.BASE_DIR, "scraping", "fixtures")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    pages = []
+    for name in ("search_page_1.html", "search_page_2.html"):
+        with open(os.path.join(FIXTURES, name), "rb") as fh:
+            pages.append(fh.read())
+    queries = [f"phone {i}" for i in range(args.queries)]
+
+    with StandInServer(latency=args.latency) as server:
+        for query in queries:
+            for page in range(1, args.pages + 1):
+                server.add(search_url(query, page, "/s"), pages[page % 2], "text/html")
+
+        print(f"{'workers':>8} {'pages':>6} {'seconds':>8} {'pages/s':>8}")
+        for workers in (1, 2, 4, 8):
+            state_path = os.path.join(tempfile.mkdtemp(prefix="crawl-bench-"), "state.json")
+            start = time.perf_counter()
+            state = crawl(queries, args.pages, HTTPWorker, workers=workers, state_path=state_path,
+                          base_url=server.url("/s"), log=lambda message: None)
+            elapsed = time.perf_counter() - start
+            assert not state.errors, state.errors
+            print(f"{workers:>8} {len(state.pages):>6} {elapsed:>8.2f} {len(state.pages) / elapsed:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
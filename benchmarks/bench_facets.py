@@ -0,0 +1,42 @@
+"""
+Faceted product listing vs catalog size.
+
+    python benchmarks/bench_facets.py --sizes 1000 10000 100000
+"""
+import argparse
+
+import _django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    _django.setup()
+    from django.db import connection
+    from django.http import QueryDict
+
+    from shop.filters import apply_filters, build_filters, facet_counts
+    from shop.models import Product
+
+    params = QueryDict("brand=Brand 1&brand=Brand 2&min_price=10000&max_price=60000&in_stock=1")
+    seeded = 0
+    print(f"{'products':>10} {'page ms (med/p95)':>20} {'facets ms (med/p95)':>22}")
+    for size in sorted(args.sizes):
+        _django.seed_catalog(size - seeded)
+        seeded = size
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        base = Product.objects.filter(is_active=True)
+        groups = build_filters(params)
+        page = _django.timeit(
+            lambda: list(apply_filters(base, groups).select_related("category").order_by("-created_at", "-id")[:21])
+        )
+        facets = _django.timeit(lambda: facet_counts(base, groups))
+        print(f"{size:>10} {page[0]:>9.2f} / {page[1]:<8.2f} {facets[0]:>10.2f} / {facets[1]:<8.2f}")
+
+
+if __name__ == "__main__":
+    main()
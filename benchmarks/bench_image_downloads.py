@@ -0,0 +1,78 @@
+"""
+Images/sec for the scraper's download stage against a local stand-in CDN.
+
+Compares the old one-at-a-time ``requests.get`` per image (without its
+1-2s politeness sleep) with ``ImageDownloader``'s pooled keep-alive
+session at a few worker counts, then an incremental re-run that only
+sends conditional requests. --latency simulates the CDN round trip.
+
+    python benchmarks/bench_image_downloads.py --images 200 --latency 0.05
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import _django  # noqa: F401  (puts the repo root on sys.path)
+import requests
+
+from scraping.downloader import HEADERS, ImageDownloader
+from scraping.standin import StandInServer
+
+
+def sequential(items, dest):
+    start = time.perf_counter()
+    for url, filename in items:
+        response = requests.get(url, headers=HEADERS, timeout=10, stream=True)
+        response.raise_for_status()
+        with open(os.path.join(dest, filename), "wb") as fh:
+            for chunk in response.iter_content(chunk_size=8192):
+                fh.write(chunk)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--size", type=int, default=40 * 1024, help="bytes per image")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--per-host", type=int, default=8)
+    args = parser.parse_args()
+
+    body = os.urandom(args.size)
+    with StandInServer({f"/images/{i}.jpg": body for i in range(args.images)}, latency=args.latency) as server:
+        items = [(server.url(f"/images/{i}.jpg"), f"mobile_{i}.jpg") for i in range(args.images)]
+        print(f"{'run':>22} {'images':>7} {'seconds':>8} {'images/s':>9} {'conns':>6}")
+
+        dest = tempfile.mkdtemp(prefix="scrape-bench-")
+        seconds = sequential(items, dest)
+        shutil.rmtree(dest)
+        print(f"{'sequential':>22} {args.images:>7} {seconds:>8.2f} {args.images / seconds:>9.1f} {len(server.connections):>6}")
+
+        for workers in (4, 16, 32):
+            server.connections.clear()
+            dest = tempfile.mkdtemp(prefix="scrape-bench-")
+            downloader = ImageDownloader(dest, workers=workers, per_host=min(workers, args.per_host))
+            stats = downloader.download_all(items)
+            downloader.close()
+            shutil.rmtree(dest)
+            assert stats.failed == 0, stats.summary()
+            label = f"pooled x{workers} (host {min(workers, args.per_host)})"
+            print(f"{label:>22} {stats.ok:>7} {stats.seconds:>8.2f} {stats.images_per_second:>9.1f} {len(server.connections):>6}")
+
+        dest = tempfile.mkdtemp(prefix="scrape-bench-")
+        downloader = ImageDownloader(dest, workers=16, per_host=args.per_host, hash_names=True)
+        first = downloader.download_all(items)
+        server.connections.clear()
+        previous = [{"name": r.name, "etag": r.etag, "last_modified": r.last_modified} for r in first.results]
+        stats = downloader.download_all((url, name, prev) for (url, name), prev in zip(items, previous))
+        downloader.close()
+        shutil.rmtree(dest)
+        assert stats.not_modified == args.images, stats.summary()
+        print(f"{'re-check x16 (304)':>22} {stats.ok:>7} {stats.seconds:>8.2f} {stats.images_per_second:>9.1f} "
+              f"{len(server.connections):>6}  {stats.bytes} bytes vs {first.bytes}")
+
+
+if __name__ == "__main__":
+    main()
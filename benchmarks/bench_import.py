@@ -0,0 +1,90 @@
+"""
+Rows/sec for the streaming product import vs ProductResource's row-by-row import.
+
+Writes a synthetic supplier feed in ProductResource's columns, imports it
+with shop.importing (fresh, then again as a pure update), feeds the same
+rows as dicts to ingest_products (the scraper's path), and imports the
+first --resource-rows rows through ProductResource.import_data for contrast.
+
+    python benchmarks/bench_import.py --rows 100000 --resource-rows 2000
+"""
+import argparse
+import csv
+import io
+import os
+import random
+import resource
+import tempfile
+import time
+
+import _django
+
+COLUMNS = ["id", "name", "brand", "category__name", "description", "price", "stock", "image", "rating", "is_active"]
+
+
+def write_feed(path, rows, categories, images):
+    rng = random.Random(7)
+    with open(path, "w", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(COLUMNS)
+        for i in range(rows):
+            writer.writerow([
+                "", f"Feed product {i}", f"Brand {rng.randrange(200)}", rng.choice(categories),
+                f"Supplier description for item {i}", rng.randrange(500, 90000), rng.randrange(0, 100),
+                rng.choice(images) if i % 3 else "", rng.randrange(10, 50) / 10, 1,
+            ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    parser.add_argument("--resource-rows", type=int, default=2000)
+    args = parser.parse_args()
+
+    _django.setup()
+    from django.conf import settings
+    from tablib import Dataset
+
+    from shop.admin import ProductResource
+    from shop.importing import import_products, ingest_products
+    from shop.models import Category, Product
+
+    workdir = tempfile.mkdtemp(prefix="shop-import-")
+    settings.MEDIA_ROOT = workdir
+    os.makedirs(os.path.join(workdir, "products"))
+    images = [f"media/products/img_{i}.jpg" for i in range(500)]
+    for name in images:
+        open(os.path.join(workdir, "products", os.path.basename(name)), "wb").close()
+    categories = [f"Category {i}" for i in range(20)]
+    Category.objects.bulk_create([Category(name=name) for name in categories])
+
+    feed = os.path.join(workdir, "feed.csv")
+    write_feed(feed, args.rows, categories, images)
+
+    print(f"{'run':>24} {'rows':>8} {'seconds':>8} {'rows/s':>9}")
+    for label in ("streaming (insert)", "streaming (update)"):
+        with open(feed, newline="") as fh:
+            result = import_products(fh, args.chunk_size)
+        print(f"{label:>24} {result.rows:>8} {result.seconds:>8.2f} {result.rows_per_second:>9.0f}")
+    assert Product.objects.count() == args.rows
+
+    # The scraper's path: dicts straight into ingest_products, no CSV parsing on our side.
+    Product.objects.all().delete()
+    with open(feed, newline="") as fh:
+        result = ingest_products(csv.DictReader(fh))
+    print(f"{'ingest (dicts)':>24} {result.rows:>8} {result.seconds:>8.2f} {result.rows_per_second:>9.0f}")
+
+    with open(feed, newline="") as fh:
+        head = "".join(line for _, line in zip(range(args.resource_rows + 1), fh))
+    Product.objects.all().delete()
+    dataset = Dataset().load(io.StringIO(head), format="csv")
+    start = time.perf_counter()
+    ProductResource().import_data(dataset, dry_run=False, raise_errors=True)
+    elapsed = time.perf_counter() - start
+    print(f"{'ProductResource':>24} {len(dataset):>8} {elapsed:>8.2f} {len(dataset) / elapsed:>9.0f}")
+    print(f"peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Catalog read latency under ASGI while a login storm is running.
+
+Serves e_commerce.asgi in-process with uvicorn (pip install uvicorn), then
+measures GET /api/shop/products/ latency alone and during concurrent logins.
+``--inline`` hashes on the event loop instead of the process pool, for contrast.
+
+    python benchmarks/bench_login_storm.py --logins 200 --login-concurrency 32
+"""
+import argparse
+import json
+import socket
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import _django
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--login-concurrency", type=int, default=32)
+    parser.add_argument("--reads", type=int, default=200)
+    parser.add_argument("--inline", action="store_true", help="Hash on the event loop (old behaviour).")
+    args = parser.parse_args()
+
+    _django.setup()
+    import uvicorn
+    from django.contrib.auth import get_user_model
+
+    from e_commerce.asgi import application
+    from shop.hashing import hashing_pool
+
+    _django.seed_catalog(50)
+    get_user_model().objects.create_user("storm", password="storm-password-1")
+
+    if args.inline:
+        async def inline(func, *a):
+            return func(*a)
+        hashing_pool.run = inline
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(application, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    base = f"http://127.0.0.1:{port}/api/shop"
+
+    def read():
+        start = time.perf_counter()
+        urllib.request.urlopen(f"{base}/products/").read()
+        return (time.perf_counter() - start) * 1000
+
+    def login(_):
+        body = json.dumps({"username": "storm", "password": "storm-password-1"}).encode()
+        req = urllib.request.Request(f"{base}/auth/login/", body, {"Content-Type": "application/json"})
+        try:
+            return urllib.request.urlopen(req).status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    read()
+    calm = [read() for _ in range(args.reads)]
+
+    statuses = []
+    with ThreadPoolExecutor(args.login_concurrency) as storm:
+        futures = [storm.submit(login, i) for i in range(args.logins)]
+        time.sleep(0.2)
+        busy = [read() for _ in range(args.reads)]
+        statuses = [f.result() for f in futures]
+
+    server.should_exit = True
+    mode = "inline" if args.inline else f"pool({hashing_pool.workers})"
+    print(f"hashing: {mode}")
+    print(f"{'':>14} {'p50 ms':>8} {'p99 ms':>8}")
+    print(f"{'no logins':>14} {statistics.median(calm):>8.2f} {percentile(calm, 99):>8.2f}")
+    print(f"{'login storm':>14} {statistics.median(busy):>8.2f} {percentile(busy, 99):>8.2f}")
+    print(f"logins: {statuses.count(200)} ok, {statuses.count(503)} shed, stats={hashing_pool.stats()}")
+
+
+if __name__ == "__main__":
+    main()
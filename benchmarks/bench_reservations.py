@@ -0,0 +1,74 @@
+"""
+Add-to-cart contention on one hot product: TTL holds vs decrementing Product.stock.
+
+    python benchmarks/bench_reservations.py --threads 1 4 16 --ops 200
+"""
+import argparse
+import threading
+import time
+
+import _django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--ops", type=int, default=200, help="Add-to-cart calls per thread.")
+    args = parser.parse_args()
+
+    _django.setup()
+    from django.contrib.auth import get_user_model
+    from django.db import connection, transaction
+    from django.db.models import F
+
+    from shop import reservations
+    from shop.exceptions import OutOfStock
+    from shop.models import Cart, Product, StockHold
+
+    _django.seed_catalog(1, categories=1)
+    product = Product.objects.get()
+    User = get_user_model()
+
+    def hold(cart, i):
+        reservations.reserve(cart, {product.pk: 1})
+
+    def hot_row(cart, i):
+        with transaction.atomic():
+            Product.objects.filter(pk=product.pk, stock__gte=1).update(stock=F("stock") - 1)
+
+    print(f"{'threads':>8} {'holds ops/s':>12} {'hot-row ops/s':>14} {'held':>6} {'stock left':>10}")
+    for n in args.threads:
+        carts = [Cart.objects.create(user=User.objects.create(username=f"bench-{n}-{i}")) for i in range(n * args.ops)]
+        row = []
+        for strategy in (hold, hot_row):
+            StockHold.objects.all().delete()
+            stock = n * args.ops // 2
+            Product.objects.filter(pk=product.pk).update(stock=stock)
+            barrier = threading.Barrier(n)
+
+            def worker(offset):
+                barrier.wait()
+                for i in range(args.ops):
+                    try:
+                        strategy(carts[offset * args.ops + i], i)
+                    except OutOfStock:
+                        pass
+                connection.close()
+
+            threads = [threading.Thread(target=worker, args=(t,)) for t in range(n)]
+            start = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            row.append(n * args.ops / (time.perf_counter() - start))
+            if strategy is hold:
+                held = StockHold.objects.count()
+
+        # Both strategies must stop exactly at the available stock (n * ops / 2).
+        remaining = Product.objects.get(pk=product.pk).stock
+        print(f"{n:>8} {row[0]:>12.0f} {row[1]:>14.0f} {held:>6} {remaining:>10}")
+
+
+if __name__ == "__main__":
+    main()
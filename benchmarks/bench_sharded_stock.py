@@ -0,0 +1,58 @@
+"""
+Checkout throughput on one SKU: single stock row vs K shard counters.
+
+    python benchmarks/bench_sharded_stock.py --threads 1 4 16 --shards 8
+"""
+import argparse
+import threading
+import time
+
+import _django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--ops", type=int, default=200, help="Decrements per thread.")
+    parser.add_argument("--shards", type=int, default=8)
+    args = parser.parse_args()
+
+    _django.setup()
+    from django.db import connection, transaction
+
+    from shop import inventory
+    from shop.checkout import decrement_stock
+    from shop.models import Product, StockShard
+
+    _django.seed_catalog(1, categories=1)
+    product = Product.objects.get()
+
+    print(f"{'threads':>8} {'single-row ops/s':>17} {f'{args.shards} shards ops/s':>17} {'left (single/sharded)':>22}")
+    for n in args.threads:
+        row, left = [], []
+        for shards in (0, args.shards):
+            Product.objects.filter(pk=product.pk).update(stock=n * args.ops, stock_shards=0)
+            StockShard.objects.all().delete()
+            inventory.set_sharding(product, shards)
+            barrier = threading.Barrier(n)
+
+            def worker():
+                barrier.wait()
+                for _ in range(args.ops):
+                    with transaction.atomic():
+                        decrement_stock({product.pk: 1})
+                connection.close()
+
+            threads = [threading.Thread(target=worker) for _ in range(n)]
+            start = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            row.append(n * args.ops / (time.perf_counter() - start))
+            left.append(inventory.stock_levels([product.pk])[product.pk])
+        print(f"{n:>8} {row[0]:>17.0f} {row[1]:>17.0f} {left[0]:>10} / {left[1]:<10}")
+
+
+if __name__ == "__main__":
+    main()
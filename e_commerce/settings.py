@@ -73,10 +73,67 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock when atomic() starts so concurrent checkouts queue
+            # on the busy timeout instead of failing to upgrade a read lock.
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # File-backed so threaded tests (checkout contention) share one database.
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# "catalog" holds serialized product/category responses; LocMemCache evicts LRU once MAX_ENTRIES is reached.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalog': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'catalog',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 2000,
+            'CULL_FREQUENCY': 4,
+        },
+    },
+    # The catalog version that keys every 'catalog' entry. Imports, management commands and
+    # job workers bump it from other processes, so it lives where they all can see it.
+    'catalog_version': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CATALOG_VERSION_CACHE_DIR', str(BASE_DIR / '.cache' / 'catalog-version')),
+        'TIMEOUT': None,
+    },
+    # Users resolved from JWTs (shop.authentication), per process; only used while the
+    # shared 'auth_version' entry still matches the token.
+    'auth': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'auth',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+    # Each user's current token version, written when the user is saved or deleted in any
+    # process (admin, another worker), so every process stops accepting revoked tokens at once.
+    'auth_version': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('AUTH_VERSION_CACHE_DIR', str(BASE_DIR / '.cache' / 'auth-version')),
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -95,6 +152,11 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing for login/signup runs in this many processes (shop.hashing);
+# requests beyond AUTH_HASHING_MAX_QUEUE waiting hashes get a 503.
+AUTH_HASHING_WORKERS = 2
+AUTH_HASHING_MAX_QUEUE = 64
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -115,6 +177,17 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Uploaded media is stored under content-hashed names (shop/storage.py)
+STORAGES = {
+    'default': {'BACKEND': 'shop.storage.HashedMediaStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+# Responsive product image derivatives (shop/images.py)
+PRODUCT_IMAGE_WIDTHS = (160, 320, 640, 1024)
+PRODUCT_IMAGE_FORMAT = 'WEBP'  # or 'AVIF'; falls back to JPEG if Pillow can't encode it
+PRODUCT_IMAGE_WORKERS = 2
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -125,6 +198,10 @@ CORS_ALLOW_ALL_ORIGINS = True
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'shop.authentication.CachedJWTAuthentication',
     ),
+}
+
+SIMPLE_JWT = {
+    'TOKEN_OBTAIN_SERIALIZER': 'shop.authentication.VersionedTokenObtainPairSerializer',
 }
\ No newline at end of file
@@ -15,6 +15,12 @@ export const addToCart = async (productId, quantity = 1) => {
   return res.data;
 };
 
+// ✅ Apply several changes at once: [{ op: "set" | "add" | "remove", product_id, quantity }]
+export const batchUpdateCart = async (operations) => {
+  const res = await axiosInstance.post("/cart/batch/", { operations });
+  return res.data;
+};
+
 // ✅ Remove item from cart
 export const removeFromCart = async (itemId) => {
   const res = await axiosInstance.delete(`/cart/remove/${itemId}/`);
@@ -1,7 +1,7 @@
 // src/api/orders.js
 import axiosInstance from "./axios";
 
-// ✅ Create a new order (from current cart)
+// ✅ Create a new order (from current cart) → 202 { id, order_status, total_amount }
 export const createOrder = async (shipping_address, payment_method = "COD") => {
   const res = await axiosInstance.post("/orders/create/", {
     shipping_address,
@@ -15,3 +15,11 @@ export const getOrderDetail = async (orderId) => {
   const res = await axiosInstance.get(`/orders/${orderId}/`);
   return res.data;
 };
+
+// ✅ Get a page of the user's orders (newest first) → { next, cursor, results }
+export const getOrders = async (cursor = null, pageSize = 10) => {
+  const params = { page_size: pageSize };
+  if (cursor) params.cursor = cursor;
+  const res = await axiosInstance.get("/orders/", { params });
+  return res.data;
+};
@@ -7,6 +7,14 @@ export const getProducts = async () => {
   return res.data;
 };
 
+// ✅ GET /products/?page_size=&cursor= → one keyset page { next, cursor, results }
+export const getProductsPage = async (cursor = null, pageSize = 20) => {
+  const params = { page_size: pageSize };
+  if (cursor) params.cursor = cursor;
+  const res = await axiosInstance.get("/products/", { params });
+  return res.data;
+};
+
 // ✅ GET /products/:id/ → get single product details
 export const getProductDetail = async (id) => {
   const res = await axiosInstance.get(`/products/${id}/`);
@@ -18,3 +26,11 @@ export const getCategories = async () => {
   const res = await axiosInstance.get("/categories/");
   return res.data;
 };
+
+// ✅ GET /products/search/?q= → ranked full-text search { next, results }
+export const searchProducts = async (q, page = 1, pageSize = 20) => {
+  const res = await axiosInstance.get("/products/search/", {
+    params: { q, page, page_size: pageSize },
+  });
+  return res.data;
+};
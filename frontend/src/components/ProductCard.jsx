@@ -10,11 +10,19 @@ export default function ProductCard({ product, onAddToCart }) {
   // Map stock to boolean
   const inStock = product.stock > 0;
 
+  // Resized copies from the API, e.g. {"320w": url}; empty until they are built
+  const srcSet = Object.entries(product.srcset || {})
+    .map(([width, url]) => `${url} ${width}`)
+    .join(", ");
+
   return (
     <div className="bg-white rounded-lg shadow-md border border-gray-200 overflow-hidden hover:shadow-lg hover:scale-105 transition-all duration-200 group">
       <div className="relative aspect-square overflow-hidden">
         <img
           src={product.image}
+          srcSet={srcSet || undefined}
+          sizes="(min-width: 1024px) 25vw, (min-width: 640px) 50vw, 100vw"
+          loading="lazy"
           alt={product.name}
           className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-200"
         />
@@ -1,7 +1,6 @@
+import argparse
 import os
-import requests
 import pandas as pd
-import time
 import random
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
@@ -11,12 +10,26 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from webdriver_manager.chrome import ChromeDriverManager
-from urllib.parse import urlparse
 import urllib.request
 
-def setup_driver():
+from scraping.crawl import SEARCH_URL, CrawlState, HTTPWorker, crawl_pages
+from scraping.downloader import ImageDownloader
+from scraping import incremental
+
+# Either a result or the "no results" message means the page has rendered.
+RESULTS_READY = "[data-component-type='s-search-result'], .s-no-outline, .s-no-results"
+CONTAINER_SELECTORS = [
+    "[data-component-type='s-search-result']",
+    ".s-result-item",
+    "[data-asin]:not([data-asin=''])"
+]
+
+def setup_driver(headless=False):
     """Setup Chrome driver with better anti-detection"""
     chrome_options = Options()
+    if headless:
+        chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument("--window-size=1366,2000")
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
     chrome_options.add_argument("--disable-blink-features=AutomationControlled")
@@ -32,51 +45,27 @@ def setup_driver():
     
     return driver
 
-def download_image(url, filename):
-    """Download image from URL and save to media/products/"""
-    if not url or "data:image" in url:
+def download_images(products, manifest=None, workers=16, per_host=4, downloader=None):
+    """Download every product's image_url concurrently into media/products/ under content-hashed names"""
+    count = sum(1 for p in products if p.get('image_url'))
+    if not count:
         return None
-    
+
+    print(f"\nDownloading {count} images...")
+    own_downloader = downloader is None
+    if own_downloader:
+        downloader = ImageDownloader(workers=workers, per_host=per_host, hash_names=True)
     try:
-        # Create media/products directory if it doesn't exist
-        os.makedirs('media/products', exist_ok=True)
-        
-        # Full path for saving
-        filepath = os.path.join('media', 'products', filename)
-        
-        # Download image with better error handling
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Cache-Control': 'no-cache',
-            'Pragma': 'no-cache'
-        }
-        
-        # Use requests instead of urllib for better handling
-        response = requests.get(url, headers=headers, timeout=10, stream=True)
-        response.raise_for_status()
-        
-        # Check if it's actually an image
-        content_type = response.headers.get('content-type', '')
-        if 'image' not in content_type.lower():
-            print(f"❌ Not an image: {content_type}")
-            return None
-            
-        # Save the image
-        with open(filepath, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        
-        # Verify file was created and has content
-        if os.path.exists(filepath) and os.path.getsize(filepath) > 0:
-            return f"products/{filename}"
-        else:
-            return None
-        
-    except Exception as e:
-        print(f"❌ Failed to download {filename}: {e}")
-        return None
+        stats = incremental.download_images(products, downloader, manifest)
+    finally:
+        if own_downloader:
+            downloader.close()
+
+    for result in stats.results:
+        if not result.ok:
+            print(f"❌ Failed to download {result.url}: {result.error}")
+    print(f"🖼️ {stats.summary()}")
+    return stats
 
 def create_placeholder_image(filename, product_name):
     """Create a simple placeholder image if download fails"""
@@ -125,9 +114,9 @@ def create_placeholder_image(filename, product_name):
         print(f"❌ Failed to create placeholder: {e}")
         return False
 
-def get_product_data(container, product_index):
+def get_product_data(container):
     """Extract product data with multiple selector fallbacks"""
-    product_data = {}
+    product_data = {'asin': container.get_attribute("data-asin") or ""}
     
     # Product name - try multiple selectors
     name_selectors = [
@@ -195,7 +184,7 @@ def get_product_data(container, product_index):
     
     product_data['rating'] = rating
     
-    # Image URL and Download
+    # Image URL
     image_selectors = [
         "img",
         ".s-image",
@@ -212,89 +201,119 @@ def get_product_data(container, product_index):
         except:
             continue
     
-    # Download the image
-    if image_url:
-        # Get file extension from URL
-        parsed_url = urlparse(image_url)
-        ext = '.jpg'  # Default extension
-        if '.' in parsed_url.path:
-            ext = os.path.splitext(parsed_url.path)[1][:4]  # Limit extension length
-        
-        filename = f"mobile_{product_index}{ext}"
-        downloaded_path = download_image(image_url, filename)
-        product_data['image'] = downloaded_path or f"products/{filename}"
-    else:
-        product_data['image'] = f"products/mobile_{product_index}.jpg"
-    
+    # The image itself is fetched later by download_images()
+    if not image_url or "data:image" in image_url:
+        image_url = ""
     product_data['image_url'] = image_url
     
     return product_data
 
-def scrape_with_image_download():
-    """Scrape Amazon with image download"""
-    URL = "https://www.amazon.in/s?k=mobile+phone&ref=nb_sb_noss"
-    
-    driver = setup_driver()
-    products = []
-    
-    try:
-        print("Loading Amazon page...")
-        driver.get(URL)
-        time.sleep(5)  # Wait for page to load
-        
-        # Wait for products to load
-        wait = WebDriverWait(driver, 15)
-        
-        # Try different container selectors
-        container_selectors = [
-            "[data-component-type='s-search-result']",
-            ".s-result-item",
-            "[data-asin]:not([data-asin=''])"
-        ]
+class SeleniumWorker:
+    """One Chrome for crawl(): waits for the results to render instead of sleeping"""
+
+    def __init__(self, headless=True, timeout=15):
+        self.driver = setup_driver(headless=headless)
+        self.timeout = timeout
+
+    def fetch(self, url):
+        self.driver.get(url)
+        wait = WebDriverWait(self.driver, self.timeout)
+        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, RESULTS_READY)))
+        wait.until(lambda driver: driver.execute_script("return document.readyState") == "complete")
         
         containers = []
-        for selector in container_selectors:
+        for selector in CONTAINER_SELECTORS:
+            containers = self.driver.find_elements(By.CSS_SELECTOR, selector)
+            if containers:
+                break
+        
+        products = []
+        for container in containers:
             try:
-                containers = driver.find_elements(By.CSS_SELECTOR, selector)
-                if containers:
-                    print(f"Found {len(containers)} products using selector: {selector}")
-                    break
-            except:
+                product_data = get_product_data(container)
+            except Exception as e:  # e.g. the result re-rendered under us
+                print(f"❌ Could not extract data for a product: {e}")
                 continue
-        
-        if not containers:
-            print("No product containers found!")
-            return []
-        
-        # Extract product data
-        for i, container in enumerate(containers[:10]):  # Limit to 10 products
-            print(f"\nProcessing product {i+1}...")
-            
-            product_data = get_product_data(container, i+1)
             if product_data:
-                # Add additional fields
-                product_data.update({
-                    'brand': 'Unknown',
-                    'category__name': 'Mobile',
-                    'description': f"{product_data['name']} - Mobile phone",
-                    'stock': random.randint(5, 50),
-                    'is_active': True
-                })
-                
                 products.append(product_data)
-                print(f"✅ {product_data['name'][:50]}... - ₹{product_data['price']}")
-            else:
-                print(f"❌ Could not extract data for product {i+1}")
-            
-            time.sleep(random.uniform(1, 2))
-    
-    except Exception as e:
-        print(f"Error during scraping: {e}")
+        return products
+
+    def close(self):
+        self.driver.quit()
+
+def product_row(found):
+    """A ProductResource-style row for one search result"""
+    return {
+        'name': found['name'],
+        'price': found['price'],
+        'rating': found['rating'],
+        'image': "",  # set by download_images()
+        'image_url': found['image_url'],
+        'brand': 'Unknown',
+        'category__name': 'Mobile',
+        'description': f"{found['name']} - Mobile phone",
+        'stock': random.randint(5, 50),  # only seeds new products when ingested
+        'is_active': True,
+        'asin': found.get('asin', ''),
+    }
+
+def scrape_pages(queries=("mobile phone",), pages=1, workers=1, state_path=None,
+                 base_url=SEARCH_URL, headless=False, make_worker=None, manifest_path=None):
+    """
+    Yield rows page by page: each result page's images are downloaded as soon
+    as the page is crawled, while the other browsers keep crawling. With a
+    manifest only new or changed rows are yielded, and images already
+    downloaded are re-checked with conditional requests.
+    """
+    if make_worker is None:
+        make_worker = lambda: SeleniumWorker(headless=headless)
     
+    state = CrawlState.load(state_path)
+    manifest = incremental.Manifest(manifest_path)
+    downloader = ImageDownloader(hash_names=True)
+    seen = set()
+    changed = 0
+    try:
+        for _, _, found in crawl_pages(queries, pages, make_worker, state, workers=workers, base_url=base_url):
+            # First sighting of each ASIN (or name) wins, as in CrawlState.products()
+            rows = []
+            for product in found:
+                identity = product.get('asin') or product['name']
+                if identity not in seen:
+                    seen.add(identity)
+                    rows.append(product_row(product))
+            if not rows:
+                continue
+            download_images(rows, manifest, downloader=downloader)
+            rows = incremental.changed_rows(rows, manifest)
+            changed += len(rows)
+            yield from rows
     finally:
-        driver.quit()
+        downloader.close()
+        manifest.save()
+    
+    if state.errors:
+        print(f"⚠️ {len(state.errors)} page(s) failed; run again with the same --state to retry them")
+    if manifest_path:
+        print(f"🔁 {changed} of {len(seen)} products new or changed since the last run")
+
+def scrape_with_image_download(**options):
+    """Crawl, download the images and return the rows as one list (see scrape_pages)"""
+    return list(scrape_pages(**options))
+
+def ingest(products):
+    """Upsert products straight into the shop's database in batches, without the CSV round trip"""
+    import django
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "e_commerce.settings")
+    django.setup()
+    from shop.importing import ingest_products
     
-    return products
+    result = ingest_products(products)
+    for line, message in result.errors:
+        print(f"❌ Product {line}: {message}")
+    print(f"🗄️ {result.created} created, {result.updated} updated, {result.skipped} skipped "
+          f"in {result.seconds:.1f}s")
+    return result
 
 # Alternative: Create sample images if scraping fails
 def create_sample_images():
@@ -340,14 +359,41 @@ if __name__ == "__main__":
     print("🛒 Amazon Scraper with Image Download")
     print("=" * 50)
     
-    products = scrape_with_image_download()
+    parser = argparse.ArgumentParser(description="Crawl search results and download product images")
+    parser.add_argument("--query", action="append", dest="queries", help="search query (repeatable)")
+    parser.add_argument("--pages", type=int, default=1, help="result pages per query")
+    parser.add_argument("--workers", type=int, default=1, help="parallel browsers")
+    parser.add_argument("--state", help="checkpoint file; rerun with the same file to resume")
+    parser.add_argument("--base-url", default=SEARCH_URL, help="search endpoint, e.g. a local fixture server")
+    parser.add_argument("--headless", action="store_true")
+    parser.add_argument("--http", action="store_true", help="fetch pages over plain HTTP without a browser")
+    parser.add_argument("--manifest", help="incremental mode: remember products here and write only changed rows")
+    parser.add_argument("--output", default="products_scraped_fixed.csv")
+    parser.add_argument("--ingest", action="store_true", help="write to the shop database instead of a CSV")
+    args = parser.parse_args()
+    
+    options = dict(
+        queries=args.queries or ["mobile phone"],
+        pages=args.pages,
+        workers=args.workers,
+        state_path=args.state,
+        base_url=args.base_url,
+        headless=args.headless,
+        make_worker=HTTPWorker if args.http else None,
+        manifest_path=args.manifest,
+    )
     
-    if products:
+    if args.ingest:
+        # Rows reach the database page by page, while the crawl is still running
+        ingest(scrape_pages(**options))
+    elif products := scrape_with_image_download(**options):
         df = pd.DataFrame(products)
-        df.to_csv('products_scraped_fixed.csv', index=False)
+        df.to_csv(args.output, index=False)
         print(f"\n✅ Scraped {len(products)} products successfully!")
-        print("💾 Saved to products_scraped_fixed.csv")
+        print(f"💾 Saved to {args.output}")
         print("🖼️ Images downloaded to media/products/")
+    elif args.manifest and os.path.exists(args.manifest):
+        print("✅ Nothing changed since the last run; no CSV written")
     else:
         print("❌ No products were scraped. Creating sample images instead...")
         if create_sample_images():
@@ -367,5 +413,5 @@ if __name__ == "__main__":
                 })
             
             df = pd.DataFrame(sample_data)
-            df.to_csv('products_scraped_fixed.csv', index=False)
+            df.to_csv(args.output, index=False)
             print("✅ Created sample data with images!")
\ No newline at end of file
@@ -0,0 +1 @@
+"""Helpers for scraperv2.py that don't need a browser."""
@@ -0,0 +1,196 @@
+"""
+Parallel, resumable crawl of search-result pages.
+
+Every (query, page) pair is a task on a shared queue drained by N worker
+threads, each owning one page worker (a headless browser in
+``scraperv2.SeleniumWorker``, or ``HTTPWorker`` for saved fixtures).
+Finished pages and their products are checkpointed to a JSON state file
+after every page, written atomically, so an interrupted crawl picks up
+where it stopped. A query whose page comes back empty is marked
+exhausted and its later pages are skipped. ``crawl_pages`` yields pages
+as they finish, so downloads and ingest can start before the crawl ends.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from urllib.parse import urlencode, urljoin
+
+import requests
+
+from .downloader import HEADERS
+from .files import write_json
+from .parsing import parse_search_results
+
+SEARCH_URL = "https://www.amazon.in/s"
+STATE_VERSION = 1
+
+
+def search_url(query, page, base_url=SEARCH_URL):
+    params = {"k": query}
+    if page > 1:
+        params["page"] = page
+    return f"{base_url}?{urlencode(params)}"
+
+
+def _key(query, page):
+    return f"{query}\t{page}"
+
+
+class CrawlState:
+    """Checkpoint of finished pages; thread-safe, saved after every change."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.pages = {}         # "query\tpage" -> products found on that page
+        self.exhausted = {}     # query -> first empty page
+        self.errors = {}        # "query\tpage" -> last error, retried on resume
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path=None):
+        state = cls(path)
+        if path and os.path.exists(path):
+            with open(path) as fh:
+                data = json.load(fh)
+            if data.get("version") == STATE_VERSION:
+                state.pages = data["pages"]
+                state.exhausted = data["exhausted"]
+                state.errors = data["errors"]
+        return state
+
+    def is_done(self, query, page):
+        with self._lock:
+            return _key(query, page) in self.pages or page > self.exhausted.get(query, page)
+
+    def record(self, query, page, products):
+        with self._lock:
+            self.pages[_key(query, page)] = products
+            self.errors.pop(_key(query, page), None)
+            if not products:
+                self.exhausted[query] = min(page, self.exhausted.get(query, page))
+            self._save()
+
+    def fail(self, query, page, error):
+        with self._lock:
+            self.errors[_key(query, page)] = error
+            self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        write_json(self.path, {"version": STATE_VERSION, "pages": self.pages, "exhausted": self.exhausted, "errors": self.errors})
+
+    def products(self, queries, pages):
+        """Products in (query, page, position) order, first sighting of each ASIN (or name) wins."""
+        seen, products = set(), []
+        for query in queries:
+            for page in range(1, pages + 1):
+                for product in self.pages.get(_key(query, page), ()):
+                    identity = product.get("asin") or product["name"]
+                    if identity not in seen:
+                        seen.add(identity)
+                        products.append(product)
+        return products
+
+
+class HTTPWorker:
+    """Fetches pages with plain HTTP and parses them with ``parse_search_results``."""
+
+    def __init__(self, timeout=15):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS, Accept="text/html,application/xhtml+xml,*/*;q=0.8")
+
+    def fetch(self, url):
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        products = parse_search_results(response.text)
+        for product in products:
+            if product["image_url"]:
+                product["image_url"] = urljoin(url, product["image_url"])
+        return products
+
+    def close(self):
+        self.session.close()
+
+
+def crawl(queries, pages, make_worker, workers=4, state_path=None, base_url=SEARCH_URL, log=print, state=None,
+          on_page=None):
+    """
+    Crawl ``pages`` result pages for each query on up to ``workers`` page
+    workers; returns the ``CrawlState``. ``make_worker()`` is called once
+    per thread and must return an object with ``fetch(url)`` and ``close()``.
+    ``on_page(query, page, products)`` is called from the worker thread
+    after each page is checkpointed.
+    """
+    if state is None:
+        state = CrawlState.load(state_path)
+    tasks = queue.Queue()
+    # Page-major order: an empty page usually lands before that query's later pages are picked up.
+    for page in range(1, pages + 1):
+        for query in queries:
+            if not state.is_done(query, page):
+                tasks.put((query, page))
+    if tasks.empty():
+        return state
+
+    def run():
+        worker = make_worker()
+        try:
+            while True:
+                try:
+                    query, page = tasks.get_nowait()
+                except queue.Empty:
+                    return
+                if state.is_done(query, page):
+                    continue
+                start = time.perf_counter()
+                try:
+                    products = worker.fetch(search_url(query, page, base_url))
+                except Exception as exc:
+                    state.fail(query, page, str(exc))
+                    log(f"❌ {query!r} page {page}: {exc}")
+                    continue
+                state.record(query, page, products)
+                if on_page:
+                    on_page(query, page, products)
+                log(f"✅ {query!r} page {page}: {len(products)} products in {time.perf_counter() - start:.1f}s")
+        finally:
+            worker.close()
+
+    threads = [threading.Thread(target=run, daemon=True) for _ in range(min(workers, tasks.qsize()))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return state
+
+
+def crawl_pages(queries, pages, make_worker, state=None, workers=4, base_url=SEARCH_URL, log=print):
+    """
+    ``crawl`` as a generator of ``(query, page, products)``: pages already
+    in ``state``'s checkpoint first, then each page as soon as a worker has
+    it. Check ``state.errors`` once the generator is exhausted.
+    """
+    state = state if state is not None else CrawlState()
+    for query in queries:
+        for page in range(1, pages + 1):
+            if _key(query, page) in state.pages:
+                yield query, page, state.pages[_key(query, page)]
+
+    finished = queue.Queue()
+
+    def run():
+        try:
+            crawl(queries, pages, make_worker, workers, base_url=base_url, log=log, state=state,
+                  on_page=lambda *done: finished.put(done))
+        finally:
+            finished.put(None)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    while (done := finished.get()) is not None:
+        yield done
+    thread.join()
@@ -0,0 +1,261 @@
+"""
+Concurrent image download stage for the scraper.
+
+The Selenium pass only collects image URLs; ``ImageDownloader`` fetches
+them afterwards on a bounded thread pool sharing one keep-alive
+``requests.Session``. Each host gets its own concurrency limit, transient
+failures (connection errors, timeouts, 429 and 5xx) are retried with
+exponential backoff and jitter (``Retry-After`` is honoured), and files
+are written to a temp file and renamed into place so an interrupted run
+never leaves a truncated image in ``media/products/``.
+
+With ``hash_names=True`` files are stored under content-hashed names
+(``shop.storage.hashed_name``), so identical bytes are written once. A
+``previous`` copy's ETag/Last-Modified make the request conditional, and
+a 304 keeps the copy already on disk.
+"""
+import hashlib
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from shop.storage import HASH_LENGTH, hashed_name
+
+MEDIA_DIR = os.path.join("media", "products")
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "image/webp,image/apng,image/*,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRY_AFTER = 30
+
+
+class RetryableError(Exception):
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass
+class DownloadResult:
+    url: str
+    filename: str
+    # "products/<filename>" once saved, the same value download_image used to return.
+    name: str = None
+    status: int = None
+    size: int = 0
+    attempts: int = 0
+    error: str = ""
+    etag: str = None
+    last_modified: str = None
+
+    @property
+    def not_modified(self):
+        return self.status == 304
+
+    @property
+    def ok(self):
+        return self.name is not None
+
+
+@dataclass
+class DownloadStats:
+    results: list = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def ok(self):
+        return sum(1 for r in self.results if r.ok)
+
+    @property
+    def failed(self):
+        return len(self.results) - self.ok
+
+    @property
+    def not_modified(self):
+        return sum(1 for r in self.results if r.not_modified)
+
+    @property
+    def bytes(self):
+        return sum(r.size for r in self.results)
+
+    @property
+    def images_per_second(self):
+        return self.ok / self.seconds if self.seconds else 0.0
+
+    def summary(self):
+        return (f"{self.ok - self.not_modified} downloaded, {self.not_modified} unchanged, "
+                f"{self.failed} failed in {self.seconds:.1f}s "
+                f"({self.images_per_second:.1f} images/sec, {self.bytes / 1024:.0f} KiB)")
+
+
+def _retry_after(response):
+    value = response.headers.get("Retry-After", "")
+    return min(float(value), MAX_RETRY_AFTER) if value.replace(".", "", 1).isdigit() else None
+
+
+class ImageDownloader:
+    def __init__(self, dest_dir=MEDIA_DIR, workers=16, per_host=4, retries=3, backoff=0.5, timeout=10, session=None,
+                 hash_names=False):
+        self.dest_dir = dest_dir
+        self.hash_names = hash_names
+        self.workers = workers
+        self.per_host = per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.session = session or self._make_session()
+        self._hosts = {}
+        self._hosts_lock = threading.Lock()
+
+    def _make_session(self):
+        session = requests.Session()
+        session.headers.update(HEADERS)
+        # One pooled keep-alive connection per worker; retries are ours, not urllib3's.
+        adapter = HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers, max_retries=0)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _host_limit(self, url):
+        host = urlparse(url).netloc
+        with self._hosts_lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.BoundedSemaphore(self.per_host)
+            return self._hosts[host]
+
+    def _delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return retry_after
+        return self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+
+    def _write(self, response, filename):
+        """
+        Stream the body to a temp file in ``dest_dir`` and rename it into
+        place; returns the final filename and size.
+        """
+        os.makedirs(self.dest_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.dest_dir, prefix=".part-")
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    fh.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+            if not size:
+                raise ValueError("empty response body")
+            if self.hash_names:
+                filename = hashed_name(filename, digest.hexdigest()[:HASH_LENGTH])
+            path = os.path.join(self.dest_dir, filename)
+            if self.hash_names and os.path.exists(path):
+                os.remove(tmp_path)  # Same bytes already stored.
+            else:
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return filename, size
+
+    def _conditional_headers(self, previous):
+        """If-None-Match/If-Modified-Since for a previous copy that is still on disk."""
+        if not previous or not previous.get("name"):
+            return {}
+        if not os.path.exists(os.path.join(self.dest_dir, os.path.basename(previous["name"]))):
+            return {}
+        headers = {}
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+        return headers
+
+    def request(self, url, headers=None):
+        """GET ``url`` under the host's concurrency limit; raises RetryableError for transient failures."""
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout, stream=True)
+        except (requests.ConnectionError, requests.Timeout) as exc:
+            raise RetryableError(str(exc)) from exc
+        if response.status_code in RETRY_STATUSES:
+            response.close()
+            raise RetryableError(f"HTTP {response.status_code}", _retry_after(response))
+        return response
+
+    def fetch(self, url, filename, previous=None):
+        """
+        Download one image; never raises, the outcome is in the returned
+        ``DownloadResult``. ``previous`` ({"name", "etag", "last_modified"})
+        describes a copy already downloaded from ``url``.
+        """
+        result = DownloadResult(url, filename)
+        if not url or url.startswith("data:"):
+            result.error = "no image url"
+            return result
+        headers = self._conditional_headers(previous)
+
+        for attempt in range(1, self.retries + 2):
+            result.attempts = attempt
+            try:
+                with self._host_limit(url):
+                    response = self.request(url, headers)
+                    with response:
+                        result.status = response.status_code
+                        result.etag = response.headers.get("ETag")
+                        result.last_modified = response.headers.get("Last-Modified")
+                        if response.status_code == 304 and headers:
+                            response.content  # Drain, so the connection goes back to the pool.
+                            result.name = previous["name"]
+                            result.etag = result.etag or previous.get("etag")
+                            result.last_modified = result.last_modified or previous.get("last_modified")
+                            result.error = ""
+                            return result
+                        response.raise_for_status()
+                        content_type = response.headers.get("Content-Type", "")
+                        if "image" not in content_type.lower():
+                            result.error = f"not an image: {content_type or 'no content type'}"
+                            return result
+                        filename, result.size = self._write(response, filename)
+                result.name = f"products/{filename}"
+                result.error = ""
+                return result
+            except RetryableError as exc:
+                result.error = str(exc)
+                if attempt <= self.retries:
+                    time.sleep(self._delay(attempt, exc.retry_after))
+            except (requests.RequestException, OSError, ValueError) as exc:
+                result.error = str(exc)
+                return result
+        return result
+
+    def download_all(self, items, on_result=None):
+        """
+        Fetch ``(url, filename)`` or ``(url, filename, previous)`` items
+        concurrently. Returns a ``DownloadStats`` whose results are in
+        input order.
+        """
+        items = list(items)
+        start = time.perf_counter()
+
+        def run(item):
+            result = self.fetch(*item)
+            if on_result:
+                on_result(result)
+            return result
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = list(pool.map(run, items))
+        return DownloadStats(results, time.perf_counter() - start)
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,22 @@
+"""Small file helpers shared by the scraper's checkpoint and manifest."""
+import json
+import os
+import tempfile
+
+
+def write_json(path, data, **options):
+    """
+    Dump ``data`` to a temp file next to ``path`` and rename it into place,
+    so an interrupted write never leaves a truncated file behind.
+    ``options`` are passed to ``json.dump``.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}-")
+    try:
+        with os.fdopen(fd, "w") as fh:
+            json.dump(data, fh, **options)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,99 @@
+"""
+Incremental re-scrapes keyed by a stable product id.
+
+``Manifest`` remembers, per ASIN (falling back to the name for results
+without one), the last row written and the image's URL, stored name and
+validators. On the next run ``download_images`` only sends conditional
+requests for images it already has, files are named by content hash so a
+reordered result page can't mislink them, and ``changed_rows`` returns
+just the rows whose data differs from the manifest.
+"""
+import json
+import os
+import posixpath
+import re
+from urllib.parse import unquote, urlparse
+
+from .files import write_json
+
+MANIFEST_VERSION = 1
+# Columns compared between runs; stock isn't scraped, so a known product keeps its previous value.
+ROW_FIELDS = ("name", "price", "rating", "image", "image_url", "brand", "category__name", "description", "is_active")
+UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+def product_key(product):
+    return product.get("asin") or f"name:{product['name']}"
+
+
+def image_filename(url):
+    """A filesystem-safe name from the image URL's last path segment (``.jpg`` if it has no extension)."""
+    stem, ext = posixpath.splitext(posixpath.basename(unquote(urlparse(url).path)))
+    stem = UNSAFE_CHARS.sub("-", stem).strip(".-")[:80] or "image"
+    ext = ext.lower() if re.fullmatch(r"\.[a-z0-9]{1,4}", ext.lower()) else ".jpg"
+    return stem + ext
+
+
+class Manifest:
+    def __init__(self, path=None):
+        self.path = path
+        self.products = {}
+        if path and os.path.exists(path):
+            with open(path) as fh:
+                data = json.load(fh)
+            if data.get("version") == MANIFEST_VERSION:
+                self.products = data["products"]
+
+    def previous_image(self, product):
+        """The stored image for this product if it came from the same URL."""
+        image = self.products.get(product_key(product), {}).get("image")
+        if image and image["url"] == product["image_url"]:
+            return image
+        return None
+
+    def save(self):
+        if not self.path:
+            return
+        write_json(self.path, {"version": MANIFEST_VERSION, "products": self.products}, indent=1, sort_keys=True)
+
+
+def download_images(products, downloader, manifest=None):
+    """
+    Fetch each product's ``image_url`` with ``downloader`` (which should use
+    ``hash_names=True``) and set ``image`` to the stored name. Returns the
+    ``DownloadStats``.
+    """
+    manifest = manifest or Manifest()
+    wanted = [p for p in products if p.get("image_url")]
+    items = [(p["image_url"], image_filename(p["image_url"]), manifest.previous_image(p)) for p in wanted]
+    stats = downloader.download_all(items)
+    for product, (_, _, previous), result in zip(wanted, items, stats.results):
+        product["image"] = result.name or (previous or {}).get("name", "")
+        if result.ok:
+            product["_image"] = {
+                "url": result.url, "name": result.name, "etag": result.etag, "last_modified": result.last_modified,
+            }
+        elif previous:
+            product["_image"] = previous
+    for product in products:
+        product.setdefault("image", "")
+    return stats
+
+
+def changed_rows(products, manifest):
+    """
+    Rows that are new or differ from the manifest in ``ROW_FIELDS``; the
+    manifest is updated in place (call ``manifest.save()`` afterwards).
+    """
+    changed = []
+    for product in products:
+        image = product.pop("_image", None)
+        key = product_key(product)
+        entry = manifest.products.get(key)
+        if entry and "stock" in entry["row"]:
+            product["stock"] = entry["row"]["stock"]
+        row = {field: value for field, value in product.items()}
+        if entry is None or any(entry["row"].get(field) != row.get(field) for field in ROW_FIELDS):
+            changed.append(product)
+        manifest.products[key] = {"row": row, "image": image or (entry or {}).get("image")}
+    return changed
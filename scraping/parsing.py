@@ -0,0 +1,107 @@
+"""
+Browser-free parsing of saved search-result pages.
+
+``parse_search_results`` reads the same markup ``get_product_data`` walks
+with Selenium (``data-asin`` result containers, ``h2`` title, ``.a-price``,
+``.a-icon-alt`` rating, ``img.s-image``) using only ``html.parser``, so a
+crawl can run against HTML fixtures where no browser is installed.
+"""
+from html.parser import HTMLParser
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+DEFAULT_RATING = "4.0"
+
+
+def clean_price(text):
+    """"₹1,299." -> "1299." as get_product_data does; "" when there are no digits."""
+    price = "".join(c for c in text or "" if c.isdigit() or c == ".")
+    return price if any(c.isdigit() for c in price) else ""
+
+
+def clean_rating(text):
+    """"4.3 out of 5 stars" -> "4.3"; None for anything else."""
+    text = (text or "").strip()
+    return text.split()[0] if "out of" in text else None
+
+
+class _SearchResultParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.products = []
+        self._stack = []        # open tags inside the current result
+        self._current = None
+        self._capture = None    # (field, depth) whose text is being collected
+        self._text = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = set((attrs.get("class") or "").split())
+        if self._current is None:
+            if attrs.get("data-asin") and attrs.get("data-component-type") == "s-search-result":
+                self._current = {"asin": attrs["data-asin"], "name": "", "price": "", "rating": None, "image_url": ""}
+                self._stack = [tag]
+            return
+
+        if tag == "img" and not self._current["image_url"]:
+            src = attrs.get("src") or ""
+            if src and not src.startswith("data:"):
+                self._current["image_url"] = src
+        if tag in VOID_TAGS:
+            return
+        self._stack.append(tag)
+        if self._capture is None:
+            if tag == "h2" and not self._current["name"]:
+                self._start("name")
+            elif "a-price-whole" in classes and not self._current["price"]:
+                self._start("price")
+            elif "a-offscreen" in classes and not self._current["price"]:
+                self._start("price")
+            elif "a-icon-alt" in classes and self._current["rating"] is None:
+                self._start("rating")
+
+    def _start(self, name):
+        self._capture = (name, len(self._stack))
+        self._text = []
+
+    def handle_data(self, data):
+        if self._capture is not None:
+            self._text.append(data)
+
+    def handle_endtag(self, tag):
+        if self._current is None or tag in VOID_TAGS:
+            return
+        if tag in self._stack:
+            while self._stack and self._stack[-1] != tag:
+                self._stack.pop()
+            self._stack.pop()
+        if self._capture is not None and len(self._stack) < self._capture[1]:
+            self._finish()
+        if not self._stack:
+            self.products.append(self._current)
+            self._current = None
+
+    def _finish(self):
+        name, _ = self._capture
+        text = " ".join("".join(self._text).split())
+        if name == "name":
+            self._current["name"] = text[:200] if len(text) > 5 else ""
+        elif name == "price":
+            self._current["price"] = clean_price(text)
+        else:
+            self._current["rating"] = clean_rating(text)
+        self._capture = None
+
+
+def parse_search_results(html):
+    """Product dicts (asin, name, price, rating, image_url) for every named result on the page."""
+    parser = _SearchResultParser()
+    parser.feed(html)
+    parser.close()
+    products = []
+    for product in parser.products:
+        if not product["name"]:
+            continue
+        product["price"] = product["price"] or "0.00"
+        product["rating"] = product["rating"] or DEFAULT_RATING
+        products.append(product)
+    return products
@@ -0,0 +1,122 @@
+"""
+A local HTTP stand-in for the image CDN, for tests and benchmarks.
+
+Serves in-memory bodies from a background ``ThreadingHTTPServer`` with
+keep-alive, ETag/Last-Modified validators (answering conditional requests
+with 304), optional per-request latency and scripted failures::
+
+    with StandInServer({"/a.jpg": b"..."}, latency=0.05) as server:
+        server.fail("/a.jpg", 503, times=2)
+        url = server.url("/a.jpg")
+"""
+import hashlib
+import threading
+import time
+from collections import Counter
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server.standin
+        # Exact matches (query string included) win, so search pages can be told apart.
+        path = self.path if self.path in server.files else self.path.split("?", 1)[0]
+        server.record(self, path, +1)
+        try:
+            if server.latency:
+                time.sleep(server.latency)
+            status = server.take_failure(path)
+            if status is None and path not in server.files:
+                status = 404
+            if status is not None:
+                self._send(status, b"", "text/plain")
+                return
+            body, content_type, etag, modified = server.files[path]
+            validators = {"ETag": etag, "Last-Modified": formatdate(modified, usegmt=True)}
+            if self._not_modified(etag, modified):
+                self._send(304, b"", content_type, validators)
+            else:
+                self._send(200, body, content_type, validators)
+        finally:
+            server.record(self, path, -1)
+
+    def _not_modified(self, etag, modified):
+        if "If-None-Match" in self.headers:
+            return etag in [tag.strip() for tag in self.headers["If-None-Match"].split(",")]
+        since = self.headers.get("If-Modified-Since")
+        try:
+            return since is not None and int(modified) <= parsedate_to_datetime(since).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)) if status != 304 else "0")
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+
+class StandInServer:
+    def __init__(self, files=None, latency=0.0):
+        self.files = {}
+        self.latency = latency
+        self.requests = Counter()
+        self.connections = set()
+        self.active = self.peak = 0
+        self._failures = {}
+        self._lock = threading.Lock()
+        for path, body in (files or {}).items():
+            self.add(path, body)
+
+    def add(self, path, body, content_type="image/jpeg", modified=None):
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+        self.files[path] = (body, content_type, etag, int(modified or time.time()))
+
+    def fail(self, path, status, times=1):
+        """Answer the next ``times`` requests for ``path`` with ``status``."""
+        self._failures[path] = [status] * times
+
+    def take_failure(self, path):
+        with self._lock:
+            pending = self._failures.get(path)
+            return pending.pop() if pending else None
+
+    def record(self, handler, path, delta):
+        with self._lock:
+            if delta > 0:
+                self.requests[path] += 1
+                self.connections.add(handler.client_address)
+            self.active += delta
+            self.peak = max(self.peak, self.active)
+
+    def url(self, path):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}{path}"
+
+    def start(self):
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.standin = self
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
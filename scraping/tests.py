@@ -0,0 +1,209 @@
+import json
+import os
+import shutil
+import tempfile
+
+import requests
+from django.test import SimpleTestCase
+
+from .crawl import CrawlState, HTTPWorker, crawl, crawl_pages, search_url
+from .downloader import ImageDownloader
+from .incremental import Manifest, changed_rows, download_images
+from .parsing import parse_search_results
+from .standin import StandInServer
+
+
+class ImageDownloaderTests(SimpleTestCase):
+    def setUp(self):
+        self.dest = tempfile.mkdtemp(prefix="scrape-")
+        self.addCleanup(shutil.rmtree, self.dest, ignore_errors=True)
+        self.server = StandInServer({f"/img/{i}.jpg": f"jpeg {i}".encode() * 100 for i in range(20)}).start()
+        self.addCleanup(self.server.stop)
+
+    def downloader(self, **kwargs):
+        options = {"workers": 8, "per_host": 4, "retries": 2, "backoff": 0.01, "timeout": 5, **kwargs}
+        downloader = ImageDownloader(self.dest, **options)
+        self.addCleanup(downloader.close)
+        return downloader
+
+    def test_downloads_concurrently_over_pooled_connections(self):
+        self.server.latency = 0.02
+        items = [(self.server.url(f"/img/{i}.jpg"), f"mobile_{i}.jpg") for i in range(20)]
+        stats = self.downloader().download_all(items)
+
+        self.assertEqual((stats.ok, stats.failed), (20, 0))
+        self.assertEqual([r.name for r in stats.results], [f"products/mobile_{i}.jpg" for i in range(20)])
+        with open(os.path.join(self.dest, "mobile_7.jpg"), "rb") as fh:
+            self.assertEqual(fh.read(), b"jpeg 7" * 100)
+        self.assertEqual(sorted(os.listdir(self.dest)), sorted(f"mobile_{i}.jpg" for i in range(20)))
+        self.assertGreater(stats.images_per_second, 0)
+        # Bounded by the per-host limit, and connections are reused across requests.
+        self.assertLessEqual(self.server.peak, 4)
+        self.assertGreater(self.server.peak, 1)
+        self.assertLessEqual(len(self.server.connections), 8)
+
+    def test_retries_transient_errors_with_backoff(self):
+        self.server.fail("/img/1.jpg", 503, times=2)
+        result = self.downloader().fetch(self.server.url("/img/1.jpg"), "a.jpg")
+        self.assertTrue(result.ok)
+        self.assertEqual((result.attempts, self.server.requests["/img/1.jpg"]), (3, 3))
+
+    def test_gives_up_after_retries_and_does_not_retry_client_errors(self):
+        downloader = self.downloader()
+        self.server.fail("/img/1.jpg", 500, times=5)
+        result = downloader.fetch(self.server.url("/img/1.jpg"), "a.jpg")
+        self.assertFalse(result.ok)
+        self.assertEqual((result.attempts, result.error), (3, "HTTP 500"))
+
+        result = downloader.fetch(self.server.url("/missing.jpg"), "b.jpg")
+        self.assertFalse(result.ok)
+        self.assertEqual((result.attempts, result.status), (1, 404))
+        self.assertEqual(os.listdir(self.dest), [])
+
+    def test_rejects_non_images_without_leaving_files(self):
+        self.server.add("/page.html", b"<html></html>", "text/html")
+        result = self.downloader().fetch(self.server.url("/page.html"), "a.jpg")
+        self.assertFalse(result.ok)
+        self.assertIn("not an image", result.error)
+        self.assertEqual(os.listdir(self.dest), [])
+
+
+def fixture(name):
+    with open(os.path.join(os.path.dirname(__file__), "fixtures", name), "rb") as fh:
+        return fh.read()
+
+
+class CrawlTests(SimpleTestCase):
+    queries = ["mobile phone", "tablet"]
+
+    def setUp(self):
+        self.server = StandInServer().start()
+        self.addCleanup(self.server.stop)
+        for query in self.queries:
+            for page in (1, 2, 3):
+                body = fixture(f"search_page_{page}.html" if page < 3 else "search_no_results.html")
+                self.server.add(search_url(query, page, "/s"), body, "text/html")
+        self.state_path = os.path.join(tempfile.mkdtemp(prefix="crawl-"), "state.json")
+        self.addCleanup(shutil.rmtree, os.path.dirname(self.state_path), ignore_errors=True)
+
+    def page_requests(self):
+        return sum(count for path, count in self.server.requests.items() if path.startswith("/s"))
+
+    def crawl(self, pages=4, make_worker=HTTPWorker):
+        return crawl(self.queries, pages, make_worker, workers=3, state_path=self.state_path,
+                     base_url=self.server.url("/s"), log=lambda message: None)
+
+    def test_parses_saved_result_pages(self):
+        products = parse_search_results(fixture("search_page_1.html").decode())
+        self.assertEqual(len(products), 5)  # the untitled sponsored slot is skipped
+        self.assertEqual(products[0], {
+            "asin": "B09G9HD6PD", "name": "Apple iPhone 13 (128GB) - Blue", "price": "43900", "rating": "4.5",
+            "image_url": "/images/I/71xb2xkN5qL._AC_UY218_.jpg",
+        })
+        self.assertEqual(products[-1]["image_url"], "")  # lazy-loaded data: placeholder
+        self.assertEqual(parse_search_results(fixture("search_no_results.html").decode()), [])
+
+    def test_crawls_queries_and_pages_in_parallel_until_exhausted(self):
+        state = self.crawl()
+        self.assertEqual(state.exhausted, {"mobile phone": 3, "tablet": 3})
+        self.assertTrue(state.is_done("tablet", 4))
+        products = state.products(self.queries, 4)
+        self.assertEqual(len(products), 7)  # the repeated ASIN on page 2 and the second query are deduplicated
+        self.assertTrue(products[0]["image_url"].startswith(self.server.url("/images/I/")))
+
+    def test_resumes_from_checkpoint(self):
+        class Flaky(HTTPWorker):
+            def fetch(self, url):
+                if "page=2" in url:
+                    raise requests.ConnectionError("browser crashed")
+                return super().fetch(url)
+
+        state = self.crawl(pages=2, make_worker=Flaky)
+        self.assertEqual(len(state.errors), 2)
+        self.assertEqual(self.page_requests(), 2)
+
+        state = self.crawl(pages=2)
+        self.assertEqual(state.errors, {})
+        self.assertEqual(self.page_requests(), 4)  # only the two failed pages
+        self.assertEqual(len(state.products(self.queries, 2)), 7)
+
+        with open(self.state_path) as fh:
+            self.assertEqual(len(json.load(fh)["pages"]), 4)
+        self.crawl(pages=2)
+        self.assertEqual(self.page_requests(), 4)
+
+    def test_streams_checkpointed_pages_then_new_ones(self):
+        self.crawl(pages=1)
+        state = CrawlState.load(self.state_path)
+        pages = crawl_pages(self.queries, 3, HTTPWorker, state, workers=3, base_url=self.server.url("/s"),
+                            log=lambda message: None)
+        first = [next(pages), next(pages)]
+        self.assertEqual([(query, page) for query, page, _ in first], [("mobile phone", 1), ("tablet", 1)])
+        self.assertEqual(self.page_requests(), 2)  # checkpointed pages come back before any fetch
+
+        rest = sorted((query, page, len(products)) for query, page, products in pages)
+        self.assertEqual(rest, [("mobile phone", 2, 3), ("mobile phone", 3, 0), ("tablet", 2, 3), ("tablet", 3, 0)])
+        self.assertEqual(state.errors, {})
+        self.assertEqual(self.page_requests(), 6)
+
+
+class IncrementalScrapeTests(SimpleTestCase):
+    def setUp(self):
+        self.dest = tempfile.mkdtemp(prefix="scrape-")
+        self.addCleanup(shutil.rmtree, self.dest, ignore_errors=True)
+        self.server = StandInServer().start()
+        self.addCleanup(self.server.stop)
+        self.server.add("/s?k=phone", fixture("search_page_1.html"), "text/html")
+        self.server.add("/s?k=phone&page=2", fixture("search_page_2.html"), "text/html")
+        self.images = [p["image_url"] for p in parse_search_results(fixture("search_page_1.html").decode())]
+        self.images += [p["image_url"] for p in parse_search_results(fixture("search_page_2.html").decode())]
+        for path in filter(None, self.images):
+            self.server.add(path, path.encode() * 50)
+        self.manifest_path = os.path.join(self.dest, "manifest.json")
+
+    def scrape(self):
+        """One run of the scraper's pipeline minus the browser and the CSV."""
+        state = crawl(["phone"], 2, HTTPWorker, workers=2, base_url=self.server.url("/s"), log=lambda message: None)
+        products = [{**p, "brand": "Unknown", "stock": 10, "is_active": True} for p in state.products(["phone"], 2)]
+        manifest = Manifest(self.manifest_path)
+        downloader = ImageDownloader(self.dest, workers=4, retries=0, hash_names=True)
+        self.addCleanup(downloader.close)
+        stats = download_images(products, downloader, manifest)
+        changed = changed_rows(products, manifest)
+        manifest.save()
+        return products, changed, stats
+
+    def test_conditional_requests_and_content_hashed_names(self):
+        downloader = ImageDownloader(self.dest, retries=0, hash_names=True)
+        self.addCleanup(downloader.close)
+        url = self.server.url(self.images[0])
+        first = downloader.fetch(url, "photo.jpg")
+        self.assertRegex(first.name, r"^products/photo\.[0-9a-f]{12}\.jpg$")
+        self.assertTrue(first.etag)
+
+        again = downloader.fetch(url, "photo.jpg", {"name": first.name, "etag": first.etag})
+        self.assertEqual((again.status, again.name, again.size), (304, first.name, 0))
+        unconditional = downloader.fetch(url, "photo.jpg")
+        self.assertEqual(unconditional.name, first.name)  # same bytes, same file
+        self.assertEqual(os.listdir(self.dest), [os.path.basename(first.name)])
+
+    def test_rerun_downloads_and_writes_only_what_changed(self):
+        products, changed, stats = self.scrape()
+        self.assertEqual(len(changed), 7)
+        self.assertEqual((stats.ok, stats.not_modified), (6, 0))
+        self.assertEqual(len(os.listdir(self.dest)), 6 + 1)  # images + manifest
+        by_asin = {p["asin"]: p for p in products}
+        self.assertRegex(by_asin["B09G9HD6PD"]["image"], r"^products/71xb2xkN5qL\._AC_UY218_\.[0-9a-f]{12}\.jpg$")
+        self.assertEqual(by_asin["B0DGJ7NQ6T"]["image"], "")  # lazy image never resolved
+
+        products, changed, stats = self.scrape()
+        self.assertEqual(changed, [])
+        self.assertEqual((stats.ok, stats.not_modified), (6, 6))
+
+        old_image = by_asin["B0CHX1W1XY"]["image"]
+        self.server.add(self.images[1], b"new photo")
+        products, changed, stats = self.scrape()
+        self.assertEqual([p["asin"] for p in changed], ["B0CHX1W1XY"])
+        self.assertNotEqual(changed[0]["image"], old_image)
+        self.assertEqual(changed[0]["stock"], 10)
+        self.assertTrue(os.path.exists(os.path.join(self.dest, os.path.basename(old_image))))
@@ -6,8 +6,10 @@ from import_export.admin import ImportExportModelAdmin
 from import_export.widgets import ForeignKeyWidget, Widget
 from django.core.files import File
 from django.core.files.storage import default_storage
-import os
-from .models import Category, Product, Cart, CartItem, Order, OrderItem
+from .counting import EstimatedCountPaginator
+from .importing import normalize_image_path
+from .models import Category, Product, Cart, CartItem, Order, OrderItem, Job
+from .search import fts_available, match_filter
 
 
 # ---------------- CUSTOM IMAGE WIDGET (FIXED) ----------------
@@ -19,35 +21,16 @@ class ImageWidget(Widget):
         if not value:
             return None
             
-        # Remove any quotes or whitespace
-        value = str(value).strip().strip('"').strip("'")
-        
-        if not value or value.lower() == 'nan':
+        value = normalize_image_path(value)
+        if not value:
             return None
-            
-        # Handle both absolute paths and relative paths
-        if value.startswith('products/'):
-            # This is the expected format: products/filename.jpg
-            file_path = os.path.join('media', value)  # media/products/filename.jpg
-        elif value.startswith('media/products/'):
-            # Full media path: media/products/filename.jpg
-            file_path = value
-        else:
-            # Assume it's just the filename, add the full path
-            file_path = os.path.join('media', 'products', os.path.basename(value))
-        
+
         # Check if file exists
-        if os.path.exists(file_path):
-            try:
-                # Return just the relative path that Django expects
-                return value if value.startswith('products/') else f"products/{os.path.basename(value)}"
-            except Exception as e:
-                print(f"Error processing image {value}: {e}")
-                return None
-        else:
-            print(f"Image file not found: {file_path}")
-            return None
-    
+        if default_storage.exists(value):
+            return value
+        print(f"Image file not found: {value}")
+        return None
+
     def render(self, value, obj=None):
         """Render the value for export"""
         if not value:
@@ -102,18 +85,8 @@ class ProductResource(resources.ModelResource):
         """Process each row before import"""
         # Clean up image path
         if 'image' in row:
-            image_path = str(row['image']).strip()
-            if image_path and image_path.lower() not in ['nan', 'none', '']:
-                # Ensure the path is in the correct format
-                if not image_path.startswith('products/'):
-                    if '/' in image_path:
-                        image_path = 'products/' + os.path.basename(image_path)
-                    else:
-                        image_path = 'products/' + image_path
-                row['image'] = image_path
-            else:
-                row['image'] = ''
-        
+            row['image'] = normalize_image_path(row['image'])
+
         return super().before_import_row(row, **kwargs)
 
 
@@ -129,6 +102,8 @@ class CategoryAdmin(ImportExportModelAdmin):
 @admin.register(Product) 
 class ProductAdmin(ImportExportModelAdmin):
     resource_class = ProductResource
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     list_display = ("name", "brand", "category", "price", "stock", "is_active", "has_image", "created_at")
     list_filter = ("category", "brand", "is_active", "created_at")
     search_fields = ("name", "brand", "description")
@@ -144,36 +119,92 @@ class ProductAdmin(ImportExportModelAdmin):
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('category')
 
+    def get_search_results(self, request, queryset, search_term):
+        """Use the FTS5 index instead of icontains scans when it is available"""
+        if not search_term or not fts_available():
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(match_filter(search_term)), False
+
 
 # ---------------- REST OF YOUR ADMIN CLASSES ----------------
+# Big tables: no exact COUNT(*) for unfiltered changelists, and product/user
+# foreign keys use search widgets instead of a <select> listing every row.
 class CartItemInline(admin.TabularInline):
     model = CartItem
     extra = 1
+    autocomplete_fields = ("product",)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("product")
 
 
 @admin.register(Cart)
 class CartAdmin(admin.ModelAdmin):
     list_display = ("id", "user", "created_at", "total_price")
+    list_select_related = ("user",)
     search_fields = ("user__username",)
+    autocomplete_fields = ("user",)
     inlines = [CartItemInline]
     ordering = ("-created_at",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_total()
+
+    @admin.display(description="Total price", ordering="items_total")
+    def total_price(self, obj):
+        return obj.total_price()
+
+
+@admin.register(CartItem)
+class CartItemAdmin(admin.ModelAdmin):
+    list_display = ("id", "cart", "product", "quantity")
+    list_select_related = ("cart__user", "product")
+    autocomplete_fields = ("product",)
+    raw_id_fields = ("cart",)
+    ordering = ("-id",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 1
-    readonly_fields = ("total_price",)
+    fields = ("product", "product_name", "product_brand", "category_name", "quantity", "unit_price", "total_price")
+    readonly_fields = ("product_name", "product_brand", "category_name", "total_price")
+    raw_id_fields = ("product",)
 
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ("id", "user", "ordered_at", "order_status", "payment_method", "payment_status", "total_amount")
+    list_select_related = ("user",)
     list_filter = ("order_status", "payment_method", "payment_status", "ordered_at")
     search_fields = ("user__username", "shipping_address")
+    autocomplete_fields = ("user",)
     inlines = [OrderItemInline]
     readonly_fields = ("ordered_at", "stripe_payment_intent")
     ordering = ("-ordered_at",)
-
-
-admin.site.register(CartItem)
-admin.site.register(OrderItem)
\ No newline at end of file
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(OrderItem)
+class OrderItemAdmin(admin.ModelAdmin):
+    list_display = ("id", "order", "product_name", "quantity", "unit_price")
+    list_select_related = ("order__user",)
+    raw_id_fields = ("order", "product")
+    ordering = ("-id",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "status", "attempts", "run_after", "locked_by", "updated_at")
+    list_filter = ("status", "kind")
+    readonly_fields = ("created_at", "updated_at")
+    ordering = ("-id",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
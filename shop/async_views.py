@@ -0,0 +1,245 @@
+# async_views.py - native async views, served concurrently under e_commerce/asgi.py
+import calendar
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST, require_safe
+from rest_framework.exceptions import APIException, AuthenticationFailed
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import cache as catalog_cache
+from . import conditional, inventory
+from .authentication import CachedJWTAuthentication, VersionedRefreshToken
+from .filters import afacet_counts, apply_filters, build_filters
+from .hashing import PoolSaturated, hashing_pool
+from .models import Cart, Category, Product
+from .pagination import KeysetPagination
+from .serializers import CartSerializer, CategorySerializer, ProductSerializer, UserSerializer
+
+User = get_user_model()
+
+
+def _payload(request):
+    if request.content_type == "application/json":
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else {}
+    return request.POST
+
+
+def _detail(message, status):
+    return JsonResponse({"detail": message}, status=status)
+
+
+def _busy():
+    response = _detail("Too many sign-in attempts in progress, retry shortly", 503)
+    response["Retry-After"] = "1"
+    return response
+
+
+def _tokens(user, status=200):
+    refresh = VersionedRefreshToken.for_user(user)
+    return JsonResponse({
+        "user": UserSerializer(user).data,
+        "access": str(refresh.access_token),
+        "refresh": str(refresh),
+    }, status=status)
+
+
+# ---------- Auth: Signup, Login ----------
+
+@csrf_exempt
+@require_POST
+async def signup(request):
+    data = _payload(request)
+    username = data.get("username")
+    email = data.get("email", "")
+    password = data.get("password")
+
+    if not username or not password:
+        return _detail("Username & password required", 400)
+
+    if await User.objects.filter(username=username).aexists():
+        return _detail("Username already taken", 400)
+
+    try:
+        encoded = await hashing_pool.make_password(password)
+    except PoolSaturated:
+        return _busy()
+
+    user = User(username=User.normalize_username(username), email=User.objects.normalize_email(email), password=encoded)
+    await user.asave()
+    return _tokens(user, status=201)
+
+
+@csrf_exempt
+@require_POST
+async def login(request):
+    data = _payload(request)
+    username = data.get("username")
+    password = data.get("password")
+
+    if not username or not password:
+        return _detail("Username & password required", 400)
+
+    try:
+        user = await User.objects.aget(username=username)
+    except User.DoesNotExist:
+        return _detail("Invalid credentials", 401)
+
+    try:
+        valid, must_update = await hashing_pool.check_password(password, user.password)
+    except PoolSaturated:
+        return _busy()
+    if not valid:
+        return _detail("Invalid credentials", 401)
+
+    if must_update:
+        # What User.check_password's setter does: upgrade the hash to the current hasher/iterations.
+        try:
+            user.password = await hashing_pool.make_password(password)
+        except PoolSaturated:
+            pass  # Upgrade on a later login rather than fail this one.
+        else:
+            await user.asave(update_fields=["password"])
+    return _tokens(user)
+
+
+# ---------- Catalog: Products, Categories ----------
+
+def _conditional(request, etag, last_modified):
+    """304/412 when the request's validators match, mirroring ``condition()``."""
+    etag = quote_etag(etag) if etag else None
+    timestamp = calendar.timegm(last_modified.utctimetuple()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp), etag, timestamp
+
+
+def _with_validators(response, etag, timestamp):
+    if etag and not response.has_header("ETag"):
+        response.headers["ETag"] = etag
+    if timestamp and not response.has_header("Last-Modified"):
+        response.headers["Last-Modified"] = http_date(timestamp)
+    return response
+
+
+def _render(data):
+    # DRF's encoder, so Decimals and the like come out exactly as in the sync views.
+    return JsonResponse(data, encoder=JSONEncoder, safe=False)
+
+
+async def _serialize(serializer_class, instance, **kwargs):
+    """
+    Serializer output built on a worker thread. Everything the serializer
+    reads must already be loaded, so the thread never touches the database.
+    """
+    return await sync_to_async(lambda: serializer_class(instance, **kwargs).data, thread_sensitive=False)()
+
+
+async def _products(products, request, many=True):
+    instances = products if many else [products]
+    context = {"request": request, "stock_totals": await inventory.adisplay_stock(instances)}
+    return await _serialize(ProductSerializer, products, many=many, context=context)
+
+
+@require_safe
+async def product_list(request):
+    async def build():
+        base = Product.objects.filter(is_active=True)
+        groups = build_filters(request.GET)
+        qs = apply_filters(base, groups).select_related("category")
+        paginator = KeysetPagination()
+        if paginator.is_requested(request):
+            page = await paginator.apaginate_queryset(qs, request)
+            data = paginator.get_paginated_data(await _products(page, request))
+            data["facets"] = await afacet_counts(base, groups)
+            return data
+        return await _products([product async for product in qs], request)
+
+    response, etag, timestamp = _conditional(request, *await conditional.aproduct_list_validators(request))
+    if response is None:
+        key = catalog_cache.make_key("product_list", request.build_absolute_uri())
+        try:
+            data = await catalog_cache.aget_or_build(key, build)
+        except APIException as exc:
+            # e.g. NotFound for a bad cursor; DRF's handler turns these into responses for the sync views.
+            return _detail(exc.detail, exc.status_code)
+        await inventory.arefresh_stock(data["results"] if isinstance(data, dict) else data)
+        response = _render(data)
+    return _with_validators(response, etag, timestamp)
+
+
+@require_safe
+async def product_detail(request, pk):
+    async def build():
+        try:
+            product = await Product.objects.select_related("category").aget(pk=pk, is_active=True)
+        except Product.DoesNotExist:
+            return None
+        return await _products(product, request, many=False)
+
+    response, etag, timestamp = _conditional(request, *await conditional.aproduct_detail_validators(request, pk))
+    if response is None:
+        if etag is None:
+            return _detail("No Product matches the given query.", 404)
+        key = catalog_cache.make_key("product_detail", pk, request.build_absolute_uri("/"))
+        data = await catalog_cache.aget_or_build(key, build)
+        if data is None:
+            return _detail("No Product matches the given query.", 404)
+        await inventory.arefresh_stock([data])
+        response = _render(data)
+    return _with_validators(response, etag, timestamp)
+
+
+@require_safe
+async def category_list(request):
+    async def build():
+        return await _serialize(CategorySerializer, [c async for c in Category.objects.all()], many=True)
+
+    response, etag, timestamp = _conditional(request, *await conditional.acategory_list_validators(request))
+    if response is None:
+        key = catalog_cache.make_key("category_list")
+        response = _render(await catalog_cache.aget_or_build(key, build))
+    return _with_validators(response, etag, timestamp)
+
+
+# ---------- Cart ----------
+
+_jwt_auth = CachedJWTAuthentication()
+
+
+async def _authenticate(request):
+    """(user, None) for a valid bearer token, else (None, 401 response)."""
+    try:
+        result = await sync_to_async(_jwt_auth.authenticate)(request)
+    except AuthenticationFailed as exc:
+        detail = exc.detail if isinstance(exc.detail, dict) else {"detail": exc.detail}
+        response = JsonResponse(detail, status=401)
+    else:
+        if result is not None:
+            return result[0], None
+        response = _detail("Authentication credentials were not provided.", 401)
+    response["WWW-Authenticate"] = _jwt_auth.authenticate_header(request)
+    return None, response
+
+
+@require_safe
+async def cart_detail(request):
+    user, denied = await _authenticate(request)
+    if denied:
+        return denied
+
+    carts = Cart.objects.with_items().filter(user=user).order_by("id")
+    cart = await carts.afirst()
+    if cart is None:
+        await Cart.objects.acreate(user=user)
+        cart = await carts.afirst()
+
+    totals = await inventory.adisplay_stock([item.product for item in cart.items.all()])
+    return _render(await _serialize(CartSerializer, cart, context={"stock_totals": totals}))
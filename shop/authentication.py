@@ -0,0 +1,106 @@
+"""
+JWT authentication that resolves users from an in-process cache.
+
+Tokens carry a ``ver`` claim: a hash of the user fields that must
+invalidate a session (password, active flag, username, email). Each
+user's current version is kept in the shared ``auth_version`` cache and
+rewritten whenever the user row is saved or deleted, in whichever process
+that happens. A token whose version differs is rejected without a query,
+and a cached user is only used while its version matches the shared one,
+so the database is hit once per user per cache lifetime instead of on
+every request.
+"""
+import hashlib
+
+from django.core.cache import caches
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+AUTH_CACHE_ALIAS = "auth"
+VERSION_CACHE_ALIAS = "auth_version"
+# Published for a deleted user; no token carries it.
+DELETED = ""
+VERSION_CLAIM = "ver"
+PROFILE_CLAIMS = ("username", "email")
+
+
+def _cache():
+    return caches[AUTH_CACHE_ALIAS]
+
+
+def _versions():
+    return caches[VERSION_CACHE_ALIAS]
+
+
+def _key(user_id):
+    return f"jwt-user:{user_id}"
+
+
+def token_version(user):
+    raw = "|".join([user.password, str(user.is_active), user.get_username(), getattr(user, "email", "")])
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+class VersionedRefreshToken(RefreshToken):
+    """Refresh token (and derived access tokens) carrying ``ver`` plus the profile claims."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[VERSION_CLAIM] = token_version(user)
+        token["username"] = user.get_username()
+        token["email"] = getattr(user, "email", "")
+        return token
+
+
+class VersionedTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = VersionedRefreshToken
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        version = validated_token.get(VERSION_CLAIM)
+        if version is None:
+            # Tokens issued before versioning: plain database lookup.
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken("Token contained no recognizable user identification") from e
+
+        key = _key(user_id)
+        published = _versions().get(key)
+        if published is not None and published != version:
+            raise AuthenticationFailed("Token is no longer valid for this user.", code="token_revoked")
+        cached = _cache().get(key)
+        if published is not None and cached is not None and cached[0] == version:
+            return cached[1]
+
+        user = super().get_user(validated_token)
+        current = token_version(user)
+        # add(), not set(): a save elsewhere that published a newer version while we read must win.
+        _versions().add(key, current)
+        if current != version:
+            raise AuthenticationFailed("Token is no longer valid for this user.", code="token_revoked")
+        _cache().set(key, (current, user))
+        return user
+
+
+def forget_user(user, deleted=False):
+    """Publish ``user``'s new token version to every process and drop this process's cached copy."""
+    _versions().set(_key(user.pk), DELETED if deleted else token_version(user))
+    _cache().delete(_key(user.pk))
+
+
+def profile_from_token(token):
+    """Profile data straight from a verified token, or None if it predates the profile claims."""
+    if token is None or any(claim not in token for claim in PROFILE_CLAIMS):
+        return None
+    return {
+        "id": int(token[api_settings.USER_ID_CLAIM]),
+        "username": token["username"],
+        "email": token["email"],
+    }
@@ -0,0 +1,80 @@
+import hashlib
+import threading
+import time
+
+from django.core.cache import caches
+
+CATALOG_CACHE_ALIAS = "catalog"
+# Payloads stay in the per-process "catalog" cache; the version is shared, so a
+# bump from an import, a command or a job worker invalidates every web process.
+VERSION_CACHE_ALIAS = "catalog_version"
+VERSION_KEY = "catalog:version"
+
+_stats = {"hits": 0, "misses": 0}
+_stats_lock = threading.Lock()
+
+
+def _cache():
+    return caches[CATALOG_CACHE_ALIAS]
+
+
+def _version_cache():
+    return caches[VERSION_CACHE_ALIAS]
+
+
+def get_version():
+    """Current catalog version; seeded from the clock so an evicted counter never reuses an old value."""
+    cache = _version_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    """Invalidate every catalog entry at once by moving to a new version."""
+    cache = _version_cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def make_key(*parts):
+    raw = "|".join(str(p) for p in parts)
+    return f"catalog:{get_version()}:{hashlib.md5(raw.encode()).hexdigest()}"
+
+
+def get_or_build(key, builder):
+    """Return the cached value for ``key``, building and storing it on a miss."""
+    cache = _cache()
+    value = cache.get(key)
+    with _stats_lock:
+        _stats["hits" if value is not None else "misses"] += 1
+    if value is None:
+        value = builder()
+        cache.set(key, value)
+    return value
+
+
+async def aget_or_build(key, abuilder):
+    """``get_or_build`` for async callers; ``abuilder`` is awaited on a miss."""
+    cache = _cache()
+    value = await cache.aget(key)
+    with _stats_lock:
+        _stats["hits" if value is not None else "misses"] += 1
+    if value is None:
+        value = await abuilder()
+        await cache.aset(key, value)
+    return value
+
+
+def stats():
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats["hits"] = _stats["misses"] = 0
@@ -0,0 +1,109 @@
+"""Atomic checkout: cart -> order with race-free stock decrement."""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, F, Q, When
+
+from . import inventory, jobs, reservations
+from .exceptions import CheckoutError, EmptyCart, OutOfStock  # noqa: F401
+from .models import Cart, CartItem, Order, OrderItem, Product
+
+
+PROCESS_ORDER_JOB = "order.process"
+
+
+def decrement_stock(quantities, reserved=None):
+    """
+    Take ``{product_id: qty}`` off stock and return how many products were served.
+
+    Plain products go through a single conditional UPDATE: only rows with
+    enough stock (beyond units ``reserved`` by other carts) match the WHERE
+    clause. Sharded products are taken from their shard counters and leave
+    the product row alone (``inventory.schedule_sync`` updates it later).
+    ``updated_at`` isn't touched: stock is served from the short-lived
+    stock cache, not the catalog cache and its validators.
+    Must run inside a transaction that the caller rolls back when it falls
+    short.
+
+    Holds are only advisory for sharded products: the total is checked
+    against ``reserved`` in a read before ``take()``, and no single shard
+    UPDATE can see the total, so concurrent checkouts can dip into units
+    another cart holds. Shards never go negative; the holding cart then gets
+    ``OutOfStock`` at its own checkout.
+    """
+    reserved = reserved or {}
+    sharded = dict(Product.objects.filter(pk__in=quantities, stock_shards__gt=0).values_list("pk", "stock_shards"))
+    plain = {pk: qty for pk, qty in quantities.items() if pk not in sharded}
+    served = 0
+
+    if plain:
+        condition = Q()
+        for product_id, qty in plain.items():
+            condition |= Q(pk=product_id, stock__gte=qty + reserved.get(product_id, 0))
+        served += Product.objects.filter(condition).update(
+            stock=Case(*[When(pk=pk, then=F("stock") - qty) for pk, qty in plain.items()]),
+        )
+
+    if sharded:
+        levels = inventory.stock_levels(list(sharded))
+        for pk, shards in sharded.items():
+            if levels[pk] >= quantities[pk] + reserved.get(pk, 0) and inventory.take(pk, quantities[pk], shards):
+                inventory.schedule_sync(pk)
+                served += 1
+    return served
+
+
+def place_order(user, shipping_address, payment_method="COD"):
+    """
+    Turn the user's cart into an order in one transaction: one UPDATE for
+    stock, one INSERT for the order, one bulk INSERT for its lines and
+    DELETEs for the cart items and their stock holds. Downstream processing is queued as a job in
+    the same transaction. Raises ``EmptyCart`` / ``OutOfStock``.
+    """
+    with transaction.atomic():
+        cart = Cart.objects.filter(user=user).order_by("id").first()
+        lines = list(CartItem.objects.filter(cart=cart).select_related("product__category")) if cart else []
+        if not lines:
+            raise EmptyCart("Cart empty")
+
+        quantities = {}
+        for line in lines:
+            quantities[line.product_id] = quantities.get(line.product_id, 0) + line.quantity
+
+        # This cart's own holds are converted into the decrement; other carts' holds are off limits.
+        reserved = reservations.active_holds(list(quantities), exclude_cart=cart)
+        if decrement_stock(quantities, reserved) != len(quantities):
+            levels = inventory.stock_levels(list(quantities))
+            short = [pk for pk, qty in quantities.items() if levels.get(pk, 0) < qty + reserved.get(pk, 0)]
+            raise OutOfStock(list(Product.objects.filter(pk__in=short).only("id", "name")))
+
+        order = Order.objects.create(
+            user=user,
+            shipping_address=shipping_address,
+            payment_method=payment_method,
+            total_amount=sum((line.product.price * line.quantity for line in lines), Decimal("0.00")),
+            payment_status="Pending",
+            item_count=sum(line.quantity for line in lines),
+            thumbnail=next((line.product.image.name for line in lines if line.product.image), ""),
+        )
+        order_items = []
+        for line in lines:
+            item = OrderItem(order=order, product=line.product, quantity=line.quantity, unit_price=line.product.price)
+            item.take_snapshot(line.product)
+            order_items.append(item)
+        OrderItem.objects.bulk_create(order_items)
+        CartItem.objects.filter(cart=cart).delete()
+        reservations.release_cart(cart)
+        jobs.enqueue(PROCESS_ORDER_JOB, {"order_id": order.pk})
+        # Only these products' stock changed: drop their cached levels, not the whole catalog.
+        transaction.on_commit(lambda: inventory.forget_stock(list(quantities)))
+    return order
+
+
+@jobs.handler(PROCESS_ORDER_JOB)
+def process_order(payload):
+    """
+    Downstream steps for a placed order, run by ``manage.py run_order_workers``.
+    Payment intents, confirmation emails and inventory sync hook in here.
+    """
+    Order.objects.filter(pk=payload["order_id"], order_status="Pending").update(order_status="Processing")
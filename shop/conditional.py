@@ -0,0 +1,129 @@
+"""
+ETag / Last-Modified helpers for ``django.views.decorators.http.condition``,
+plus awaitable equivalents for the async views.
+
+Validators cover the catalog data, not ``stock``: checkouts don't touch
+``updated_at``, and bodies carry stock from ``inventory.cached_stock``.
+"""
+import hashlib
+
+from asgiref.sync import sync_to_async
+
+from django.db.models import Count, Max, Subquery, Value
+
+from . import cache as catalog_cache
+from .models import Category, Product
+
+
+def _fingerprint(model):
+    """(max updated_at, row count) for a table, cached per catalog version."""
+    key = catalog_cache.make_key("fingerprint", model._meta.label)
+    return catalog_cache.get_or_build(
+        key, lambda: tuple(model.objects.aggregate(last=Max("updated_at"), count=Count("id")).values())
+    )
+
+
+def _etag(*parts):
+    return hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()
+
+
+def _latest(*stamps):
+    stamps = [stamp for stamp in stamps if stamp]
+    return max(stamps) if stamps else None
+
+
+def _product_list_validators(request, fingerprint):
+    # Product payloads embed their category, so renaming one must change the list too.
+    last, count, category_last, category_count = fingerprint
+    etag = _etag("products", last, count, category_last, category_count, request.build_absolute_uri())
+    return etag, _latest(last, category_last)
+
+
+def product_list_etag(request):
+    return _product_list_validators(request, _catalog_fingerprint())[0]
+
+
+def product_list_last_modified(request):
+    return _product_list_validators(request, _catalog_fingerprint())[1]
+
+
+def category_list_etag(request):
+    last, count = _fingerprint(Category)
+    return _etag("categories", last, count)
+
+
+def category_list_last_modified(request):
+    return _fingerprint(Category)[0]
+
+
+def _product_stamps(pk):
+    """(updated_at, category updated_at) of an active product, as a queryset."""
+    return Product.objects.filter(pk=pk, is_active=True).values_list("updated_at", "category__updated_at")
+
+
+def product_detail_etag(request, pk):
+    last = product_detail_last_modified(request, pk)
+    if last is None:
+        return None
+    return _etag("product", pk, last.isoformat(), request.build_absolute_uri("/"))
+
+
+def product_detail_last_modified(request, pk):
+    """The later of the product's and its category's ``updated_at``; the payload embeds both."""
+    key = catalog_cache.make_key("product_updated_at", pk)
+    # False marks a missing/inactive product so the miss is cached as well.
+    last = catalog_cache.get_or_build(key, lambda: _latest(*(_product_stamps(pk).first() or ())) or False)
+    return last or None
+
+
+def _catalog_fingerprint_query():
+    """Product and Category (max updated_at, count) in one query, for the product list."""
+    # Grouping on a constant makes the category aggregates a single-row subquery.
+    categories = Category.objects.order_by().values(one=Value(1)).annotate(last=Max("updated_at"), count=Count("id"))
+    return Product.objects.aggregate(
+        last=Max("updated_at"),
+        count=Count("id"),
+        category_last=Max(Subquery(categories.values("last"))),
+        category_count=Max(Subquery(categories.values("count"))),
+    )
+
+
+def _catalog_fingerprint():
+    key = catalog_cache.make_key("fingerprint", "products+categories")
+    return catalog_cache.get_or_build(key, lambda: tuple(_catalog_fingerprint_query().values()))
+
+
+async def _afingerprint(model):
+    key = catalog_cache.make_key("fingerprint", model._meta.label)
+
+    async def build():
+        return tuple((await model.objects.aaggregate(last=Max("updated_at"), count=Count("id"))).values())
+
+    return await catalog_cache.aget_or_build(key, build)
+
+
+async def aproduct_list_validators(request):
+    """(etag, last_modified) for the async product list."""
+    key = catalog_cache.make_key("fingerprint", "products+categories")
+
+    async def build():
+        return tuple((await sync_to_async(_catalog_fingerprint_query)()).values())
+
+    return _product_list_validators(request, await catalog_cache.aget_or_build(key, build))
+
+
+async def acategory_list_validators(request):
+    last, count = await _afingerprint(Category)
+    return _etag("categories", last, count), last
+
+
+async def aproduct_detail_validators(request, pk):
+    key = catalog_cache.make_key("product_updated_at", pk)
+
+    async def build():
+        return _latest(*(await _product_stamps(pk).afirst() or ())) or False
+
+    last = await catalog_cache.aget_or_build(key, build) or None
+    if last is None:
+        return None, None
+    return _etag("product", pk, last.isoformat(), request.build_absolute_uri("/")), last
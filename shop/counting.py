@@ -0,0 +1,52 @@
+"""
+Cheap row counts for large admin changelists.
+
+An unfiltered changelist page asks for ``COUNT(*)`` over the whole table,
+which is a full scan on big tables. ``EstimatedCountPaginator`` answers
+that case from planner statistics instead: ``pg_class.reltuples`` on
+PostgreSQL; on SQLite, ``sqlite_stat1`` after ``ANALYZE``, or else the
+highest primary key, which is read from the index. Tables estimated under
+``EXACT_COUNT_LIMIT`` rows, filtered querysets and other backends are
+still counted exactly.
+"""
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+EXACT_COUNT_LIMIT = 10000
+
+
+def estimated_count(model, using="default"):
+    """An estimate of ``model``'s row count, or None if the backend has no cheap one."""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+            row = cursor.fetchone()
+            return row[0] if row and row[0] >= 0 else None
+        if connection.vendor == "sqlite":
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone():
+                # The first number of any of the table's rows is its row count.
+                cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table])
+                row = cursor.fetchone()
+                if row:
+                    return int(row[0].split()[0])
+            pk = connection.ops.quote_name(model._meta.pk.column)
+            cursor.execute(f"SELECT MAX({pk}) FROM {connection.ops.quote_name(table)}")
+            value = cursor.fetchone()[0]
+            return value if isinstance(value, int) else None
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        query = getattr(queryset, "query", None)
+        if query is not None and not query.where and not query.distinct:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= EXACT_COUNT_LIMIT:
+                return estimate
+        return super().count
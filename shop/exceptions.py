@@ -0,0 +1,12 @@
+class CheckoutError(Exception):
+    pass
+
+
+class EmptyCart(CheckoutError):
+    pass
+
+
+class OutOfStock(CheckoutError):
+    def __init__(self, products):
+        self.products = products
+        super().__init__("Insufficient stock for: " + ", ".join(p.name for p in products))
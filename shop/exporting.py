@@ -0,0 +1,145 @@
+"""
+Constant-memory catalog and order exports.
+
+Rows are read with ``.iterator(chunk_size=...)`` and rendered to CSV or
+JSONL a block at a time, optionally gzipped on the fly, so the same
+generators can feed a ``StreamingHttpResponse`` or a file. Product
+columns match ``ProductResource``, so an export can be imported again
+(admin import or ``manage.py import_products``).
+"""
+import csv
+import io
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+
+from .models import Order, OrderItem, Product
+
+CHUNK_SIZE = 2000
+BLOCK_SIZE = 64 * 1024
+FORMATS = ("csv", "jsonl")
+CONTENT_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+PRODUCT_COLUMNS = (
+    "id", "name", "brand", "category__name", "description", "price", "stock", "image", "rating", "is_active",
+)
+ORDER_COLUMNS = (
+    "id", "user", "ordered_at", "order_status", "payment_method", "payment_status", "total_amount",
+    "shipping_address", "item_count",
+)
+ORDER_ITEM_COLUMNS = ("product_id", "product_name", "product_brand", "category_name", "quantity", "unit_price")
+
+
+def product_records(chunk_size=CHUNK_SIZE):
+    products = Product.objects.select_related("category").order_by("id")
+    for p in products.iterator(chunk_size=chunk_size):
+        yield {
+            "id": p.pk,
+            "name": p.name,
+            "brand": p.brand,
+            "category__name": p.category.name if p.category_id else "",
+            "description": p.description,
+            "price": p.price,
+            "stock": p.stock,
+            "image": p.image.name if p.image else "",
+            "rating": p.rating,
+            # ProductResource's BooleanWidget renders 1/0.
+            "is_active": int(p.is_active),
+        }
+
+
+def order_records(chunk_size=CHUNK_SIZE):
+    """One record per order with its items; items come from the snapshot columns."""
+    orders = (
+        Order.objects.select_related("user").order_by("id")
+        .prefetch_related(Prefetch("order_items", queryset=OrderItem.objects.order_by("id")))
+    )
+    for order in orders.iterator(chunk_size=chunk_size):
+        record = {column: getattr(order, column) for column in ORDER_COLUMNS if column != "user"}
+        record["user"] = order.user.get_username()
+        record["items"] = [{column: getattr(item, column) for column in ORDER_ITEM_COLUMNS} for item in order.order_items.all()]
+        yield record
+
+
+def order_item_rows(records):
+    """Flatten orders to one row per item for CSV (orders without items keep one row)."""
+    for record in records:
+        order = {column: record[column] for column in ORDER_COLUMNS}
+        for item in record["items"] or [dict.fromkeys(ORDER_ITEM_COLUMNS, "")]:
+            yield {**order, **{f"item_{column}": value for column, value in item.items()}}
+
+
+def _blocks(lines):
+    """Join small strings into ~BLOCK_SIZE pieces so responses aren't a write per row."""
+    buffer, size = [], 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= BLOCK_SIZE:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def render_csv(columns, records):
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=columns, extrasaction="ignore")
+
+    def lines():
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record)
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate()
+        yield out.getvalue()
+
+    return _blocks(lines())
+
+
+def render_jsonl(records):
+    encoder = DjangoJSONEncoder()
+    return _blocks(encoder.encode(record) + "\n" for record in records)
+
+
+def gzip_stream(blocks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for block in blocks:
+        data = compressor.compress(block.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def encoded(blocks):
+    for block in blocks:
+        yield block.encode()
+
+
+def export(kind, fmt, gzip=False, chunk_size=CHUNK_SIZE):
+    """Byte chunks of a ``kind`` ("products"/"orders") export in ``fmt`` ("csv"/"jsonl")."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}")
+    if kind == "products":
+        records = product_records(chunk_size)
+        blocks = render_csv(PRODUCT_COLUMNS, records) if fmt == "csv" else render_jsonl(records)
+    elif kind == "orders":
+        records = order_records(chunk_size)
+        if fmt == "csv":
+            columns = ORDER_COLUMNS + tuple(f"item_{column}" for column in ORDER_ITEM_COLUMNS)
+            blocks = render_csv(columns, order_item_rows(records))
+        else:
+            blocks = render_jsonl(records)
+    else:
+        raise ValueError(f"Unknown export {kind!r}")
+    return gzip_stream(blocks) if gzip else encoded(blocks)
+
+
+def filename(kind, fmt, gzip=False):
+    return f"{kind}.{fmt}" + (".gz" if gzip else "")
+
+
+def content_type(fmt, gzip=False):
+    return "application/gzip" if gzip else CONTENT_TYPES[fmt]
@@ -0,0 +1,133 @@
+"""Product list filters and facet counts."""
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Count, Exists, OuterRef, Q
+
+from .models import StockShard
+
+# (label, lower bound inclusive, upper bound exclusive)
+PRICE_BUCKETS = [
+    ("0-10000", Decimal("0"), Decimal("10000")),
+    ("10000-20000", Decimal("10000"), Decimal("20000")),
+    ("20000-50000", Decimal("20000"), Decimal("50000")),
+    ("50000+", Decimal("50000"), None),
+]
+
+
+def _decimal(value):
+    if value in (None, ""):
+        return None
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        return None
+
+
+def build_filters(params):
+    """Parse query params into one Q object per facet group, so a facet can be computed without its own filter."""
+    groups = {}
+
+    categories = [c for c in params.getlist("category") if c.isdigit()]
+    if categories:
+        groups["category"] = Q(category_id__in=categories)
+
+    brands = [b for b in params.getlist("brand") if b]
+    if brands:
+        groups["brand"] = Q(brand__in=brands)
+
+    price = Q()
+    min_price, max_price = _decimal(params.get("min_price")), _decimal(params.get("max_price"))
+    if min_price is not None:
+        price &= Q(price__gte=min_price)
+    if max_price is not None:
+        price &= Q(price__lte=max_price)
+    if price:
+        groups["price"] = price
+
+    min_rating = _decimal(params.get("min_rating"))
+    if min_rating is not None:
+        groups["rating"] = Q(rating__gte=min_rating)
+
+    if params.get("in_stock") in ("1", "true", "True"):
+        groups["stock"] = in_stock()
+
+    return groups
+
+
+def in_stock():
+    """
+    Products with stock left. ``Product.stock`` of a sharded product is only
+    synced after a delay (see shop/inventory.py), so those are checked
+    against their shards instead. A cached list page can still include a
+    product that sold out since, until the page expires (shop/cache.py).
+    """
+    shard_left = Exists(StockShard.objects.filter(product=OuterRef("pk"), stock__gt=0))
+    return Q(stock_shards=0, stock__gt=0) | Q(Q(stock_shards__gt=0) & shard_left)
+
+
+def combine(groups, exclude=None):
+    q = Q()
+    for name, group in groups.items():
+        if name != exclude:
+            q &= group
+    return q
+
+
+def apply_filters(queryset, groups):
+    return queryset.filter(combine(groups))
+
+
+def facet_queries(queryset, groups):
+    """
+    The three facet queries: brand counts, category counts, and the
+    queryset plus aggregate kwargs for price buckets. Each facet ignores its
+    own filter (disjunctive faceting) so the UI can show how many results
+    selecting another value would give.
+    """
+    brands = (
+        queryset.filter(combine(groups, exclude="brand"))
+        .exclude(brand="")
+        .values("brand")
+        .annotate(count=Count("id"))
+        .order_by("-count", "brand")
+    )
+    categories = (
+        queryset.filter(combine(groups, exclude="category"))
+        .filter(category__isnull=False)
+        .values("category_id", "category__name")
+        .annotate(count=Count("id"))
+        .order_by("-count", "category__name")
+    )
+
+    bucket_counts = {}
+    for label, low, high in PRICE_BUCKETS:
+        bucket = Q(price__gte=low) if high is None else Q(price__gte=low, price__lt=high)
+        bucket_counts[label] = Count("id", filter=bucket)
+    prices = queryset.filter(combine(groups, exclude="price"))
+    return brands, categories, prices, bucket_counts
+
+
+def format_facets(brands, categories, prices):
+    return {
+        "brand": [{"value": row["brand"], "count": row["count"]} for row in brands],
+        "category": [
+            {"value": row["category_id"], "name": row["category__name"], "count": row["count"]}
+            for row in categories
+        ],
+        "price": [{"value": label, "count": prices[label]} for label, _, _ in PRICE_BUCKETS],
+    }
+
+
+def facet_counts(queryset, groups):
+    """Brand, category and price-bucket counts in three aggregate queries."""
+    brands, categories, prices, buckets = facet_queries(queryset, groups)
+    return format_facets(list(brands), list(categories), prices.aggregate(**buckets))
+
+
+async def afacet_counts(queryset, groups):
+    brands, categories, prices, buckets = facet_queries(queryset, groups)
+    return format_facets(
+        [row async for row in brands],
+        [row async for row in categories],
+        await prices.aaggregate(**buckets),
+    )
@@ -0,0 +1,95 @@
+"""
+Password hashing off the request path.
+
+PBKDF2 is deliberately slow; running it inline lets a login burst occupy
+every worker. ``hashing_pool`` runs it in a small process pool with its
+own concurrency limit (``AUTH_HASHING_WORKERS``) and a bounded backlog
+(``AUTH_HASHING_MAX_QUEUE``): once the backlog is full new requests are
+rejected with ``PoolSaturated`` instead of piling up.
+"""
+import asyncio
+import threading
+
+from django.conf import settings
+
+from .processes import django_process_pool
+
+
+class PoolSaturated(Exception):
+    pass
+
+
+def _check_password(password, encoded):
+    """``(valid, must_update)``: whether a valid hash should be re-hashed with the current settings."""
+    from django.contrib.auth.hashers import check_password
+    upgrade = []
+    # Django calls the setter exactly when User.check_password would re-hash and save.
+    valid = check_password(password, encoded, setter=lambda raw: upgrade.append(True))
+    return valid, bool(upgrade)
+
+
+def _make_password(password):
+    from django.contrib.auth.hashers import make_password
+    return make_password(password)
+
+
+class HashingPool:
+    def __init__(self, workers, max_queue):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = django_process_pool(self.workers)
+            return self._executor
+
+    async def run(self, func, *args):
+        with self._lock:
+            if self.in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise PoolSaturated("Password hashing pool is saturated")
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            return await asyncio.wrap_future(self._get_executor().submit(func, *args))
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+
+    async def check_password(self, password, encoded):
+        """``(valid, must_update)`` for ``password`` against the stored hash."""
+        return await self.run(_check_password, password, encoded)
+
+    async def make_password(self, password):
+        return await self.run(_make_password, password)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "in_flight": self.in_flight,
+                "queued": max(0, self.in_flight - self.workers),
+                "peak": self.peak,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+hashing_pool = HashingPool(
+    workers=getattr(settings, "AUTH_HASHING_WORKERS", 2),
+    max_queue=getattr(settings, "AUTH_HASHING_MAX_QUEUE", 64),
+)
@@ -0,0 +1,92 @@
+"""
+Responsive derivatives for ``Product.image``.
+
+Every product image gets resized copies at ``PRODUCT_IMAGE_WIDTHS`` in
+``PRODUCT_IMAGE_FORMAT`` (WebP by default; AVIF if Pillow was built with
+it; JPEG as the fallback). Saving a product with a new image enqueues a
+``images.derivatives`` job; the job hands the resizing to the process
+pool in shop/resizing.py, so neither the request nor the job worker's GIL
+pays for it, then records the result in ``Product.image_variants``::
+
+    {"src": "products/mobile_1.jpg", "widths": {"160": "derivatives/products/mobile_1-160w.webp", ...}}
+
+``PRODUCT_IMAGE_WORKERS = 0`` resizes inline instead (tests, tiny setups).
+Derivative files of the variants a record replaces are deleted once no
+product refers to them any more.
+"""
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from . import cache as catalog_cache
+from . import jobs, resizing
+from .models import Product
+
+DERIVATIVES_JOB = "images.derivatives"
+
+
+def is_current(product):
+    """True when ``image_variants`` was built from the product's current image."""
+    name = product.image.name if product.image else ""
+    return (product.image_variants or {}).get("src", "") == name
+
+
+def record(variants):
+    """
+    Store variants on every product still pointing at their source image and
+    delete the derivatives they replace.
+    """
+    products = Product.objects.filter(image=variants["src"])
+    previous = [v for v in products.values_list("image_variants", flat=True) if v]
+    updated = products.update(image_variants=variants)
+    if updated:
+        catalog_cache.bump_version()
+        stale = _unused_derivatives(previous, variants)
+        if stale:
+            transaction.on_commit(lambda: _delete(stale))
+    return updated
+
+
+def _unused_derivatives(previous, variants):
+    """Names in ``previous`` that neither ``variants`` nor another product still uses."""
+    current = set(variants["widths"].values())
+    stale = set()
+    for old in previous:
+        # Derivative names follow their source, so another product still
+        # using the old set can only be one with the same ``src``.
+        if old.get("src") != variants["src"] and Product.objects.filter(image_variants__src=old.get("src")).exists():
+            continue
+        stale.update(name for name in old.get("widths", {}).values() if name not in current)
+    return sorted(stale)
+
+
+def _delete(names):
+    for name in names:
+        default_storage.delete(name)
+
+
+def _payload(product):
+    return {"product_id": product.pk, "image": product.image.name}
+
+
+def request_derivatives(product):
+    if product.image and not is_current(product):
+        jobs.enqueue(DERIVATIVES_JOB, _payload(product))
+
+
+def request_derivatives_many(products):
+    """``request_derivatives`` for a batch, queued in one INSERT."""
+    stale = [_payload(p) for p in products if p.image and not is_current(p)]
+    if stale:
+        jobs.enqueue_many(DERIVATIVES_JOB, stale)
+    return len(stale)
+
+
+@jobs.handler(DERIVATIVES_JOB)
+def build_derivatives(payload):
+    current = Product.objects.filter(pk=payload["product_id"]).values_list("image", flat=True).first()
+    if current != payload["image"]:
+        return  # The image changed again; a newer job covers it.
+    for _, variants in resizing.build([payload["image"]]):
+        if isinstance(variants, Exception):
+            raise variants
+        record(variants)
@@ -0,0 +1,332 @@
+"""
+Streaming bulk import of product feeds in ``ProductResource``'s CSV format.
+
+The admin import resolves the category, stats the image and saves every
+row on its own, and holds the whole dataset in memory. ``import_products``
+reads the CSV in chunks instead. Each chunk costs one query for categories
+not seen yet, one for the products that already exist (matched on
+``name``, like ``ProductResource.Meta.import_id_fields``) and one
+``bulk_create(update_conflicts=True)``, which upserts the matched rows on
+their primary keys and inserts the new ones.
+Image paths are checked against a single scan of ``media/products/``.
+
+Columns missing from the file are left untouched on existing products;
+the ``id`` column is ignored, as with ``import_id_fields = ("name",)``.
+
+``ingest_products`` runs the same upsert over product dicts from any
+iterable (e.g. the scraper), without a CSV in between. Batches are cut by
+size or by time, each commits in its own transaction and bumps the
+catalog cache, so new items show up in the shop within seconds. A feed's
+``stock`` only seeds new products; existing ones keep their live stock.
+"""
+import csv
+import itertools
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from . import cache as catalog_cache
+from . import images
+from .models import Category, Product
+
+CHUNK_SIZE = 2000
+INGEST_CHUNK_SIZE = 500
+INGEST_MAX_WAIT = 2.0
+MAX_ERRORS = 100
+MISSING = {"", "nan", "none", "null"}
+TRUE_VALUES = {"1", "true", "yes", "y", "t"}
+FALSE_VALUES = {"0", "false", "no", "n", "f"}
+# CSV column -> Product field written by the upsert
+COLUMN_FIELDS = {
+    "name": "name",
+    "brand": "brand",
+    "category__name": "category",
+    "description": "description",
+    "price": "price",
+    "stock": "stock",
+    "image": "image",
+    "rating": "rating",
+    "is_active": "is_active",
+}
+# Columns ingest_products writes on create only.
+INGEST_CREATE_ONLY = {"stock"}
+
+
+def normalize_image_path(value):
+    """``products/<file>`` for any of the path forms feeds use, or "" for no image."""
+    value = str(value or "").strip().strip('"').strip("'")
+    if value.lower() in MISSING:
+        return ""
+    if value.startswith("products/"):
+        return value
+    return "products/" + os.path.basename(value)
+
+
+def scan_images(directory="products"):
+    """Every file under ``MEDIA_ROOT/<directory>`` as a storage name, from one directory scan."""
+    try:
+        with os.scandir(os.path.join(settings.MEDIA_ROOT, directory)) as entries:
+            return {f"{directory}/{entry.name}" for entry in entries if entry.is_file()}
+    except FileNotFoundError:
+        return set()
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+    errors: list = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def rows(self):
+        return self.created + self.updated + self.skipped
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def error(self, line, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((line, message))
+
+
+def _text(value):
+    return str(value or "").strip()
+
+
+def _decimal(value, column):
+    value = _text(value)
+    if value.lower() in MISSING:
+        return None
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"{column}: {value!r} is not a number")
+
+
+def _int(value, column):
+    number = _decimal(value, column)
+    if number is None:
+        return None
+    if number != number.to_integral_value() or number < 0:
+        raise ValueError(f"{column}: {value!r} is not a whole number")
+    return int(number)
+
+
+def _bool(value, column):
+    value = _text(value).lower()
+    if value in MISSING:
+        return None
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError(f"{column}: {value!r} is not a boolean")
+
+
+def _values(row, columns, categories, image_names):
+    """Field values for one CSV row; raises ValueError for a bad row."""
+    name = _text(row.get("name"))
+    if not name:
+        raise ValueError("name is required")
+    values = {"name": name}
+    for column in ("brand", "description"):
+        if column in columns:
+            values[column] = _text(row[column])
+    if "category__name" in columns:
+        category = _text(row["category__name"])
+        if category and category not in categories:
+            raise ValueError(f"category__name: unknown category {category!r}")
+        values["category_id"] = categories[category] if category else None
+    for column, parse in (("price", _decimal), ("stock", _int), ("rating", _decimal), ("is_active", _bool)):
+        if column in columns:
+            value = parse(row[column], column)
+            if value is not None:
+                values[column] = value
+    if "image" in columns:
+        image = normalize_image_path(row["image"])
+        values["image"] = image if image in image_names else None
+    return values
+
+
+def _resolve_categories(chunk, categories, create=False):
+    """
+    Add the chunk's unseen category names to ``categories`` with one query
+    (two more when ``create`` inserts the missing ones).
+    """
+    wanted = {_text(row.get("category__name")) for _, row in chunk} - categories.keys() - {""}
+    if wanted:
+        categories.update(Category.objects.filter(name__in=wanted).values_list("name", "id"))
+        new = wanted - categories.keys()
+        if create and new:
+            Category.objects.bulk_create([Category(name=name) for name in new], ignore_conflicts=True)
+            categories.update(Category.objects.filter(name__in=new).values_list("name", "id"))
+
+
+def _existing_images(chunk):
+    """The chunk's image names that exist in storage, checked like ``ImageWidget.clean``."""
+    names = {normalize_image_path(row.get("image")) for _, row in chunk} - {""}
+    return {name for name in names if default_storage.exists(name)}
+
+
+def _import_chunk(chunk, columns, update_fields, categories, image_names, result, create_categories=False):
+    _resolve_categories(chunk, categories, create_categories)
+
+    by_name = {}
+    for line, row in chunk:
+        try:
+            values = _values(row, columns, categories, image_names)
+        except ValueError as exc:
+            result.error(line, str(exc))
+            continue
+        if values["name"] in by_name:
+            result.skipped += 1  # Later rows for the same name win, as in a row-by-row import.
+        by_name[values["name"]] = values
+    if not by_name:
+        return
+
+    existing = {
+        name: (pk, variants)
+        for name, pk, variants in Product.objects.filter(name__in=by_name).values_list("name", "id", "image_variants")
+    }
+    products = []
+    for name, values in by_name.items():
+        pk, variants = existing.get(name, (None, {}))
+        products.append(Product(pk=pk, image_variants=variants, **values))
+
+    with transaction.atomic():
+        Product.objects.bulk_create(
+            products, update_conflicts=True, unique_fields=["id"], update_fields=update_fields,
+        )
+        if "image" in columns:
+            images.request_derivatives_many(products)
+
+    updated = sum(1 for name in by_name if name in existing)
+    result.updated += updated
+    result.created += len(by_name) - updated
+
+
+def import_products(fileobj, chunk_size=CHUNK_SIZE):
+    """Import a ProductResource-style CSV from a text file object; returns an ``ImportResult``."""
+    start = time.perf_counter()
+    result = ImportResult()
+    reader = csv.DictReader(fileobj)
+    columns = {c.strip() for c in reader.fieldnames or ()}
+    if "name" not in columns:
+        raise ValueError("The file needs a 'name' column")
+    reader.fieldnames = [c.strip() for c in reader.fieldnames]
+    update_fields = [COLUMN_FIELDS[c] for c in COLUMN_FIELDS if c in columns and c != "name"] + ["updated_at"]
+
+    categories = {}
+    image_names = scan_images() if "image" in columns else set()
+    # Line numbers count the header as line 1.
+    rows = enumerate(reader, start=2)
+    while chunk := list(itertools.islice(rows, chunk_size)):
+        _import_chunk(chunk, columns, update_fields, categories, image_names, result)
+
+    if result.created or result.updated:
+        catalog_cache.bump_version()
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+_DONE = object()
+_TIMEOUT = object()
+
+
+def _batches(records, size, max_wait):
+    """
+    Lists of up to ``size`` records, also cut ``max_wait`` seconds after a
+    batch's first record so a slow producer's items aren't held back. The
+    producer runs on its own thread behind a bounded queue, so memory stays
+    at about two batches however long the stream is.
+    """
+    buffer = queue.Queue(maxsize=size)
+    stopped = threading.Event()
+    failure = []
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for record in records:
+                if not put(record):
+                    return
+        except Exception as exc:
+            failure.append(exc)
+        put(_DONE)
+
+    threading.Thread(target=produce, daemon=True).start()
+    batch, deadline = [], None
+    try:
+        while True:
+            try:
+                item = buffer.get(timeout=None if deadline is None else max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                item = _TIMEOUT
+            if item is _DONE:
+                break
+            if item is not _TIMEOUT:
+                batch.append(item)
+                deadline = deadline or time.monotonic() + max_wait
+            if batch and (item is _TIMEOUT or len(batch) >= size):
+                yield batch
+                batch, deadline = [], None
+        if batch:
+            yield batch
+        if failure:
+            raise failure[0]
+    finally:
+        stopped.set()
+
+
+def ingest_products(records, chunk_size=INGEST_CHUNK_SIZE, max_wait=INGEST_MAX_WAIT, create_categories=True):
+    """
+    Upsert product dicts keyed like the CSV columns (extra keys such as
+    ``image_url`` are ignored) from any iterable; returns an ``ImportResult``
+    whose error line numbers count records from 1. Unknown categories are
+    created unless ``create_categories`` is False. ``stock`` is written for
+    new products only, so re-ingesting a scrape never overwrites stock the
+    shop has sold down or restocked since.
+    """
+    start = time.perf_counter()
+    result = ImportResult()
+    categories = {}
+    position = 1
+    for batch in _batches(records, chunk_size, max_wait):
+        # Records only write the columns they have, so a sparse record can't blank a field;
+        # a scraper's records all share one shape, so this is normally a single group.
+        groups = {}
+        for line, record in enumerate(batch, start=position):
+            groups.setdefault(frozenset(COLUMN_FIELDS.keys() & record.keys()), []).append((line, record))
+        position += len(batch)
+
+        written = result.created + result.updated
+        for columns, chunk in groups.items():
+            update_fields = [
+                COLUMN_FIELDS[c] for c in COLUMN_FIELDS if c in columns - INGEST_CREATE_ONLY and c != "name"
+            ] + ["updated_at"]
+            image_names = _existing_images(chunk) if "image" in columns else set()
+            _import_chunk(chunk, columns, update_fields, categories, image_names, result, create_categories)
+        if result.created + result.updated > written:
+            catalog_cache.bump_version()
+
+    result.seconds = time.perf_counter() - start
+    return result
@@ -0,0 +1,217 @@
+"""
+Sharded stock counters for flash-sale products, and the short-lived stock
+cache catalog responses read their ``stock`` from.
+
+A product with ``stock_shards = K`` keeps its stock in K ``StockShard``
+rows. A decrement hits one randomly chosen shard and only falls back to
+the others when that shard runs short, so concurrent checkouts for the
+same SKU spread over K rows instead of queueing on one. ``Product.stock``
+is a copy of the total synced by the rebalance job, at most once per
+``SYNC_DELAY_SECONDS`` per product; reads that must be exact go through
+``stock_levels``.
+
+Checkouts don't invalidate the catalog cache. Cached product payloads get
+their ``stock`` refreshed from ``cached_stock`` (``STOCK_CACHE_SECONDS``)
+when served, and a checkout drops its products' entries on commit.
+"""
+import random
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+
+from . import jobs
+from .models import Product, StockShard
+
+REBALANCE_JOB = "inventory.rebalance"
+STOCK_CACHE_SECONDS = 2
+SYNC_DELAY_SECONDS = 10
+# Shorter than the delay, so a checkout that skips enqueueing commits before the pending sync runs.
+SYNC_WINDOW_SECONDS = 5
+
+
+def _stock_key(product_id):
+    return f"stock:level:{product_id}"
+
+
+def _sync_key(product_id):
+    return f"stock-shards:sync:{product_id}"
+
+
+def split(total, shards):
+    base, extra = divmod(total, shards)
+    return [base + (1 if i < extra else 0) for i in range(shards)]
+
+
+def _shard_totals(product_ids):
+    return dict(
+        StockShard.objects.filter(product_id__in=product_ids)
+        .values("product_id").annotate(total=Sum("stock")).values_list("product_id", "total")
+    )
+
+
+def stock_levels(product_ids):
+    """Exact ``{product_id: stock}``, summing shards for sharded products."""
+    rows = list(Product.objects.filter(pk__in=product_ids).values_list("pk", "stock", "stock_shards"))
+    sharded = [pk for pk, _, shards in rows if shards]
+    totals = _shard_totals(sharded) if sharded else {}
+    return {pk: totals.get(pk, 0) if shards else stock for pk, stock, shards in rows}
+
+
+def _stock_query(product_ids):
+    """(pk, stock) rows, with the shard total in place of ``stock`` for sharded products, in one query."""
+    shard_total = (
+        StockShard.objects.filter(product=OuterRef("pk")).order_by()
+        .values("product").annotate(total=Sum("stock")).values("total")
+    )
+    return Product.objects.filter(pk__in=product_ids).annotate(shard_total=Subquery(shard_total)).values_list(
+        "pk", "stock", "stock_shards", "shard_total"
+    )
+
+
+def _level(stock, shards, shard_total):
+    return (shard_total or 0) if shards else stock
+
+
+def cached_stock(product_ids):
+    """``{product_id: stock}`` for display, cached for a couple of seconds; one query for the ones not cached."""
+    keys = {_stock_key(pid): pid for pid in product_ids}
+    levels = {keys[key]: level for key, level in cache.get_many(keys).items()}
+    missing = [pid for pid in product_ids if pid not in levels]
+    if missing:
+        fresh = {pk: _level(*row) for pk, *row in _stock_query(missing)}
+        cache.set_many({_stock_key(pid): level for pid, level in fresh.items()}, STOCK_CACHE_SECONDS)
+        levels.update(fresh)
+    return levels
+
+
+async def acached_stock(product_ids):
+    """``cached_stock`` for async views."""
+    keys = {_stock_key(pid): pid for pid in product_ids}
+    levels = {keys[key]: level for key, level in (await cache.aget_many(keys)).items()}
+    missing = [pid for pid in product_ids if pid not in levels]
+    if missing:
+        fresh = {pk: _level(*row) async for pk, *row in _stock_query(missing)}
+        await cache.aset_many({_stock_key(pid): level for pid, level in fresh.items()}, STOCK_CACHE_SECONDS)
+        levels.update(fresh)
+    return levels
+
+
+def cached_total(product_id):
+    """``cached_stock`` for one product (0 if it doesn't exist)."""
+    return cached_stock([product_id]).get(product_id, 0)
+
+
+def _loaded(products):
+    """Stock of freshly loaded plain products, to cache without another query, and the sharded ids."""
+    plain = {p.pk: p.stock for p in products if not p.stock_shards}
+    return plain, [p.pk for p in products if p.stock_shards]
+
+
+def display_stock(products):
+    """
+    ``{pk: stock}`` for loaded products, as the serializer's ``stock_totals``:
+    plain products from the row just read (which also refreshes the cache),
+    sharded ones through ``cached_stock``.
+    """
+    plain, sharded = _loaded(products)
+    cache.set_many({_stock_key(pk): level for pk, level in plain.items()}, STOCK_CACHE_SECONDS)
+    return {**plain, **(cached_stock(sharded) if sharded else {})}
+
+
+async def adisplay_stock(products):
+    plain, sharded = _loaded(products)
+    await cache.aset_many({_stock_key(pk): level for pk, level in plain.items()}, STOCK_CACHE_SECONDS)
+    return {**plain, **(await acached_stock(sharded) if sharded else {})}
+
+
+def refresh_stock(payloads):
+    """Overwrite ``stock`` in cached product payloads with ``cached_stock``."""
+    levels = cached_stock([payload["id"] for payload in payloads])
+    for payload in payloads:
+        payload["stock"] = levels.get(payload["id"], payload["stock"])
+    return payloads
+
+
+async def arefresh_stock(payloads):
+    levels = await acached_stock([payload["id"] for payload in payloads])
+    for payload in payloads:
+        payload["stock"] = levels.get(payload["id"], payload["stock"])
+    return payloads
+
+
+def forget_stock(product_ids):
+    """Drop cached levels after the stock changed (this process; others expire within seconds)."""
+    cache.delete_many([_stock_key(pid) for pid in product_ids])
+
+
+def set_sharding(product, shards):
+    """Move a product's stock into ``shards`` counters (0 folds it back into ``Product.stock``)."""
+    with transaction.atomic():
+        total = stock_levels([product.pk])[product.pk]
+        StockShard.objects.filter(product=product).delete()
+        if shards:
+            StockShard.objects.bulk_create(
+                [StockShard(product=product, index=i, stock=units) for i, units in enumerate(split(total, shards))]
+            )
+        Product.objects.filter(pk=product.pk).update(stock=total, stock_shards=shards)
+    forget_stock([product.pk])
+    product.stock, product.stock_shards = total, shards
+
+
+def take(product_id, quantity, shards):
+    """
+    Remove ``quantity`` units from a sharded product. Tries one random shard,
+    then the others, and finally drains across shards. Returns False when the
+    total is short; the caller's transaction must then be rolled back.
+    """
+    start = random.randrange(shards)
+    for offset in range(shards):
+        index = (start + offset) % shards
+        if StockShard.objects.filter(product_id=product_id, index=index, stock__gte=quantity).update(stock=F("stock") - quantity):
+            if offset:
+                request_rebalance(product_id)
+            return True
+
+    remaining = quantity
+    for shard_id, units in StockShard.objects.filter(product_id=product_id, stock__gt=0).order_by("-stock").values_list("id", "stock"):
+        step = min(units, remaining)
+        if StockShard.objects.filter(pk=shard_id, stock__gte=step).update(stock=F("stock") - step):
+            remaining -= step
+        if not remaining:
+            request_rebalance(product_id)
+            return True
+    return False
+
+
+def request_rebalance(product_id):
+    transaction.on_commit(lambda: forget_stock([product_id]))
+    jobs.enqueue(REBALANCE_JOB, {"product_id": product_id})
+
+
+def schedule_sync(product_id):
+    """
+    Queue a delayed rebalance after a checkout took from the shards. While
+    one is pending for the product, later checkouts don't queue another, so
+    a burst of sales writes the product row once instead of every time.
+    """
+    if cache.get(_sync_key(product_id)):
+        return
+    jobs.enqueue(REBALANCE_JOB, {"product_id": product_id}, delay=SYNC_DELAY_SECONDS)
+    transaction.on_commit(lambda: cache.set(_sync_key(product_id), 1, SYNC_WINDOW_SECONDS))
+
+
+@jobs.handler(REBALANCE_JOB)
+def rebalance(payload):
+    """Spread the product's stock evenly over its shards again and sync ``Product.stock``."""
+    product_id = payload["product_id"]
+    with transaction.atomic():
+        shards = list(StockShard.objects.filter(product_id=product_id).order_by("index"))
+        if not shards:
+            return
+        total = sum(shard.stock for shard in shards)
+        for shard, units in zip(shards, split(total, len(shards))):
+            shard.stock = units
+        StockShard.objects.bulk_update(shards, ["stock"])
+        Product.objects.filter(pk=product_id).update(stock=total)
+    forget_stock([product_id])
@@ -0,0 +1,152 @@
+"""
+Durable background jobs stored in the ``Job`` table.
+
+Producers call ``enqueue`` (inside their own transaction, so a job exists
+iff the work that triggered it was committed). Workers ``claim`` a batch
+by stamping a lease on it; a worker that dies simply lets the lease expire
+and the job is claimed again. Failures are retried with exponential
+backoff until ``max_attempts``.
+"""
+import logging
+import random
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+LEASE_SECONDS = 60
+BACKOFF_BASE_SECONDS = 2
+BACKOFF_MAX_SECONDS = 600
+
+
+def handler(kind):
+    """Register ``func(payload)`` as the handler for jobs of ``kind``."""
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def enqueue(kind, payload=None, delay=0, max_attempts=5):
+    return Job.objects.create(
+        kind=kind,
+        payload=payload or {},
+        run_after=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts,
+    )
+
+
+def enqueue_many(kind, payloads, max_attempts=5):
+    """One INSERT for many jobs of the same kind, ready now."""
+    now = timezone.now()
+    return Job.objects.bulk_create(
+        [Job(kind=kind, payload=payload, run_after=now, max_attempts=max_attempts) for payload in payloads]
+    )
+
+
+def _ready(now):
+    return Q(status="queued", run_after__lte=now) | Q(status="running", locked_until__lt=now)
+
+
+def claim(worker_id, batch_size=10, lease_seconds=LEASE_SECONDS):
+    """Lease up to ``batch_size`` ready jobs (including ones whose lease expired) to ``worker_id``."""
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(Job.objects.filter(_ready(now)).order_by("run_after", "id").values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return []
+        # Re-check readiness in the UPDATE so two workers can't take the same job.
+        Job.objects.filter(_ready(now), id__in=ids).update(
+            status="running",
+            locked_by=worker_id,
+            locked_until=now + timedelta(seconds=lease_seconds),
+            updated_at=now,
+        )
+        return list(Job.objects.filter(id__in=ids, status="running", locked_by=worker_id, updated_at=now))
+
+
+def backoff(attempt):
+    delay = min(BACKOFF_BASE_SECONDS * 2 ** (attempt - 1), BACKOFF_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def run_job(job):
+    """Execute one claimed job and record the outcome; returns True on success."""
+    job.attempts += 1
+    try:
+        func = HANDLERS[job.kind]
+        func(job.payload)
+    except Exception as exc:
+        job.last_error = "".join(traceback.format_exception(exc))[-4000:]
+        if job.attempts >= job.max_attempts:
+            job.status = "failed"
+            logger.error("Job %s (%s) failed permanently: %s", job.id, job.kind, exc)
+        else:
+            job.status = "queued"
+            job.run_after = timezone.now() + timedelta(seconds=backoff(job.attempts))
+        ok = False
+    else:
+        job.status = "done"
+        job.last_error = ""
+        ok = True
+    job.locked_by = ""
+    job.locked_until = None
+    job.save(update_fields=["attempts", "status", "last_error", "run_after", "locked_by", "locked_until", "updated_at"])
+    return ok
+
+
+def run_pending(worker_id="inline", batch_size=10):
+    """Claim and run one batch; returns the number of jobs processed."""
+    jobs = claim(worker_id, batch_size)
+    for job in jobs:
+        run_job(job)
+    return len(jobs)
+
+
+class WorkerPool:
+    """``size`` threads that poll the job table until ``stop()`` is called."""
+
+    def __init__(self, size=4, poll_interval=1.0, batch_size=10, name="worker"):
+        self.size = size
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.name = name
+        self._stop = threading.Event()
+        self._threads = []
+
+    def _loop(self, worker_id):
+        while not self._stop.is_set():
+            close_old_connections()
+            try:
+                processed = run_pending(worker_id, self.batch_size)
+            except Exception:
+                logger.exception("Worker %s crashed while claiming jobs", worker_id)
+                processed = 0
+            if not processed:
+                self._stop.wait(self.poll_interval)
+        connection.close()
+
+    def start(self):
+        for i in range(self.size):
+            thread = threading.Thread(target=self._loop, args=(f"{self.name}-{i}",), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def wait(self):
+        while any(t.is_alive() for t in self._threads):
+            time.sleep(0.5)
@@ -0,0 +1,31 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from shop import exporting
+
+
+class ExportCommand(BaseCommand):
+    """Shared options for export_catalog / export_orders; subclasses set ``kind``."""
+    kind = None
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=exporting.FORMATS, default="csv")
+        parser.add_argument("--gzip", action="store_true", help="Compress the output with gzip.")
+        parser.add_argument("--output", "-o", help="File to write (default: stdout).")
+        parser.add_argument("--chunk-size", type=int, default=exporting.CHUNK_SIZE, help="Rows fetched per query.")
+
+    def handle(self, *args, **options):
+        chunks = exporting.export(self.kind, options["format"], gzip=options["gzip"], chunk_size=options["chunk_size"])
+        written = 0
+        if options["output"]:
+            with open(options["output"], "wb") as fh:
+                for chunk in chunks:
+                    fh.write(chunk)
+                    written += len(chunk)
+            self.stderr.write(self.style.SUCCESS(f"Wrote {written} bytes to {options['output']}."))
+        else:
+            out = sys.stdout.buffer
+            for chunk in chunks:
+                out.write(chunk)
+            out.flush()
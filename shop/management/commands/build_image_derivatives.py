@@ -0,0 +1,41 @@
+import time
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from shop import images, resizing
+from shop.models import Product
+
+
+class Command(BaseCommand):
+    help = "Build responsive derivatives for existing media/products/ images in parallel."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, help="Resize processes (default: PRODUCT_IMAGE_WORKERS, 0 = inline).")
+        parser.add_argument("--force", action="store_true", help="Rebuild images that already have current derivatives.")
+
+    def handle(self, *args, **options):
+        _, files = default_storage.listdir("products")
+        sources = {f"products/{name}" for name in files}
+        if not options["force"]:
+            current = {p.image.name for p in Product.objects.exclude(image="").only("image", "image_variants") if images.is_current(p)}
+            sources -= current
+        if not sources:
+            self.stdout.write("Nothing to build.")
+            return
+
+        built = failed = updated = 0
+        start = time.perf_counter()
+        for source, variants in resizing.build(sorted(sources), workers=options["workers"]):
+            if isinstance(variants, Exception):
+                failed += 1
+                self.stderr.write(f"{source}: {variants}")
+                continue
+            built += 1
+            updated += images.record(variants)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Built derivatives for {built} image(s) in {elapsed:.1f}s "
+            f"({built / elapsed if elapsed else built:.1f}/s), {failed} failed, {updated} product(s) updated."
+        ))
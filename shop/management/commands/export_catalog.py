@@ -0,0 +1,6 @@
+from ._export import ExportCommand
+
+
+class Command(ExportCommand):
+    help = "Stream all products as CSV/JSONL in ProductResource's columns (re-importable)."
+    kind = "products"
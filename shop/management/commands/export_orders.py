@@ -0,0 +1,6 @@
+from ._export import ExportCommand
+
+
+class Command(ExportCommand):
+    help = "Stream all orders as CSV (one row per item) or JSONL (one order per line)."
+    kind = "orders"
@@ -0,0 +1,36 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from shop import cache as catalog_cache
+from shop import images
+from shop.models import Product
+from shop.storage import verified_hash
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy product images with legacy (unhashed) names to content-hashed names and repoint products. "
+        "The old files are kept because order snapshots may still reference them."
+    )
+
+    def handle(self, *args, **options):
+        legacy = {
+            name for name in Product.objects.exclude(image="").exclude(image__isnull=True).values_list("image", flat=True).distinct()
+            if not default_storage.exists(name) or not verified_hash(default_storage.path(name), name)
+        }
+        renamed = missing = 0
+        for old in sorted(legacy):
+            if not default_storage.exists(old):
+                missing += 1
+                self.stderr.write(f"Missing file: {old}")
+                continue
+            with default_storage.open(old, "rb") as fh:
+                new = default_storage.save(old, fh)
+            Product.objects.filter(image=old).update(image=new)
+            for product in Product.objects.filter(image=new).only("id", "image", "image_variants"):
+                images.request_derivatives(product)
+            renamed += 1
+
+        if renamed:
+            catalog_cache.bump_version()
+        self.stdout.write(self.style.SUCCESS(f"Renamed {renamed} image(s), {missing} missing."))
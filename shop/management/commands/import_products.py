@@ -0,0 +1,31 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from shop.importing import CHUNK_SIZE, import_products
+
+
+class Command(BaseCommand):
+    help = "Stream a ProductResource-format CSV into the catalog in chunks (matched on product name)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file, or - for stdin.")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Rows per upsert.")
+        parser.add_argument("--encoding", default="utf-8-sig")
+
+    def handle(self, *args, **options):
+        try:
+            if options["path"] == "-":
+                result = import_products(sys.stdin, options["chunk_size"])
+            else:
+                with open(options["path"], newline="", encoding=options["encoding"]) as fh:
+                    result = import_products(fh, options["chunk_size"])
+        except (OSError, ValueError) as exc:
+            raise CommandError(exc)
+
+        for line, message in result.errors:
+            self.stderr.write(f"line {line}: {message}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{result.created} created, {result.updated} updated, {result.skipped} skipped "
+            f"in {result.seconds:.1f}s ({result.rows_per_second:.0f} rows/s)."
+        ))
@@ -0,0 +1,48 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from shop.importing import INGEST_CHUNK_SIZE, INGEST_MAX_WAIT, ingest_products
+
+
+def read_jsonl(fh):
+    for line in fh:
+        if line.strip():
+            yield json.loads(line)
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream scraped products (JSON Lines, one product per line, keyed like the import CSV) into the catalog. "
+        "Reads stdin as it arrives, so a scraper can pipe straight in."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="JSONL file, or - for stdin.")
+        parser.add_argument("--chunk-size", type=int, default=INGEST_CHUNK_SIZE, help="Products per transaction.")
+        parser.add_argument("--max-wait", type=float, default=INGEST_MAX_WAIT,
+                            help="Commit a partial batch after this many seconds.")
+        parser.add_argument("--no-create-categories", action="store_true", help="Skip products with unknown categories.")
+
+    def handle(self, *args, **options):
+        kwargs = {
+            "chunk_size": options["chunk_size"],
+            "max_wait": options["max_wait"],
+            "create_categories": not options["no_create_categories"],
+        }
+        try:
+            if options["path"] == "-":
+                result = ingest_products(read_jsonl(sys.stdin), **kwargs)
+            else:
+                with open(options["path"], encoding="utf-8") as fh:
+                    result = ingest_products(read_jsonl(fh), **kwargs)
+        except (OSError, ValueError) as exc:
+            raise CommandError(exc)
+
+        for line, message in result.errors:
+            self.stderr.write(f"product {line}: {message}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{result.created} created, {result.updated} updated, {result.skipped} skipped "
+            f"in {result.seconds:.1f}s ({result.rows_per_second:.0f} rows/s)."
+        ))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from shop.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the product full-text search index from the shop_product table."
+
+    def handle(self, *args, **options):
+        if not rebuild_index():
+            raise CommandError("Full-text index is only available on the SQLite backend.")
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
@@ -0,0 +1,35 @@
+import os
+import socket
+
+from django.core.management.base import BaseCommand
+
+from shop import checkout  # noqa: F401  (registers the order job handlers)
+from shop.jobs import WorkerPool, run_pending
+
+
+class Command(BaseCommand):
+    help = "Run background workers that process queued order jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4, help="Number of worker threads.")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument("--batch-size", type=int, default=10, help="Jobs claimed per lease.")
+        parser.add_argument("--once", action="store_true", help="Drain ready jobs once and exit.")
+
+    def handle(self, *args, **options):
+        name = f"{socket.gethostname()}-{os.getpid()}"
+        if options["once"]:
+            total = 0
+            while processed := run_pending(name, options["batch_size"]):
+                total += processed
+            self.stdout.write(self.style.SUCCESS(f"Processed {total} job(s)."))
+            return
+
+        pool = WorkerPool(options["workers"], options["poll_interval"], options["batch_size"], name=name)
+        pool.start()
+        self.stdout.write(f"Started {options['workers']} order worker(s) as {name}. Ctrl+C to stop.")
+        try:
+            pool.wait()
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping workers...")
+            pool.stop()
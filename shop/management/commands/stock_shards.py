@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from shop import inventory
+from shop.models import Product
+
+
+class Command(BaseCommand):
+    help = "Enable/disable sharded stock counters for products, or rebalance their shards."
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["enable", "disable", "rebalance"])
+        parser.add_argument("product_ids", nargs="*", type=int, help="Defaults to every sharded product for rebalance.")
+        parser.add_argument("--shards", type=int, default=8, help="Counters per product when enabling.")
+
+    def handle(self, *args, **options):
+        action, ids = options["action"], options["product_ids"]
+        if action == "rebalance":
+            qs = Product.objects.filter(stock_shards__gt=0)
+            if ids:
+                qs = qs.filter(pk__in=ids)
+            for pk in qs.values_list("pk", flat=True):
+                inventory.rebalance({"product_id": pk})
+            self.stdout.write(self.style.SUCCESS(f"Rebalanced {qs.count()} product(s)."))
+            return
+
+        if not ids:
+            raise CommandError("Pass the product ids to change.")
+        if action == "enable" and options["shards"] < 1:
+            raise CommandError("--shards must be at least 1.")
+        shards = options["shards"] if action == "enable" else 0
+        for product in Product.objects.filter(pk__in=ids):
+            inventory.set_sharding(product, shards)
+            self.stdout.write(f"{product.name}: {product.stock} unit(s) across {shards or 'no'} shard(s).")
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from shop.reservations import release_expired
+
+
+class Command(BaseCommand):
+    help = "Release expired stock holds in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--interval", type=float, default=30.0, help="Seconds between sweeps.")
+        parser.add_argument("--once", action="store_true", help="Sweep once and exit.")
+
+    def handle(self, *args, **options):
+        while True:
+            removed = release_expired(options["batch_size"])
+            if removed or options["verbosity"] > 1:
+                self.stdout.write(f"Released {removed} expired hold(s).")
+            if options["once"]:
+                return
+            time.sleep(options["interval"])
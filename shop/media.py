@@ -0,0 +1,125 @@
+"""
+Media serving with HTTP caching and byte ranges.
+
+Content-hashed names (see shop/storage.py) never change meaning, so they
+are served with ``Cache-Control: immutable`` and a far-future ``Expires``
+and the hash doubles as the ETag. The hash is checked against the bytes
+first (once per file version per process); legacy names, including ones
+that merely look hashed, get a validator from mtime/size and must be
+revalidated. Single ``Range`` requests are
+answered with 206 (``If-Range`` aware); multi-range requests get the
+whole file, which RFC 9110 allows.
+"""
+import mimetypes
+import os
+import re
+import time
+from functools import lru_cache
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+from .storage import verified_hash
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+
+@lru_cache(maxsize=4096)
+def _content_hash(path, name, mtime_ns, size):
+    # mtime/size are part of the key so a replaced file is checked again.
+    return verified_hash(path, name)
+
+
+def _etag(digest, stat):
+    if digest:
+        return quote_etag(digest)
+    return quote_etag(f"{int(stat.st_mtime)}-{stat.st_size}")
+
+
+def parse_range(header, size):
+    """
+    ``(start, end)`` inclusive for a single satisfiable byte range, None to
+    serve the whole file, or ``False`` when the range can't be satisfied.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or (last and int(last) < start):
+        return False
+    return start, end
+
+
+def _read(path, start, length):
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        while length > 0:
+            chunk = fh.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _cache_headers(response, digest, etag, stat):
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    response["Accept-Ranges"] = "bytes"
+    if digest:
+        response["Cache-Control"] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+        response["Expires"] = http_date(time.time() + IMMUTABLE_MAX_AGE)
+    else:
+        response["Cache-Control"] = "public, no-cache"
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        full_path = default_storage.path(path)
+    except (SuspiciousFileOperation, NotImplementedError):
+        raise Http404("Not found")
+    if not os.path.isfile(full_path):
+        raise Http404("Not found")
+
+    stat = os.stat(full_path)
+    digest = _content_hash(full_path, path, stat.st_mtime_ns, stat.st_size)
+    etag = _etag(digest, stat)
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is not None:
+        return _cache_headers(response, digest, etag, stat)
+
+    content_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+    if_range = request.headers.get("If-Range")
+    byte_range = None
+    if not if_range or if_range.strip() == etag:
+        byte_range = parse_range(request.headers.get("Range"), stat.st_size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{stat.st_size}"
+        return _cache_headers(response, digest, etag, stat)
+
+    if byte_range is None:
+        response = FileResponse(open(full_path, "rb"), content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(_read(full_path, start, end - start + 1), status=206, content_type=content_type)
+        response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+        response["Content-Length"] = str(end - start + 1)
+    return _cache_headers(response, digest, etag, stat)
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:01
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_summaries(apps, schema_editor):
+    Order = apps.get_model("shop", "Order")
+    OrderItem = apps.get_model("shop", "OrderItem")
+    last_id, batch_size = 0, 500
+    while True:
+        orders = list(Order.objects.filter(id__gt=last_id).order_by("id")[:batch_size])
+        if not orders:
+            return
+        ids = [o.id for o in orders]
+        counts = dict(
+            OrderItem.objects.filter(order_id__in=ids).values("order_id")
+            .annotate(n=Sum("quantity")).values_list("order_id", "n")
+        )
+        thumbs = {}
+        for order_id, image in (
+            OrderItem.objects.filter(order_id__in=ids).order_by("order_id", "id").values_list("order_id", "product__image")
+        ):
+            thumbs.setdefault(order_id, image or "")
+        for order in orders:
+            order.item_count = counts.get(order.id) or 0
+            order.thumbnail = thumbs.get(order.id, "")
+        Order.objects.bulk_update(orders, ["item_count", "thumbnail"])
+        last_id = ids[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0008_stock_shards'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='thumbnail',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', '-ordered_at', '-id'], name='order_user_ordered_idx'),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
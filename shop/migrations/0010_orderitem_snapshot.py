@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:03
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def backfill_snapshots(apps, schema_editor):
+    """Copy product data onto existing order items, BATCH_SIZE rows at a time."""
+    OrderItem = apps.get_model("shop", "OrderItem")
+    last_id = 0
+    while True:
+        rows = list(
+            OrderItem.objects.filter(id__gt=last_id).order_by("id")
+            .values_list("id", "product__name", "product__brand", "product__image", "product__category__name")[:BATCH_SIZE]
+        )
+        if not rows:
+            return
+        items = [
+            OrderItem(id=pk, product_name=name or "", product_brand=brand or "", product_image=image or "", category_name=category or "")
+            for pk, name, brand, image, category in rows
+        ]
+        OrderItem.objects.bulk_update(items, ["product_name", "product_brand", "product_image", "category_name"])
+        last_id = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0009_order_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='category_name',
+            field=models.CharField(blank=True, max_length=120),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_brand',
+            field=models.CharField(blank=True, max_length=120),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_image',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.RunPython(backfill_snapshots, migrations.RunPython.noop),
+    ]
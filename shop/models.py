@@ -1,6 +1,8 @@
 from decimal import Decimal
 from django.db import models
+from django.db.models import DecimalField, F, Prefetch, Sum
 from django.conf import settings
+from django.utils import timezone
 
 User = settings.AUTH_USER_MODEL  # usually "auth.User"
 
@@ -8,6 +10,7 @@ User = settings.AUTH_USER_MODEL  # usually "auth.User"
 class Category(models.Model):
     name = models.CharField(max_length=120, unique=True)
     description = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -20,25 +23,59 @@ class Product(models.Model):
     description = models.TextField(blank=True)
     price = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
     stock = models.PositiveIntegerField(default=0)
+    # 0 = stock lives in ``stock``; K > 0 = stock is split across K StockShard rows (see shop.inventory).
+    stock_shards = models.PositiveSmallIntegerField(default=0)
     image = models.ImageField(upload_to="products/", blank=True, null=True)
+    # Resized copies of ``image`` for srcset, filled in by shop.images.
+    image_variants = models.JSONField(default=dict, blank=True)
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.0)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Backs keyset pagination of the product list.
+            models.Index(fields=["-created_at", "-id"], name="product_created_id_idx"),
+            # Back the faceted filters on the product list.
+            models.Index(fields=["is_active", "category", "price"], name="product_active_cat_price_idx"),
+            models.Index(fields=["is_active", "brand", "price"], name="product_active_brand_idx"),
+            models.Index(fields=["is_active", "price"], name="product_active_price_idx"),
+            models.Index(fields=["is_active", "rating"], name="product_active_rating_idx"),
+        ]
+
     def __str__(self):
         return self.name
 
 
+def _line_total(prefix=""):
+    return Sum(F(f"{prefix}quantity") * F(f"{prefix}product__price"), output_field=DecimalField(max_digits=12, decimal_places=2))
+
+
+class CartQuerySet(models.QuerySet):
+    def with_total(self):
+        """Annotate ``items_total`` so ``total_price()`` needs no query per cart."""
+        return self.annotate(items_total=_line_total("items__"))
+
+    def with_items(self):
+        """Annotate the total and prefetch items with product/category, so a cart costs two queries whatever its size."""
+        return self.with_total().prefetch_related(
+            Prefetch("items", queryset=CartItem.objects.select_related("product__category").order_by("id"))
+        )
+
+
 class Cart(models.Model):
     user = models.ForeignKey(User, related_name="carts", on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = CartQuerySet.as_manager()
+
     def total_price(self):
-        total = Decimal("0.00")
-        for item in self.items.all():
-            total += item.total_price()
-        return total
+        if hasattr(self, "items_total"):
+            total = self.items_total
+        else:
+            total = self.items.aggregate(total=_line_total())["total"]
+        return total or Decimal("0.00")
 
     def __str__(self):
         return f"Cart {self.id} - {self.user}"
@@ -85,6 +122,14 @@ class Order(models.Model):
     payment_status = models.CharField(max_length=20, choices=PAYMENT_STATUS, default="Pending")
     total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
     stripe_payment_intent = models.CharField(max_length=255, blank=True, null=True)
+    # Denormalized at checkout so order history pages never touch order items.
+    item_count = models.PositiveIntegerField(default=0)
+    thumbnail = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-ordered_at", "-id"], name="order_user_ordered_idx"),
+        ]
 
     def __str__(self):
         return f"Order {self.id} - {self.user}"
@@ -95,9 +140,87 @@ class OrderItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.PROTECT)
     quantity = models.PositiveIntegerField()
     unit_price = models.DecimalField(max_digits=12, decimal_places=2)
+    # Snapshot of the product as purchased; order reads never join the catalog.
+    product_name = models.CharField(max_length=255, blank=True)
+    product_brand = models.CharField(max_length=120, blank=True)
+    product_image = models.CharField(max_length=255, blank=True)
+    category_name = models.CharField(max_length=120, blank=True)
+
+    def take_snapshot(self, product):
+        self.product_name = product.name
+        self.product_brand = product.brand
+        self.product_image = product.image.name if product.image else ""
+        self.category_name = product.category.name if product.category_id else ""
+
+    def save(self, *args, **kwargs):
+        if not self.product_name and self.product_id:
+            self.take_snapshot(self.product)
+        super().save(*args, **kwargs)
 
     def total_price(self):
         return self.unit_price * self.quantity
 
     def __str__(self):
-        return f"{self.quantity} x {self.product.name}"
+        return f"{self.quantity} x {self.product_name}"
+
+
+class Job(models.Model):
+    """A unit of background work, claimed by workers with a time-limited lease."""
+    STATUS = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+
+    kind = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS, default="queued")
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_after"], name="job_status_run_after_idx"),
+        ]
+
+    def __str__(self):
+        return f"Job {self.id} {self.kind} ({self.status})"
+
+
+class StockHold(models.Model):
+    """Stock set aside for a cart until ``expires_at``; available stock is stock minus active holds."""
+    cart = models.ForeignKey(Cart, related_name="holds", on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, related_name="holds", on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("cart", "product")
+        indexes = [
+            models.Index(fields=["product", "expires_at"], name="hold_product_expires_idx"),
+            models.Index(fields=["expires_at"], name="hold_expires_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} held by cart {self.cart_id}"
+
+
+class StockShard(models.Model):
+    """One of ``Product.stock_shards`` counters whose sum is the product's stock."""
+    product = models.ForeignKey(Product, related_name="shards", on_delete=models.CASCADE)
+    index = models.PositiveSmallIntegerField()
+    stock = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("product", "index")
+
+    def __str__(self):
+        return f"{self.product_id}[{self.index}] = {self.stock}"
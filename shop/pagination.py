@@ -0,0 +1,99 @@
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on ("-<timestamp_field>", "-id"), newest first.
+
+    Each page is a single indexed range query (no OFFSET), so page N costs the
+    same as page 1. The cursor is an opaque base64 blob holding the
+    (timestamp, id) of the last row of the previous page.
+    """
+    cursor_query_param = "cursor"
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    timestamp_field = "created_at"
+
+    def get_params(self, request):
+        # DRF requests expose query_params; plain (async) Django requests only GET.
+        return getattr(request, "query_params", request.GET)
+
+    def is_requested(self, request):
+        params = self.get_params(request)
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def get_page_size(self, request):
+        try:
+            size = int(self.get_params(request).get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def encode_cursor(self, obj):
+        payload = json.dumps([getattr(obj, self.timestamp_field).isoformat(), obj.id])
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, request):
+        raw = self.get_params(request).get(self.cursor_query_param)
+        if not raw:
+            return None
+        try:
+            timestamp, pk = json.loads(base64.urlsafe_b64decode(raw.encode()))
+            return datetime.fromisoformat(timestamp), int(pk)
+        except (TypeError, ValueError):
+            raise NotFound("Invalid cursor")
+
+    def page_queryset(self, queryset, request):
+        """The ordered, cursor-filtered slice for this page, with one extra row to detect a next page."""
+        self.request = request
+        self.current_page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+
+        field = self.timestamp_field
+        queryset = queryset.order_by(f"-{field}", "-id")
+        if position is not None:
+            timestamp, pk = position
+            queryset = queryset.filter(Q(**{f"{field}__lt": timestamp}) | Q(**{field: timestamp, "id__lt": pk}))
+        return queryset[:self.current_page_size + 1]
+
+    def finish_page(self, rows):
+        self.has_next = len(rows) > self.current_page_size
+        page = rows[:self.current_page_size]
+        self.next_cursor = self.encode_cursor(page[-1]) if self.has_next else None
+        return page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.finish_page(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request):
+        return self.finish_page([row async for row in self.page_queryset(queryset, request)])
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_data(self, data):
+        return {
+            "next": self.get_next_link(),
+            "cursor": self.next_cursor,
+            "results": data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+
+class OrderKeysetPagination(KeysetPagination):
+    page_size = 10
+    timestamp_field = "ordered_at"
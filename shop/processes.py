@@ -0,0 +1,27 @@
+"""
+Process pools whose workers run with Django configured.
+
+Pools use the "spawn" start method, so a worker never inherits the
+parent's database connections or threads, and each worker calls
+``django.setup()`` once before its first task. Nothing Django-dependent
+is imported at module level: spawned workers import this module to find
+the initializer.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def _init_worker():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "e_commerce.settings")
+    import django
+    django.setup()
+
+
+def django_process_pool(workers):
+    """A ``ProcessPoolExecutor`` of ``workers`` spawned, Django-ready processes."""
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+    )
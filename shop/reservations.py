@@ -0,0 +1,78 @@
+"""
+Time-limited stock holds.
+
+Putting something in a cart inserts/updates a ``StockHold`` row instead of
+touching ``Product.stock``, so popular products don't turn into a hot row
+on every add-to-cart. Available stock is ``stock - sum(active holds)``;
+checkout turns the cart's own holds into the real decrement, and
+``release_expired`` (run by ``manage.py sweep_stock_holds``) clears holds
+that ran out.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .exceptions import OutOfStock
+from .inventory import stock_levels
+from .models import Product, StockHold
+
+
+def hold_ttl():
+    return timedelta(seconds=getattr(settings, "STOCK_HOLD_SECONDS", 15 * 60))
+
+
+def active_holds(product_ids, exclude_cart=None, now=None):
+    """``{product_id: units held}`` by unexpired holds, optionally ignoring one cart's own holds."""
+    qs = StockHold.objects.filter(product_id__in=product_ids, expires_at__gt=now or timezone.now())
+    if exclude_cart is not None:
+        qs = qs.exclude(cart=exclude_cart)
+    return dict(qs.values("product_id").annotate(total=Sum("quantity")).values_list("product_id", "total"))
+
+
+def available_stock(product_ids, exclude_cart=None, now=None):
+    held = active_holds(product_ids, exclude_cart, now)
+    return {pk: units - held.get(pk, 0) for pk, units in stock_levels(product_ids).items()}
+
+
+def reserve(cart, quantities):
+    """
+    Make the cart's holds match ``{product_id: quantity}`` (0 releases) and
+    restart their TTL. Raises ``OutOfStock`` without changing anything if
+    another cart's holds leave too little.
+    """
+    now = timezone.now()
+    wanted = {pk: qty for pk, qty in quantities.items() if qty > 0}
+    released = [pk for pk, qty in quantities.items() if qty <= 0]
+
+    with transaction.atomic():
+        if wanted:
+            available = available_stock(list(wanted), exclude_cart=cart, now=now)
+            short = [pk for pk, qty in wanted.items() if available.get(pk, 0) < qty]
+            if short:
+                raise OutOfStock(list(Product.objects.filter(pk__in=short).only("id", "name")))
+            StockHold.objects.bulk_create(
+                [StockHold(cart=cart, product_id=pk, quantity=qty, expires_at=now + hold_ttl()) for pk, qty in wanted.items()],
+                update_conflicts=True,
+                unique_fields=["cart", "product"],
+                update_fields=["quantity", "expires_at"],
+            )
+        if released:
+            StockHold.objects.filter(cart=cart, product_id__in=released).delete()
+
+
+def release_cart(cart):
+    StockHold.objects.filter(cart=cart).delete()
+
+
+def release_expired(batch_size=1000, now=None):
+    """Delete expired holds in batches of ``batch_size``; returns how many were removed."""
+    now = now or timezone.now()
+    removed = 0
+    while True:
+        ids = list(StockHold.objects.filter(expires_at__lte=now).values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return removed
+        removed += StockHold.objects.filter(id__in=ids).delete()[0]
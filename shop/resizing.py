@@ -0,0 +1,128 @@
+"""
+Resizing for product image derivatives, run in a process pool.
+
+This module must stay importable before ``django.setup()``: spawned pool
+workers unpickle ``generate`` by importing it, so
+no models are imported at module level here. See shop/images.py for the
+jobs and bookkeeping around it.
+"""
+import os
+import threading
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+from .processes import django_process_pool
+
+DERIVATIVES_DIR = "derivatives"
+DEFAULT_WIDTHS = (160, 320, 640, 1024)
+# Pillow format name -> (feature to check, file extension, save options)
+FORMATS = {
+    "WEBP": ("webp", "webp", {"quality": 80, "method": 4}),
+    "AVIF": ("avif", "avif", {"quality": 60}),
+    "JPEG": (None, "jpg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def widths():
+    return tuple(sorted(getattr(settings, "PRODUCT_IMAGE_WIDTHS", DEFAULT_WIDTHS)))
+
+
+def output_format():
+    """The configured format, or JPEG when this Pillow can't encode it."""
+    name = getattr(settings, "PRODUCT_IMAGE_FORMAT", "WEBP").upper()
+    feature = FORMATS.get(name, ("missing", None, None))[0]
+    if name not in FORMATS or (feature and not features.check(feature)):
+        return "JPEG"
+    return name
+
+
+def derivative_name(source, width, fmt):
+    stem, _ = os.path.splitext(source)
+    return f"{DERIVATIVES_DIR}/{stem}-{width}w.{FORMATS[fmt][1]}"
+
+
+def generate(source, target_widths, fmt):
+    """
+    Resize ``source`` (a storage name) to each width no wider than the
+    original, plus one at the original width when it is narrower than all
+    of them. Returns ``{"src": source, "widths": {"<w>": name}}``.
+
+    Stored names carry the content hash, so this never overwrites a file;
+    ``images.record`` deletes the derivatives a new set replaces.
+    """
+    with default_storage.open(source, "rb") as fh:
+        image = ImageOps.exif_transpose(Image.open(fh))
+        image.load()
+    if image.mode not in ("RGB", "RGBA") or (fmt == "JPEG" and image.mode == "RGBA"):
+        image = image.convert("RGB")
+
+    chosen = [w for w in target_widths if w <= image.width] or [image.width]
+    _, _, options = FORMATS[fmt]
+    result = {}
+    for width in chosen:
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        buffer = BytesIO()
+        resized.save(buffer, fmt, **options)
+        name = derivative_name(source, width, fmt)
+        result[str(width)] = default_storage.save(name, ContentFile(buffer.getvalue()))
+    return {"src": source, "widths": result}
+
+
+def _pool_size():
+    return getattr(settings, "PRODUCT_IMAGE_WORKERS", os.cpu_count() or 1)
+
+
+def executor():
+    """The shared resize pool, or None when resizing inline."""
+    global _executor
+    if not _pool_size():
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = django_process_pool(_pool_size())
+        return _executor
+
+
+def build(sources, target_widths=None, fmt=None, workers=None):
+    """
+    Yield ``(source, variants or exception)`` for each source, resized in
+    parallel on the shared pool, or on a dedicated pool of ``workers``
+    processes (0 = inline).
+    """
+    target_widths = target_widths or widths()
+    fmt = fmt or output_format()
+    if workers == 0 or (workers is None and not _pool_size()):
+        for source in sources:
+            try:
+                yield source, generate(source, target_widths, fmt)
+            except Exception as exc:
+                yield source, exc
+        return
+
+    pool = executor() if workers is None else django_process_pool(workers)
+    try:
+        futures = [(source, pool.submit(generate, source, target_widths, fmt)) for source in sources]
+        for source, future in futures:
+            try:
+                yield source, future.result()
+            except Exception as exc:
+                yield source, exc
+    finally:
+        if workers is not None:
+            pool.shutdown(wait=True)
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
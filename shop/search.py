@@ -0,0 +1,118 @@
+"""Product full-text search backed by the SQLite FTS5 index (see migration 0004)."""
+import re
+
+from django.db import connection, connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Product
+
+FTS_TABLE = "shop_product_fts"
+# bm25 column weights: name, brand, description.
+BM25_WEIGHTS = (10.0, 5.0, 1.0)
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def fts_available():
+    return connection.vendor == "sqlite"
+
+
+def build_match_expression(query):
+    """
+    Turn free text into a safe FTS5 expression: every token is quoted (so user
+    input can't inject FTS syntax) and matched as a prefix, ANDed together.
+    """
+    tokens = TOKEN_RE.findall(query.lower())
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def search_ids(query, limit, offset=0, active_only=True):
+    """Ids of products matching ``query``, best bm25 rank first."""
+    expression = build_match_expression(query)
+    if not expression:
+        return []
+    if not fts_available():
+        qs = Product.objects.filter(is_active=True) if active_only else Product.objects.all()
+        for token in TOKEN_RE.findall(query):
+            qs = qs.filter(Q(name__icontains=token) | Q(brand__icontains=token) | Q(description__icontains=token))
+        return list(qs.order_by("-rating", "id").values_list("id", flat=True)[offset:offset + limit])
+
+    weights = ", ".join(str(w) for w in BM25_WEIGHTS)
+    sql = (
+        f"SELECT f.rowid FROM {FTS_TABLE} f "
+        f"JOIN shop_product p ON p.id = f.rowid "
+        f"WHERE {FTS_TABLE} MATCH %s {'AND p.is_active ' if active_only else ''}"
+        f"ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s OFFSET %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [expression, limit, offset])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def match_filter(query):
+    """
+    ``Q`` for the products matching ``query``, as an unbounded subquery on
+    the FTS index (or ``icontains`` without it), for filtering querysets
+    such as the admin changelist.
+    """
+    expression = build_match_expression(query)
+    if not expression:
+        return Q(pk__in=[])
+    if not fts_available():
+        condition = Q()
+        for token in TOKEN_RE.findall(query):
+            condition &= Q(name__icontains=token) | Q(brand__icontains=token) | Q(description__icontains=token)
+        return condition
+    return Q(pk__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [expression]))
+
+
+def search_products(query, limit, offset=0):
+    """Matching products (with category) in rank order."""
+    ids = search_ids(query, limit, offset)
+    products = Product.objects.select_related("category").in_bulk(ids)
+    return [products[pk] for pk in ids if pk in products]
+
+
+# Same triggers as migration 0004. SQLite drops triggers when a migration
+# rebuilds shop_product (e.g. AddField), so they are re-created after every migrate.
+TRIGGERS_SQL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON shop_product BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, brand, description)
+        VALUES (new.id, new.name, new.brand, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON shop_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, brand, description)
+        VALUES ('delete', old.id, old.name, old.brand, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, brand, description ON shop_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, brand, description)
+        VALUES ('delete', old.id, old.name, old.brand, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, brand, description)
+        VALUES (new.id, new.name, new.brand, new.description);
+    END
+    """,
+]
+
+
+def ensure_triggers(using=None):
+    conn = connections[using] if using else connection
+    if conn.vendor != "sqlite" or FTS_TABLE not in conn.introspection.table_names():
+        return
+    with conn.cursor() as cursor:
+        for sql in TRIGGERS_SQL:
+            cursor.execute(sql)
+
+
+def rebuild_index():
+    if not fts_available():
+        return False
+    ensure_triggers()
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    return True
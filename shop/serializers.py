@@ -1,5 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from . import inventory
 from .models import Category, Product, Cart, CartItem, Order, OrderItem
 
 User = get_user_model()
@@ -19,11 +21,33 @@ class CategorySerializer(serializers.ModelSerializer):
 
 class ProductSerializer(serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
+    srcset = serializers.SerializerMethodField()
     category_id = serializers.PrimaryKeyRelatedField(write_only=True, source="category", queryset=Category.objects.all(), required=False, allow_null=True)
 
     class Meta:
         model = Product
-        fields = ("id", "name", "brand", "description", "price", "stock", "image", "rating", "is_active", "category", "category_id")
+        fields = ("id", "name", "brand", "description", "price", "stock", "image", "rating", "is_active", "category", "category_id", "srcset")
+
+    def get_srcset(self, obj):
+        """{"320w": url, ...} of the resized copies, empty until they have been built."""
+        if not obj.image or (obj.image_variants or {}).get("src") != obj.image.name:
+            return {}
+        request = self.context.get("request")
+        srcset = {}
+        for width, name in sorted(obj.image_variants["widths"].items(), key=lambda item: int(item[0])):
+            url = default_storage.url(name)
+            srcset[f"{width}w"] = request.build_absolute_uri(url) if request else url
+        return srcset
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Views preload the levels (inventory.display_stock) so a page costs one query, not one per product.
+        totals = self.context.get("stock_totals") or {}
+        if instance.pk in totals:
+            data["stock"] = totals[instance.pk]
+        elif instance.stock_shards:
+            data["stock"] = inventory.cached_total(instance.pk)
+        return data
 
 
 class CartItemSerializer(serializers.ModelSerializer):
@@ -48,14 +72,42 @@ class CartSerializer(serializers.ModelSerializer):
         return obj.total_price()
 
 
+class CartBatchOperationSerializer(serializers.Serializer):
+    OPS = ("set", "add", "remove")
+
+    op = serializers.ChoiceField(choices=OPS)
+    product_id = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=0, required=False, default=1)
+
+
+class CartBatchSerializer(serializers.Serializer):
+    operations = CartBatchOperationSerializer(many=True, allow_empty=False)
+
+
 class OrderItemSerializer(serializers.ModelSerializer):
-    product = ProductSerializer(read_only=True)
+    product = serializers.SerializerMethodField()
 
     class Meta:
         model = OrderItem
         fields = ("id", "product", "quantity", "unit_price", "total_price")
         read_only_fields = ("total_price",)
 
+    def get_product(self, obj):
+        """The product as it was when ordered, from the snapshot columns."""
+        image = None
+        if obj.product_image:
+            image = default_storage.url(obj.product_image)
+            request = self.context.get("request")
+            if request:
+                image = request.build_absolute_uri(image)
+        return {
+            "id": obj.product_id,
+            "name": obj.product_name,
+            "brand": obj.product_brand,
+            "image": image,
+            "category": obj.category_name,
+        }
+
 
 class OrderSerializer(serializers.ModelSerializer):
     order_items = OrderItemSerializer(many=True, read_only=True)
@@ -65,3 +117,18 @@ class OrderSerializer(serializers.ModelSerializer):
         model = Order
         fields = ("id", "user", "ordered_at", "shipping_address", "order_status", "payment_method", "payment_status", "total_amount", "order_items", "stripe_payment_intent")
         read_only_fields = ("id", "user", "ordered_at", "order_status", "payment_status", "total_amount", "order_items", "stripe_payment_intent")
+
+
+class OrderSummarySerializer(serializers.ModelSerializer):
+    thumbnail = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Order
+        fields = ("id", "ordered_at", "order_status", "payment_status", "total_amount", "item_count", "thumbnail")
+
+    def get_thumbnail(self, obj):
+        if not obj.thumbnail:
+            return None
+        url = default_storage.url(obj.thumbnail)
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request else url
@@ -0,0 +1,42 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from import_export.signals import post_import
+
+from . import authentication, cache, images, search
+from .models import Category, Product
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_catalog(sender, **kwargs):
+    cache.bump_version()
+
+
+@receiver(post_save, sender=Product)
+def request_image_derivatives(sender, instance, **kwargs):
+    images.request_derivatives(instance)
+
+
+@receiver(post_import)
+def invalidate_catalog_after_import(model, **kwargs):
+    # Bulk imports skip per-row save signals.
+    if model in (Product, Category):
+        cache.bump_version()
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_cached_user(sender, instance, **kwargs):
+    # Covers password changes, deactivation and profile edits.
+    authentication.forget_user(instance)
+
+
+@receiver(post_delete, sender=get_user_model())
+def revoke_deleted_user(sender, instance, **kwargs):
+    authentication.forget_user(instance, deleted=True)
+
+
+def restore_search_triggers(sender, using, **kwargs):
+    search.ensure_triggers(using)
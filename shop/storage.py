@@ -0,0 +1,90 @@
+"""
+Content-addressed media storage.
+
+``HashedMediaStorage`` stores ``products/phone.jpg`` as
+``products/phone.<sha256[:12]>.jpg``. A name therefore always refers to
+the same bytes, so it can be cached forever (see shop/media.py), and
+saving content that is already stored just returns the existing name
+instead of writing a duplicate. A legacy file can happen to look like
+``name.<12 hex>.ext`` too, so ``verified_hash`` checks the bytes before
+anything relies on the embedded hash.
+"""
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+HASH_LENGTH = 12
+HASHED_NAME_RE = re.compile(rf"\.(?P<hash>[0-9a-f]{{{HASH_LENGTH}}})(?=\.[^./]+$|$)")
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    if hasattr(content, "seek"):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, "seek"):
+        content.seek(0)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def name_hash(name):
+    """The content hash embedded in a stored name, or None for legacy names."""
+    match = HASHED_NAME_RE.search(os.path.basename(name))
+    return match.group("hash") if match else None
+
+
+def verified_hash(path, name):
+    """``name_hash(name)`` if the file at ``path`` really has that content hash, else None."""
+    digest = name_hash(name)
+    if not digest:
+        return None
+    with open(path, "rb") as fh:
+        return digest if content_hash(File(fh)) == digest else None
+
+
+def hashed_name(name, digest):
+    directory, filename = posixpath.split(name)
+    stem, ext = posixpath.splitext(HASHED_NAME_RE.sub("", filename))
+    return posixpath.join(directory, f"{stem}.{digest}{ext}")
+
+
+class HashedMediaStorage(FileSystemStorage):
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = hashed_name(self.generate_filename(name), content_hash(content))
+        if self.exists(name):
+            return name  # Same bytes already stored.
+        return super().save(name, content, max_length=max_length)
+
+    def get_available_name(self, name, max_length=None):
+        # A hashed name taken by a concurrent writer holds the same bytes.
+        return name
+
+    def _save(self, name, content):
+        # Write to a temp file and rename, so readers never see a partial
+        # file and concurrent writers of the same content both succeed.
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, mode=self.directory_permissions_mode or 0o777, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                for chunk in content.chunks():
+                    fh.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp_path, self.file_permissions_mode)
+            os.replace(tmp_path, full_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return name
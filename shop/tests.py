@@ -1,3 +1,1116 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from . import cache as catalog_cache
+from .admin import ProductResource
+from . import authentication, images, importing, inventory, jobs, reservations, resizing
+from .checkout import PROCESS_ORDER_JOB, OutOfStock, place_order
+from .hashing import hashing_pool
+from .models import Cart, CartItem, Category, Job, Order, OrderItem, Product, StockHold, StockShard
+
+User = get_user_model()
+
+
+def make_catalog(n, categories=3):
+    cats = [Category.objects.create(name=f"Cat {i}") for i in range(categories)]
+    return [
+        Product.objects.create(
+            name=f"Phone {i}",
+            brand=f"Brand {i % 4}",
+            category=cats[i % categories],
+            price=Decimal("100.00") + i,
+            stock=10,
+        )
+        for i in range(n)
+    ]
+
+
+class ProductListPaginationTests(APITestCase):
+    def setUp(self):
+        self.products = make_catalog(25)
+        self.url = reverse("product-list")
+
+    def test_unpaginated_list_is_unchanged(self):
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.data), 25)
+
+    def test_cursor_walks_every_product_once(self):
+        seen = []
+        res = self.client.get(self.url, {"page_size": 10})
+        while True:
+            seen += [p["id"] for p in res.data["results"]]
+            if not res.data["cursor"]:
+                break
+            res = self.client.get(self.url, {"page_size": 10, "cursor": res.data["cursor"]})
+        expected = [p.id for p in sorted(self.products, key=lambda p: (p.created_at, p.id), reverse=True)]
+        self.assertEqual(seen, expected)
+
+    def test_page_query_count_is_constant(self):
+        # Catalog fingerprint for the ETag, the page itself and three facet aggregates.
+        with self.assertNumQueries(5):
+            self.client.get(self.url, {"page_size": 20})
+
+    def test_invalid_cursor(self):
+        res = self.client.get(self.url, {"cursor": "garbage"})
+        self.assertEqual(res.status_code, 404)
+
+
+class CatalogCacheTests(APITestCase):
+    def setUp(self):
+        self.products = make_catalog(3)
+        catalog_cache.reset_stats()
+
+    def test_repeat_reads_skip_the_database(self):
+        url = reverse("product-detail", args=[self.products[0].pk])
+        self.client.get(url)
+        misses = catalog_cache.stats()["misses"]
+        with self.assertNumQueries(0):
+            res = self.client.get(url)
+        self.assertEqual(res.data["name"], "Phone 0")
+        self.assertEqual(catalog_cache.stats()["misses"], misses)
+
+    def test_save_and_delete_invalidate(self):
+        url = reverse("product-list")
+        self.assertEqual(len(self.client.get(url).data), 3)
+        self.products[0].name = "Renamed"
+        self.products[0].save()
+        self.assertIn("Renamed", [p["name"] for p in self.client.get(url).data])
+        self.products[1].delete()
+        self.assertEqual(len(self.client.get(url).data), 2)
+
+    def test_category_save_invalidates(self):
+        url = reverse("category-list")
+        self.client.get(url)
+        Category.objects.create(name="New")
+        self.assertEqual(len(self.client.get(url).data), 4)
+
+    def test_version_bumped_by_another_process_invalidates(self):
+        url = reverse("product-detail", args=[self.products[0].pk])
+        self.client.get(url)
+        # A job worker or management command: same shared location, its own cache instance.
+        Product.objects.filter(pk=self.products[0].pk).update(name="Renamed elsewhere")
+        config = settings.CACHES[catalog_cache.VERSION_CACHE_ALIAS]
+        FileBasedCache(config["LOCATION"], {}).incr(catalog_cache.VERSION_KEY)
+        self.assertEqual(self.client.get(url).data["name"], "Renamed elsewhere")
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.products = make_catalog(2)
+
+    def test_product_detail_not_modified(self):
+        url = reverse("product-detail", args=[self.products[0].pk])
+        res = self.client.get(url)
+        self.assertIn("Last-Modified", res)
+        etag = res["ETag"]
+        self.assertFalse(etag.startswith("W/"))
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.content, b"")
+
+        self.products[0].price = Decimal("1.00")
+        self.products[0].save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_etag_tracks_catalog(self):
+        for name in ("product-list", "category-list"):
+            url = reverse(name)
+            etag = self.client.get(url)["ETag"]
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        url = reverse("product-list")
+        etag = self.client.get(url)["ETag"]
+        self.products[1].delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_category_rename_changes_product_validators(self):
+        urls = [reverse("product-list"), reverse("product-detail", args=[self.products[0].pk])]
+        etags = [self.client.get(url)["ETag"] for url in urls]
+        category = self.products[0].category
+        category.name = "Renamed"
+        category.save()
+        for url, etag in zip(urls, etags):
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(res.status_code, 200)
+            self.assertIn("Renamed", res.content.decode())
+
+    def test_missing_product_is_404(self):
+        self.assertEqual(self.client.get(reverse("product-detail", args=[999])).status_code, 404)
+
+
+class ProductSearchTests(APITestCase):
+    def setUp(self):
+        cat = Category.objects.create(name="Mobile")
+        Product.objects.create(name="Apple iPhone 13", brand="Apple", category=cat, description="Blue phone")
+        Product.objects.create(name="Samsung Galaxy S23", brand="Samsung", category=cat, description="Android phone by Apple rival")
+        Product.objects.create(name="Apple Watch", brand="Apple", category=cat, is_active=False)
+        self.url = reverse("product-search")
+
+    def names(self, **params):
+        return [p["name"] for p in self.client.get(self.url, params).data["results"]]
+
+    def test_prefix_and_rank(self):
+        self.assertEqual(self.names(q="iph"), ["Apple iPhone 13"])
+        # Name/brand hits outrank a description-only hit; inactive products are excluded.
+        self.assertEqual(self.names(q="apple"), ["Apple iPhone 13", "Samsung Galaxy S23"])
+
+    def test_index_follows_updates_and_deletes(self):
+        product = Product.objects.get(name="Apple iPhone 13")
+        product.name = "Apple iPhone 15"
+        product.save()
+        self.assertEqual(self.names(q="15"), ["Apple iPhone 15"])
+        product.delete()
+        self.assertEqual(self.names(q="iphone"), [])
+
+    def test_bulk_create_is_indexed(self):
+        Product.objects.bulk_create([Product(name=f"Pixel {i}", brand="Google") for i in range(3)])
+        self.assertEqual(len(self.names(q="pixel")), 3)
+
+    def test_pagination_and_syntax_safety(self):
+        res = self.client.get(self.url, {"q": "phone", "page_size": 1})
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertIsNotNone(res.data["next"])
+        self.assertEqual(self.names(q='"AND OR (*'), [])
+
+    def test_page_beyond_the_limit_is_rejected(self):
+        self.assertEqual(self.client.get(self.url, {"q": "phone", "page": "99999999999999999999"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"q": "phone", "page": 100}).data["results"], [])
+
+
+class ProductFacetTests(APITestCase):
+    def setUp(self):
+        make_catalog(12)
+        Product.objects.filter(name="Phone 0").update(stock=0, price=Decimal("60000"))
+        self.url = reverse("product-list")
+
+    def test_filters(self):
+        res = self.client.get(self.url, {"brand": ["Brand 1", "Brand 2"], "min_price": "105"})
+        self.assertEqual(sorted(p["name"] for p in res.data), ["Phone 10", "Phone 5", "Phone 6", "Phone 9"])
+        res = self.client.get(self.url, {"in_stock": "1", "min_price": "50000"})
+        self.assertEqual(res.data, [])
+
+    def test_facets_are_disjunctive_and_fixed_cost(self):
+        with self.assertNumQueries(5):
+            res = self.client.get(self.url, {"page_size": 5, "brand": "Brand 1"})
+        facets = res.data["facets"]
+        self.assertEqual(len(res.data["results"]), 3)
+        # The brand facet ignores the brand filter; the others respect it.
+        self.assertEqual({f["value"]: f["count"] for f in facets["brand"]}, {f"Brand {i}": 3 for i in range(4)})
+        self.assertEqual(sum(f["count"] for f in facets["category"]), 3)
+        self.assertEqual({f["value"]: f["count"] for f in facets["price"]}["0-10000"], 3)
+
+
+class CartQueryBudgetTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("shopper", password="pw")
+        self.client.force_authenticate(self.user)
+        self.products = make_catalog(10)
+        self.cart = Cart.objects.create(user=self.user)
+
+    def fill(self, n):
+        CartItem.objects.bulk_create(
+            [CartItem(cart=self.cart, product=p, quantity=i + 1) for i, p in enumerate(self.products[:n])]
+        )
+
+    def test_total_is_computed_in_the_database(self):
+        self.fill(3)
+        expected = sum(p.price * (i + 1) for i, p in enumerate(self.products[:3]))
+        res = self.client.get(reverse("cart-detail"))
+        self.assertEqual(Decimal(res.data["total_price"]), expected)
+        self.assertEqual(self.cart.total_price(), expected)
+
+    def test_cart_detail_query_count_is_constant(self):
+        self.fill(1)
+        with self.assertNumQueries(2):
+            self.client.get(reverse("cart-detail"))
+        CartItem.objects.all().delete()
+        self.fill(10)
+        with self.assertNumQueries(2):
+            res = self.client.get(reverse("cart-detail"))
+        self.assertEqual(len(res.data["items"]), 10)
+
+    def test_add_to_cart_query_count_is_constant(self):
+        url = reverse("cart-add", args=[self.products[0].pk])
+        self.fill(1)
+        with self.assertNumQueries(13):
+            self.client.post(url, {"quantity": 2})
+        CartItem.objects.bulk_create([CartItem(cart=self.cart, product=p) for p in self.products[1:]])
+        with self.assertNumQueries(13):
+            res = self.client.post(url, {"quantity": 1})
+        self.assertEqual(res.data["items"][0]["quantity"], 4)
+
+
+class CheckoutTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("buyer", password="pw")
+        self.client.force_authenticate(self.user)
+        self.a, self.b = make_catalog(2)
+        self.cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=self.cart, product=self.a, quantity=3)
+        CartItem.objects.create(cart=self.cart, product=self.b, quantity=2)
+
+    def test_checkout_decrements_stock_and_clears_cart(self):
+        res = self.client.post(reverse("order-create"), {"shipping_address": "1 Main St"})
+        self.assertEqual(res.status_code, 202)
+        order = Order.objects.get(pk=res.data["id"])
+        self.assertEqual(order.order_items.count(), 2)
+        self.assertEqual(order.total_amount, self.a.price * 3 + self.b.price * 2)
+        self.a.refresh_from_db()
+        self.b.refresh_from_db()
+        self.assertEqual((self.a.stock, self.b.stock), (7, 8))
+        self.assertFalse(self.cart.items.exists())
+
+    def test_insufficient_stock_rolls_back_everything(self):
+        Product.objects.filter(pk=self.b.pk).update(stock=1)
+        res = self.client.post(reverse("order-create"), {"shipping_address": "1 Main St"})
+        self.assertEqual(res.status_code, 409)
+        self.assertEqual(res.data["products"], [self.b.pk])
+        self.a.refresh_from_db()
+        self.assertEqual(self.a.stock, 10)
+        self.assertEqual(self.cart.items.count(), 2)
+        self.assertFalse(Order.objects.exists())
+
+    def test_empty_cart(self):
+        self.cart.items.all().delete()
+        res = self.client.post(reverse("order-create"), {"shipping_address": "1 Main St"})
+        self.assertEqual(res.status_code, 400)
+
+    def test_checkout_keeps_the_catalog_cache_and_refreshes_stock(self):
+        detail = reverse("product-detail", args=[self.a.pk])
+        etag = self.client.get(detail)["ETag"]
+        self.client.get(reverse("category-list"))
+        version = catalog_cache.get_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("order-create"), {"shipping_address": "1 Main St"})
+        self.assertEqual(catalog_cache.get_version(), version)
+        with self.assertNumQueries(0):
+            self.client.get(reverse("category-list"))
+        # The cached payload is reused; only this product's stock level is read again.
+        with self.assertNumQueries(1):
+            res = self.client.get(detail)
+        self.assertEqual((res["ETag"], res.data["stock"]), (etag, 7))
+
+
+class CheckoutConcurrencyTests(TransactionTestCase):
+    """Many buyers race for the last units of one product."""
+
+    buyers = 24
+    stock = 5
+
+    def test_no_overselling_under_contention(self):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest("needs a file-backed test database shared between threads")
+        product = make_catalog(1, categories=1)[0]
+        Product.objects.filter(pk=product.pk).update(stock=self.stock)
+        users = []
+        for i in range(self.buyers):
+            user = User.objects.create(username=f"racer{i}")
+            CartItem.objects.create(cart=Cart.objects.create(user=user), product=product, quantity=1)
+            users.append(user)
+
+        results = []
+        barrier = threading.Barrier(self.buyers)
+
+        def buy(user):
+            barrier.wait()
+            try:
+                place_order(user, "addr")
+                results.append("ok")
+            except OutOfStock:
+                results.append("out")
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=buy, args=(u,)) for u in users]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        product.refresh_from_db()
+        self.assertEqual(results.count("ok"), self.stock)
+        self.assertEqual(results.count("out"), self.buyers - self.stock)
+        self.assertEqual(product.stock, 0)
+        self.assertEqual(OrderItem.objects.filter(product=product).count(), self.stock)
+
+
+class OrderJobTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("queued", password="pw")
+        self.client.force_authenticate(self.user)
+        product = make_catalog(1, categories=1)[0]
+        CartItem.objects.create(cart=Cart.objects.create(user=self.user), product=product, quantity=1)
+
+    def test_checkout_enqueues_and_worker_processes(self):
+        res = self.client.post(reverse("order-create"), {"shipping_address": "addr"})
+        self.assertEqual(res.data["order_status"], "Pending")
+        job = Job.objects.get()
+        self.assertEqual((job.kind, job.payload), (PROCESS_ORDER_JOB, {"order_id": res.data["id"]}))
+
+        self.assertEqual(jobs.run_pending("test"), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "done")
+        self.assertEqual(Order.objects.get(pk=res.data["id"]).order_status, "Processing")
+
+    def test_claim_is_exclusive_and_expired_leases_are_reclaimed(self):
+        jobs.enqueue("noop")
+        self.assertEqual(len(jobs.claim("a")), 1)
+        self.assertEqual(jobs.claim("b"), [])
+        Job.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual([j.locked_by for j in jobs.claim("b")], ["b"])
+
+    def test_failures_back_off_then_give_up(self):
+        calls = []
+
+        @jobs.handler("flaky")
+        def flaky(payload):
+            calls.append(payload)
+            raise RuntimeError("boom")
+        self.addCleanup(jobs.HANDLERS.pop, "flaky")
+
+        job = jobs.enqueue("flaky", max_attempts=2)
+        jobs.run_pending("test")
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("queued", 1))
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn("boom", job.last_error)
+
+        Job.objects.update(run_after=timezone.now())
+        jobs.run_pending("test")
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, len(calls)), ("failed", 2, 2))
+
+
+class CartBatchTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("bundler", password="pw")
+        self.client.force_authenticate(self.user)
+        self.products = make_catalog(20)
+        Cart.objects.create(user=self.user)
+        self.url = reverse("cart-batch")
+
+    def post(self, operations):
+        return self.client.post(self.url, {"operations": operations}, format="json")
+
+    def test_operations_apply_in_order(self):
+        a, b, c = (p.pk for p in self.products[:3])
+        self.post([{"op": "add", "product_id": a, "quantity": 2}, {"op": "set", "product_id": b, "quantity": 5}])
+        res = self.post([
+            {"op": "add", "product_id": a, "quantity": 1},
+            {"op": "remove", "product_id": b},
+            {"op": "set", "product_id": c, "quantity": 1},
+            {"op": "add", "product_id": c, "quantity": 1},
+        ])
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual({i["product"]["id"]: i["quantity"] for i in res.data["items"]}, {a: 3, c: 2})
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        ops = [{"op": "add", "product_id": p.pk, "quantity": 1} for p in self.products[:2]]
+        with self.assertNumQueries(13):
+            self.post(ops)
+        ops = [{"op": "add", "product_id": p.pk, "quantity": 1} for p in self.products]
+        with self.assertNumQueries(13):
+            res = self.post(ops)
+        self.assertEqual(len(res.data["items"]), 20)
+
+    def test_unknown_product_rejects_whole_batch(self):
+        res = self.post([{"op": "add", "product_id": self.products[0].pk}, {"op": "add", "product_id": 999}])
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(res.data["products"], [999])
+        self.assertFalse(CartItem.objects.exists())
+        self.assertEqual(self.post([{"op": "bogus", "product_id": 1}]).status_code, 400)
+
+    def test_deactivated_product_can_still_be_removed(self):
+        product = self.products[0]
+        self.assertEqual(self.post([{"op": "add", "product_id": product.pk, "quantity": 2}]).status_code, 200)
+        Product.objects.filter(pk=product.pk).update(is_active=False)
+
+        res = self.post([{"op": "add", "product_id": product.pk}])
+        self.assertEqual(res.status_code, 400)
+        res = self.post([{"op": "remove", "product_id": product.pk}])
+        self.assertEqual(res.status_code, 200)
+        self.assertFalse(CartItem.objects.filter(product=product).exists())
+        self.assertFalse(StockHold.objects.filter(product=product).exists())
+
+
+class StockHoldTests(APITestCase):
+    def setUp(self):
+        self.product = make_catalog(1, categories=1)[0]  # stock=10
+        self.alice = User.objects.create_user("alice", password="pw")
+        self.bob = User.objects.create_user("bob", password="pw")
+        self.url = reverse("cart-add", args=[self.product.pk])
+
+    def add(self, user, quantity):
+        self.client.force_authenticate(user)
+        return self.client.post(self.url, {"quantity": quantity})
+
+    def test_holds_reduce_availability_for_other_carts(self):
+        self.assertEqual(self.add(self.alice, 8).status_code, 201)
+        self.assertEqual(reservations.available_stock([self.product.pk]), {self.product.pk: 2})
+        self.assertEqual(self.add(self.bob, 3).status_code, 409)
+        self.assertEqual(self.add(self.bob, 2).status_code, 201)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 10)
+
+    def test_expired_holds_stop_counting_and_are_swept(self):
+        self.add(self.alice, 8)
+        StockHold.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.add(self.bob, 10).status_code, 201)
+        self.assertEqual(reservations.release_expired(batch_size=1), 1)
+        self.assertEqual(list(StockHold.objects.values_list("cart__user__username", flat=True)), ["bob"])
+
+    def test_checkout_converts_own_holds_and_respects_others(self):
+        self.add(self.alice, 4)
+        self.add(self.bob, 6)
+        order = place_order(self.alice, "addr")
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 6)
+        self.assertEqual(order.order_items.get().quantity, 4)
+        self.assertFalse(StockHold.objects.filter(cart__user=self.alice).exists())
+
+        # Bob's hold is intact, so nothing else may be bought over it.
+        carol = User.objects.create_user("carol", password="pw")
+        CartItem.objects.create(cart=Cart.objects.create(user=carol), product=self.product, quantity=1)
+        with self.assertRaises(OutOfStock):
+            place_order(carol, "addr")
+        place_order(self.bob, "addr")
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 0)
+
+    def test_remove_releases_hold(self):
+        self.add(self.alice, 10)
+        item = CartItem.objects.get()
+        self.client.delete(reverse("cart-remove", args=[item.pk]))
+        self.assertFalse(StockHold.objects.exists())
+
+
+class ShardedStockTests(APITestCase):
+    def setUp(self):
+        self.product = make_catalog(1, categories=1)[0]
+        Product.objects.filter(pk=self.product.pk).update(stock=10)
+        inventory.set_sharding(self.product, 4)
+        self.user = User.objects.create_user("flash", password="pw")
+
+    def buy(self, quantity):
+        CartItem.objects.create(cart=Cart.objects.get_or_create(user=self.user)[0], product=self.product, quantity=quantity)
+        return place_order(self.user, "addr")
+
+    def test_enable_splits_stock(self):
+        self.assertEqual(sorted(StockShard.objects.values_list("stock", flat=True)), [2, 2, 3, 3])
+        self.assertEqual(inventory.stock_levels([self.product.pk]), {self.product.pk: 10})
+
+    def test_checkout_drains_across_shards_and_rebalances(self):
+        self.buy(9)
+        self.assertEqual(inventory.stock_levels([self.product.pk]), {self.product.pk: 1})
+        self.assertTrue(Job.objects.filter(kind=inventory.REBALANCE_JOB).exists())
+        with self.assertRaises(OutOfStock):
+            self.buy(2)
+        self.assertEqual(inventory.stock_levels([self.product.pk]), {self.product.pk: 1})
+
+        jobs.run_pending("test")
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 1)
+        self.assertEqual(sorted(StockShard.objects.values_list("stock", flat=True)), [0, 0, 0, 1])
+
+    def test_checkouts_leave_the_product_row_to_a_delayed_sync(self):
+        stamp = Product.objects.get(pk=self.product.pk).updated_at
+        for _ in range(3):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.buy(1)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).updated_at, stamp)
+        # One delayed sync for the burst (a shard running dry may also queue an immediate rebalance).
+        delayed = Job.objects.filter(kind=inventory.REBALANCE_JOB, run_after__gt=timezone.now())
+        self.assertEqual(delayed.count(), 1)
+
+        delayed.update(run_after=timezone.now())
+        jobs.run_pending("test")
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.updated_at), (7, stamp))
+
+    def test_in_stock_filter_reads_the_shards(self):
+        self.buy(10)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).stock, 10)  # Not synced yet.
+        res = self.client.get(reverse("product-list"), {"in_stock": "1"})
+        self.assertEqual(res.data, [])
+        inventory.set_sharding(self.product, 0)
+        Product.objects.filter(pk=self.product.pk).update(stock=5)
+        catalog_cache.bump_version()
+        res = self.client.get(reverse("product-list"), {"in_stock": "1"})
+        self.assertEqual([p["id"] for p in res.data], [self.product.pk])
+
+    def test_serializer_reports_shard_total(self):
+        self.buy(3)
+        res = self.client.get(reverse("product-detail", args=[self.product.pk]))
+        self.assertEqual(res.data["stock"], 7)
+
+    def test_sharded_totals_are_loaded_in_one_query(self):
+        products = [self.product] + [
+            Product.objects.create(name=f"Flash {i}", category=self.product.category, price=Decimal("9.00"), stock=10)
+            for i in range(10)
+        ]
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.bulk_create([CartItem(cart=cart, product=p) for p in products])
+        self.client.force_authenticate(self.user)
+        for sharded in (5, 10):
+            for product in products[1:sharded + 1]:
+                inventory.set_sharding(product, 2)
+            caches["default"].clear()
+            catalog_cache.bump_version()
+            # Fingerprint, page, shard totals and three facet aggregates.
+            with self.assertNumQueries(6):
+                res = self.client.get(reverse("product-list"), {"page_size": 10})
+            self.assertEqual({p["stock"] for p in res.data["results"]}, {10})
+            caches["default"].clear()
+            # Cart with its items, then the shard totals.
+            with self.assertNumQueries(3):
+                self.client.get(reverse("cart-detail"))
+
+    def test_disable_folds_back(self):
+        self.buy(1)
+        inventory.set_sharding(self.product, 0)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.stock_shards), (9, 0))
+        self.assertFalse(StockShard.objects.exists())
+
+
+class OrderHistoryTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("history", password="pw")
+        self.client.force_authenticate(self.user)
+        self.products = make_catalog(5)
+        self.products[0].image = "products/mobile_1.jpg"
+        self.products[0].save()
+
+    def checkout(self, lines):
+        cart, _ = Cart.objects.get_or_create(user=self.user)
+        for product, qty in lines:
+            CartItem.objects.create(cart=cart, product=product, quantity=qty)
+        return place_order(self.user, "addr")
+
+    def test_summary_is_denormalized_at_checkout(self):
+        order = self.checkout([(self.products[0], 2), (self.products[1], 1)])
+        self.assertEqual((order.item_count, order.thumbnail), (3, "products/mobile_1.jpg"))
+        res = self.client.get(reverse("order-list"))
+        summary = res.data["results"][0]
+        self.assertEqual(summary["item_count"], 3)
+        self.assertTrue(summary["thumbnail"].endswith("/media/products/mobile_1.jpg"))
+
+    def test_pages_newest_first_with_constant_cost(self):
+        small = self.checkout([(self.products[1], 1)])
+        big = [self.checkout([(p, 1) for p in self.products]) for _ in range(2)]
+        other = User.objects.create_user("someone-else", password="pw")
+        Order.objects.create(user=other, shipping_address="x")
+
+        with self.assertNumQueries(1):
+            res = self.client.get(reverse("order-list"), {"page_size": 2})
+        self.assertEqual([o["id"] for o in res.data["results"]], [big[1].pk, big[0].pk])
+        with self.assertNumQueries(1):
+            res = self.client.get(reverse("order-list"), {"page_size": 2, "cursor": res.data["cursor"]})
+        self.assertEqual([o["id"] for o in res.data["results"]], [small.pk])
+        self.assertIsNone(res.data["next"])
+
+
+class OrderSnapshotTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("snap", password="pw")
+        self.client.force_authenticate(self.user)
+        self.products = make_catalog(4)
+        cart = Cart.objects.create(user=self.user)
+        for product in self.products:
+            CartItem.objects.create(cart=cart, product=product, quantity=1)
+        self.order = place_order(self.user, "addr")
+
+    def test_order_detail_renders_snapshot_without_catalog_joins(self):
+        Product.objects.filter(pk=self.products[0].pk).update(name="Renamed later")
+        url = reverse("order-detail", args=[self.order.pk])
+        # Order + user, then order items; no product/category queries.
+        with self.assertNumQueries(2) as ctx:
+            res = self.client.get(url)
+        self.assertFalse(any("shop_product" in q["sql"] for q in ctx.captured_queries))
+        first = res.data["order_items"][0]["product"]
+        self.assertEqual((first["name"], first["category"]), ("Phone 0", "Cat 0"))
+
+    def test_items_saved_outside_checkout_snapshot_themselves(self):
+        item = OrderItem.objects.create(order=self.order, product=self.products[1], quantity=1, unit_price=1)
+        self.assertEqual((item.product_name, item.category_name), ("Phone 1", "Cat 1"))
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("jwt", email="jwt@example.com", password="secret-pass-1")
+        res = self.client.post(reverse("login"), {"username": "jwt", "password": "secret-pass-1"})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.json()['access']}")
+
+    def test_profile_and_user_resolution_skip_the_database_when_warm(self):
+        self.client.get(reverse("cart-detail"))
+        with self.assertNumQueries(0):
+            res = self.client.get(reverse("profile"))
+        self.assertEqual(res.data, {"id": self.user.pk, "username": "jwt", "email": "jwt@example.com"})
+
+    def test_password_change_revokes_cached_sessions(self):
+        self.assertEqual(self.client.get(reverse("profile")).status_code, 200)
+        self.user.set_password("another-pass-2")
+        self.user.save()
+        self.assertEqual(self.client.get(reverse("profile")).status_code, 401)
+
+    def test_deactivation_revokes_cached_sessions(self):
+        self.client.get(reverse("profile"))
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.user.refresh_from_db()
+        self.user.save()
+        self.assertEqual(self.client.get(reverse("profile")).status_code, 401)
+
+    def test_change_saved_by_another_process_revokes_cached_sessions(self):
+        self.assertEqual(self.client.get(reverse("profile")).status_code, 200)
+        # An admin or another worker: the row changes there, and that process publishes the
+        # new version to the shared location from its own cache instance.
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.user.refresh_from_db()
+        config = settings.CACHES[authentication.VERSION_CACHE_ALIAS]
+        FileBasedCache(config["LOCATION"], {}).set(f"jwt-user:{self.user.pk}", authentication.token_version(self.user))
+        self.assertEqual(self.client.get(reverse("profile")).status_code, 401)
+
+    def test_token_obtain_view_issues_versioned_tokens(self):
+        res = self.client.post(reverse("token_obtain_pair"), {"username": "jwt", "password": "secret-pass-1"})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+        self.assertEqual(self.client.get(reverse("profile")).data["username"], "jwt")
+
+
+class AsyncAuthViewTests(APITestCase):
+    def test_signup_then_login(self):
+        res = self.client.post(reverse("signup"), {"username": "newbie", "password": "pw-123456"}, format="json")
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(res.json()["user"]["username"], "newbie")
+        self.assertTrue(User.objects.get(username="newbie").check_password("pw-123456"))
+
+        res = self.client.post(reverse("login"), {"username": "newbie", "password": "pw-123456"}, format="json")
+        self.assertEqual(res.status_code, 200)
+        self.assertIn("access", res.json())
+        self.assertEqual(self.client.post(reverse("login"), {"username": "newbie", "password": "nope"}).status_code, 401)
+        self.assertEqual(self.client.post(reverse("signup"), {"username": "newbie", "password": "x"}).status_code, 400)
+
+    def test_login_upgrades_outdated_hashes(self):
+        hasher = PBKDF2PasswordHasher()
+        user = User.objects.create(username="veteran", password=hasher.encode("pw-123456", hasher.salt(), iterations=1000))
+        res = self.client.post(reverse("login"), {"username": "veteran", "password": "pw-123456"}, format="json")
+        self.assertEqual(res.status_code, 200)
+        user.refresh_from_db()
+        self.assertEqual(hasher.decode(user.password)["iterations"], hasher.iterations)
+        self.assertTrue(user.check_password("pw-123456"))
+
+    def test_saturated_pool_sheds_load(self):
+        User.objects.create_user("busy", password="pw")
+        pool = hashing_pool
+        in_flight = pool.in_flight
+        pool.in_flight = pool.workers + pool.max_queue
+        try:
+            res = self.client.post(reverse("login"), {"username": "busy", "password": "pw"})
+        finally:
+            pool.in_flight = in_flight
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res["Retry-After"], "1")
+        self.assertGreaterEqual(pool.stats()["rejected"], 1)
+
+
+class AsyncCatalogViewTests(APITestCase):
+    def setUp(self):
+        self.products = make_catalog(12)
+        inventory.set_sharding(self.products[0], 3)
+
+    def assertSameAsSync(self, name, *args, params=None):
+        sync = self.client.get(reverse(name, args=args), params).json()
+        catalog_cache.bump_version()
+        res = self.client.get(reverse(f"async-{name}", args=args), params)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json(), sync)
+        return res
+
+    def test_matches_the_sync_views(self):
+        self.assertSameAsSync("product-list")
+        self.assertSameAsSync("product-list", params={"page_size": 5, "brand": "Brand 1"})
+        self.assertSameAsSync("product-detail", self.products[0].pk)
+        self.assertSameAsSync("category-list")
+
+    def test_cursor_and_conditional_get(self):
+        url = reverse("async-product-list")
+        first = self.client.get(url, {"page_size": 5}).json()
+        second = self.client.get(url, {"page_size": 5, "cursor": first["cursor"]}).json()
+        self.assertEqual(len(first["results"]) + len(second["results"]), 10)
+
+        res = self.client.get(reverse("async-category-list"))
+        self.assertEqual(self.client.get(reverse("async-category-list"), HTTP_IF_NONE_MATCH=res["ETag"]).status_code, 304)
+        self.assertEqual(self.client.get(reverse("async-product-detail", args=[999])).status_code, 404)
+
+    def test_errors_and_head_match_the_sync_views(self):
+        for name in ("product-list", "async-product-list"):
+            res = self.client.get(reverse(name), {"cursor": "garbage"})
+            self.assertEqual(res.status_code, 404, name)
+            self.assertIn("detail", res.json())
+        for name in ("product-list", "product-detail", "category-list"):
+            args = [self.products[0].pk] if name == "product-detail" else []
+            self.assertEqual(self.client.head(reverse(f"async-{name}", args=args)).status_code, 200, name)
+
+    def test_cart_requires_a_token(self):
+        self.assertEqual(self.client.get(reverse("async-cart-detail")).status_code, 401)
+        user = User.objects.create_user("async-cart", password="pw")
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.create(cart=cart, product=self.products[0], quantity=2)
+        self.client.force_authenticate(user)
+        sync = self.client.get(reverse("cart-detail")).json()
+        self.client.force_authenticate(None)
+
+        res = self.client.post(reverse("login"), {"username": "async-cart", "password": "pw"})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.json()['access']}")
+        self.assertEqual(self.client.get(reverse("async-cart-detail")).json(), sync)
+
+
+class ImageDerivativeTests(APITestCase):
+    def setUp(self):
+        from PIL import Image
+
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        os.makedirs(os.path.join(self.media, "products"))
+        Image.new("RGB", (800, 600), "red").save(os.path.join(self.media, "products", "phone.jpg"))
+        settings = override_settings(MEDIA_ROOT=self.media, PRODUCT_IMAGE_WORKERS=0, PRODUCT_IMAGE_FORMAT="JPEG")
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_saving_an_image_queues_derivatives(self):
+        product = Product.objects.create(name="Phone", price=1, image="products/phone.jpg")
+        self.assertEqual(Job.objects.filter(kind=images.DERIVATIVES_JOB).count(), 1)
+        res = self.client.get(reverse("product-detail", args=[product.pk]))
+        self.assertEqual(res.data["srcset"], {})
+
+        jobs.run_pending()
+        product.refresh_from_db()
+        self.assertEqual(sorted(product.image_variants["widths"], key=int), ["160", "320", "640"])
+        name = product.image_variants["widths"]["320"]
+        self.assertTrue(name.startswith("derivatives/products/phone-320w."))
+        self.assertTrue(os.path.exists(os.path.join(self.media, name)))
+        res = self.client.get(reverse("product-detail", args=[product.pk]))
+        self.assertEqual(list(res.data["srcset"]), ["160w", "320w", "640w"])
+        self.assertTrue(res.data["srcset"]["320w"].endswith(f"/media/{name}"))
+
+        # Saving again with the same image does not queue more work.
+        product.save()
+        self.assertEqual(Job.objects.filter(kind=images.DERIVATIVES_JOB).count(), 1)
+
+    def test_replaced_derivatives_are_deleted(self):
+        from PIL import Image
+
+        product = Product.objects.create(name="Phone", price=1, image="products/phone.jpg")
+        jobs.run_pending()
+        product.refresh_from_db()
+        old = set(product.image_variants["widths"].values())
+
+        with override_settings(PRODUCT_IMAGE_WIDTHS=(200, 320)), self.captureOnCommitCallbacks(execute=True):
+            for _, variants in resizing.build(["products/phone.jpg"], workers=0):
+                images.record(variants)
+        product.refresh_from_db()
+        new = set(product.image_variants["widths"].values())
+        self.assertEqual(len(old & new), 1)  # 320w is unchanged and kept.
+        for name in old - new:
+            self.assertFalse(os.path.exists(os.path.join(self.media, name)))
+        for name in new:
+            self.assertTrue(os.path.exists(os.path.join(self.media, name)))
+
+        # A new image drops the old set once no other product uses it.
+        Image.new("RGB", (400, 300), "blue").save(os.path.join(self.media, "products", "tablet.jpg"))
+        twin = Product.objects.create(name="Twin", price=1, image="products/phone.jpg", image_variants=product.image_variants)
+        for item in (product, twin):
+            item.image = "products/tablet.jpg"
+            item.save()
+            with self.captureOnCommitCallbacks(execute=True):
+                jobs.run_pending()
+            kept = all(os.path.exists(os.path.join(self.media, name)) for name in new)
+            self.assertEqual(kept, item is product)
+
+    def test_backfill_command(self):
+        Product.objects.bulk_create([Product(name="Phone", price=1, image="products/phone.jpg")])
+        call_command("build_image_derivatives", workers=0, stdout=StringIO())
+        self.assertTrue(images.is_current(Product.objects.get()))
+
+
+class HashedMediaTests(APITestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        settings = override_settings(MEDIA_ROOT=self.media)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.name = default_storage.save("products/phone.jpg", ContentFile(b"0123456789" * 10))
+
+    def test_names_carry_the_content_hash_and_dedupe(self):
+        self.assertRegex(self.name, r"^products/phone\.[0-9a-f]{12}\.jpg$")
+        self.assertEqual(default_storage.save("products/other.jpg", ContentFile(b"0123456789" * 10)),
+                         self.name.replace("phone", "other"))
+        self.assertEqual(default_storage.save("products/phone.jpg", ContentFile(b"0123456789" * 10)), self.name)
+        self.assertNotEqual(default_storage.save("products/phone.jpg", ContentFile(b"changed")), self.name)
+        self.assertEqual(len(os.listdir(os.path.join(self.media, "products"))), 3)
+
+    def test_hashed_media_is_immutable_and_revalidates(self):
+        res = self.client.get(f"/media/{self.name}")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b"".join(res.streaming_content), b"0123456789" * 10)
+        self.assertIn("immutable", res["Cache-Control"])
+        self.assertIn("Expires", res)
+        self.assertEqual(self.client.get(f"/media/{self.name}", HTTP_IF_NONE_MATCH=res["ETag"]).status_code, 304)
+
+    def test_names_that_only_look_hashed_are_revalidated(self):
+        fake = "products/build.0123456789ab.jpg"
+        with open(os.path.join(self.media, fake), "wb") as fh:
+            fh.write(b"legacy bytes")
+        res = self.client.get(f"/media/{fake}")
+        self.assertEqual(res["Cache-Control"], "public, no-cache")
+        self.assertNotEqual(res["ETag"], '"0123456789ab"')
+
+        # A hashed name whose bytes were replaced is no longer trusted either.
+        with open(os.path.join(self.media, self.name), "wb") as fh:
+            fh.write(b"tampered")
+        os.utime(os.path.join(self.media, self.name), ns=(0, 10**9))
+        self.assertEqual(self.client.get(f"/media/{self.name}")["Cache-Control"], "public, no-cache")
+
+    def test_byte_ranges(self):
+        url = f"/media/{self.name}"
+        res = self.client.get(url, HTTP_RANGE="bytes=10-14")
+        self.assertEqual((res.status_code, res["Content-Range"]), (206, "bytes 10-14/100"))
+        self.assertEqual(b"".join(res.streaming_content), b"01234")
+        res = self.client.get(url, HTTP_RANGE="bytes=-3")
+        self.assertEqual(b"".join(res.streaming_content), b"789")
+        self.assertEqual(self.client.get(url, HTTP_RANGE="bytes=500-").status_code, 416)
+        # A stale If-Range falls back to the full file.
+        self.assertEqual(self.client.get(url, HTTP_RANGE="bytes=0-1", HTTP_IF_RANGE='"stale"').status_code, 200)
+        self.assertEqual(self.client.get("/media/../settings.py").status_code, 404)
+
+
+class StreamingImportTests(APITestCase):
+    def setUp(self):
+        self.phones = Category.objects.create(name="Phones")
+        Product.objects.create(name="Old phone", brand="Acme", category=self.phones, price=5, stock=1, description="keep")
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        os.makedirs(os.path.join(self.media, "products"))
+        open(os.path.join(self.media, "products", "a.jpg"), "wb").close()
+        settings = override_settings(MEDIA_ROOT=self.media)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def run_import(self, text, chunk_size=2):
+        return importing.import_products(StringIO(text), chunk_size=chunk_size)
+
+    def test_upserts_on_name_in_chunks(self):
+        feed = (
+            "id,name,brand,category__name,price,stock,image,rating,is_active\n"
+            "99,Old phone,Acme,Phones,7.50,3,media/products/a.jpg,4.5,1\n"
+            ",New phone,Acme,Phones,10,2,missing.jpg,,true\n"
+            ",Bad phone,Acme,Tablets,10,2,,,1\n"
+            ",Cheap phone,,,1,x,,,1\n"
+            ",Third phone,Brand,,3,0,a.jpg,,0\n"
+        )
+        # Per chunk: unseen categories, existing names, and inside a savepoint the
+        # upsert (one INSERT for matched rows, one for new ones) plus queued jobs.
+        with self.assertNumQueries(13):
+            result = self.run_import(feed)
+        self.assertEqual((result.created, result.updated, result.skipped), (2, 1, 2))
+        self.assertEqual([line for line, _ in result.errors], [4, 5])
+
+        old = Product.objects.get(name="Old phone")
+        self.assertEqual((old.price, old.stock, old.image.name, old.description), (Decimal("7.50"), 3, "products/a.jpg", "keep"))
+        self.assertFalse(Product.objects.get(name="New phone").image)
+        third = Product.objects.get(name="Third phone")
+        self.assertEqual((third.category, third.is_active, third.brand), (None, False, "Brand"))
+        self.assertEqual(Job.objects.filter(kind=images.DERIVATIVES_JOB).count(), 2)
+
+    def test_reimport_updates_without_duplicates(self):
+        feed = "name,price\nOld phone,9\nOld phone,11\n"
+        result = self.run_import(feed)
+        self.assertEqual((result.created, result.updated, result.skipped), (0, 1, 1))
+        self.assertEqual(Product.objects.get(name="Old phone").price, Decimal("11"))
+        self.assertEqual(Product.objects.count(), 1)
+
+    def test_ingests_scraped_dicts_a_batch_at_a_time(self):
+        def scraped():
+            for i, image in enumerate(["products/a.jpg", "products/gone.jpg", ""]):
+                yield {
+                    "asin": f"B00{i}", "name": f"Scraped phone {i}", "price": f"{100 + i}", "rating": "4.1",
+                    "image": image, "image_url": "https://example.com/x.jpg", "brand": "Unknown",
+                    "category__name": "Mobile", "description": "", "stock": 5, "is_active": True,
+                }
+            yield {"name": "Old phone", "price": 8.5, "stock": 40}
+
+        version = catalog_cache.get_version()
+        result = importing.ingest_products(scraped(), chunk_size=2)
+        self.assertEqual((result.created, result.updated, result.skipped), (3, 1, 0))
+        self.assertEqual(catalog_cache.get_version(), version + 2)  # one bump per committed batch
+
+        mobile = Category.objects.get(name="Mobile")
+        phones = Product.objects.filter(category=mobile).order_by("name")
+        self.assertEqual([(p.price, p.image.name or "") for p in phones], [
+            (Decimal("100.00"), "products/a.jpg"), (Decimal("101.00"), ""), (Decimal("102.00"), ""),
+        ])
+        old = Product.objects.get(name="Old phone")
+        # The feed's stock only seeds new products; live stock isn't overwritten.
+        self.assertEqual((old.price, old.category, old.stock), (Decimal("8.5"), self.phones, 1))
+        self.assertEqual(set(phones.values_list("stock", flat=True)), {5})
+
+    def test_ingest_command_reads_json_lines(self):
+        path = os.path.join(self.media, "scraped.jsonl")
+        with open(path, "w") as fh:
+            fh.write('{"name": "Piped phone", "price": "12", "category__name": "Tablets"}\n\n')
+            fh.write('{"name": "Other phone", "price": "oops"}\n')
+        out, err = StringIO(), StringIO()
+        call_command("ingest_scraped", path, "--no-create-categories", stdout=out, stderr=err)
+        self.assertIn("0 created, 0 updated, 2 skipped", out.getvalue())
+        self.assertIn("product 1: category__name: unknown category 'Tablets'", err.getvalue())
+
+    def test_batches_are_cut_by_time_for_slow_producers(self):
+        def slow():
+            yield 1
+            yield 2
+            time.sleep(0.3)
+            yield 3
+            raise RuntimeError("scraper crashed")
+
+        batches = importing._batches(slow(), 10, max_wait=0.05)
+        self.assertEqual(next(batches), [1, 2])
+        self.assertEqual(next(batches), [3])
+        with self.assertRaisesMessage(RuntimeError, "scraper crashed"):
+            next(batches)
+
+
+class StreamingExportTests(APITestCase):
+    def setUp(self):
+        self.products = make_catalog(5)
+        user = User.objects.create_user("buyer", password="pw")
+        order = Order.objects.create(user=user, shipping_address="1 Road", total_amount=Decimal("201.00"), item_count=2)
+        for product in self.products[:2]:
+            OrderItem.objects.create(order=order, product=product, quantity=1, unit_price=product.price)
+        self.client.force_authenticate(User.objects.create_user("staff", password="pw", is_staff=True))
+
+    def body(self, res):
+        return b"".join(res.streaming_content)
+
+    def test_product_csv_round_trips_through_the_importer(self):
+        res = self.client.get(reverse("export-products", args=["csv"]))
+        self.assertEqual(res["Content-Type"], "text/csv")
+        text = self.body(res).decode()
+        self.assertEqual(text.splitlines()[0].split(","), ProductResource().get_export_headers())
+        Product.objects.update(price=1)
+        result = importing.import_products(StringIO(text))
+        self.assertEqual((result.created, result.updated, result.skipped), (0, 5, 0))
+        self.assertEqual(Product.objects.get(pk=self.products[3].pk).price, Decimal("103.00"))
+
+    def test_gzip_and_jsonl_orders(self):
+        res = self.client.get(reverse("export-orders", args=["jsonl"]), {"gzip": 1})
+        self.assertEqual(res["Content-Disposition"], 'attachment; filename="orders.jsonl.gz"')
+        lines = gzip.decompress(self.body(res)).decode().splitlines()
+        order = json.loads(lines[0])
+        self.assertEqual((order["user"], order["total_amount"]), ("buyer", "201.00"))
+        self.assertEqual([item["product_name"] for item in order["items"]], ["Phone 0", "Phone 1"])
+
+        rows = self.body(self.client.get(reverse("export-orders", args=["csv"]))).decode().splitlines()
+        self.assertEqual(len(rows), 3)
+
+    def test_staff_only_and_commands(self):
+        self.client.force_authenticate(User.objects.get(username="buyer"))
+        self.assertEqual(self.client.get(reverse("export-products", args=["csv"])).status_code, 403)
+
+        path = os.path.join(tempfile.mkdtemp(), "catalog.jsonl.gz")
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        call_command("export_catalog", format="jsonl", gzip=True, output=path, stderr=StringIO())
+        with gzip.open(path, "rt") as fh:
+            self.assertEqual(len(fh.readlines()), 5)
+
+
+class AdminChangelistTests(APITestCase):
+    changelists = ("category", "product", "cart", "cartitem", "order", "orderitem", "job")
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "pw"))
+        self.category = Category.objects.create(name="Phones")
+        self.seed(3)
+
+    def seed(self, n):
+        start = Product.objects.count()
+        for i in range(start, start + n):
+            user = User.objects.create_user(f"shopper{i}", password="pw")
+            products = [
+                Product.objects.create(name=f"Admin phone {i}-{j}", category=self.category, price=Decimal("10.00") + j, stock=5)
+                for j in range(2)
+            ]
+            cart = Cart.objects.create(user=user)
+            order = Order.objects.create(user=user, shipping_address="1 Road", total_amount=Decimal("21.00"), item_count=2)
+            for product in products:
+                CartItem.objects.create(cart=cart, product=product, quantity=2)
+                OrderItem.objects.create(order=order, product=product, quantity=1, unit_price=product.price)
+            jobs.enqueue("admin.test", {"i": i})
+
+    def changelist_queries(self, name, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(reverse(f"admin:shop_{name}_changelist"), params)
+        self.assertEqual(res.status_code, 200, name)
+        return [query["sql"] for query in ctx.captured_queries]
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        before = {name: len(self.changelist_queries(name)) for name in self.changelists}
+        self.seed(5)
+        after = {name: len(self.changelist_queries(name)) for name in self.changelists}
+        self.assertEqual(after, before)
+        # Session + user, the size estimate (two cheap queries, then an exact count since
+        # these tables are small) and the rows, plus filter choices and list_editable.
+        self.assertEqual(before, {
+            "category": 5, "product": 8, "cart": 6, "cartitem": 6, "order": 6, "orderitem": 6, "job": 7,
+        })
+
+    def test_cart_totals_are_annotated(self):
+        res = self.client.get(reverse("admin:shop_cart_changelist"), {"o": "4"})
+        self.assertEqual([cart.total_price() for cart in res.context["cl"].result_list], [Decimal("42.00")] * 3)
+
+    def test_large_unfiltered_changelists_use_an_estimated_count(self):
+        with mock.patch("shop.counting.EXACT_COUNT_LIMIT", 1):
+            queries = self.changelist_queries("product")
+            self.assertFalse([sql for sql in queries if "COUNT(" in sql.upper()])
+            self.assertEqual(self.client.get(reverse("admin:shop_cartitem_changelist")).context["cl"].result_count, 6)
+            # Filtered lists are still counted exactly.
+            filtered = self.changelist_queries("order", order_status__exact="Pending")
+            self.assertTrue([sql for sql in filtered if "COUNT(" in sql.upper()])
+
+    def test_product_search_filters_with_an_fts_subquery(self):
+        queries = self.changelist_queries("product", q="admin phone")
+        rows = [sql for sql in queries if "shop_product_fts" in sql]
+        # The match is a subquery of the count and the page, not a capped list of ids fetched first.
+        self.assertEqual(len(rows), 2)
+        self.assertTrue(all("shop_product" in sql.split("shop_product_fts")[0] for sql in rows))
+        res = self.client.get(reverse("admin:shop_product_changelist"), {"q": "phone 2"})
+        self.assertEqual(sorted(p.name for p in res.context["cl"].result_list), ["Admin phone 2-0", "Admin phone 2-1"])
+
+    def test_inlines_do_not_list_every_product(self):
+        res = self.client.get(reverse("admin:shop_cart_change", args=[Cart.objects.first().pk]))
+        self.assertEqual(res.status_code, 200)
+        self.assertNotContains(res, "Admin phone 2-1")  # another cart's product
+        self.assertContains(res, "admin-autocomplete")
@@ -1,26 +1,39 @@
 from django.urls import path
-from . import views
-from .views import SignupAPIView, LoginAPIView, ProfileAPIView
+from . import async_views, views
+from .views import ProfileAPIView
 from rest_framework_simplejwt.views import TokenRefreshView
 
 urlpatterns = [
     # Products & Categories
     path("products/", views.product_list, name="product-list"),
+    path("products/search/", views.product_search, name="product-search"),
     path("products/<int:pk>/", views.product_detail, name="product-detail"),
     path("categories/", views.category_list, name="category-list"),
 
     # Cart
     path("cart/", views.cart_detail, name="cart-detail"),
+    path("cart/batch/", views.cart_batch, name="cart-batch"),
     path("cart/add/<int:product_id>/", views.add_to_cart, name="cart-add"),
     path("cart/remove/<int:item_id>/", views.remove_from_cart, name="cart-remove"),
 
     # Orders
+    path("orders/", views.order_list, name="order-list"),
     path("orders/create/", views.create_order, name="order-create"),
     path("orders/<int:order_id>/", views.order_detail, name="order-detail"),
 
+    # Exports
+    path("exports/products.<str:fmt>", views.export_data, {"kind": "products"}, name="export-products"),
+    path("exports/orders.<str:fmt>", views.export_data, {"kind": "orders"}, name="export-orders"),
+
+    # Async (ASGI) read path
+    path("async/products/", async_views.product_list, name="async-product-list"),
+    path("async/products/<int:pk>/", async_views.product_detail, name="async-product-detail"),
+    path("async/categories/", async_views.category_list, name="async-category-list"),
+    path("async/cart/", async_views.cart_detail, name="async-cart-detail"),
+
     # Auth
-    path("auth/signup/", SignupAPIView.as_view(), name="signup"),
-    path("auth/login/", LoginAPIView.as_view(), name="login"),
+    path("auth/signup/", async_views.signup, name="signup"),
+    path("auth/login/", async_views.login, name="login"),
     path("auth/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("auth/profile/", ProfileAPIView.as_view(), name="profile"),
 ]
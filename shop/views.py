@@ -1,54 +1,146 @@
 # views.py
-from decimal import Decimal
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.views.decorators.http import condition
 from rest_framework.views import APIView
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from django.contrib.auth import get_user_model
-from rest_framework_simplejwt.tokens import RefreshToken
-
+from rest_framework.utils.urls import replace_query_param
+
+from . import cache as catalog_cache
+from . import conditional, exporting
+from . import inventory, reservations
+from .authentication import profile_from_token
+from .checkout import place_order
+from .exceptions import EmptyCart, OutOfStock
 from .models import Category, Product, Cart, CartItem, Order, OrderItem
+from .filters import apply_filters, build_filters, facet_counts
+from .pagination import KeysetPagination, OrderKeysetPagination
+from .search import search_products
 from .serializers import (
     CategorySerializer, ProductSerializer, CartSerializer, 
-    CartItemSerializer, OrderSerializer, UserSerializer
+    CartItemSerializer, OrderSerializer, UserSerializer, CartBatchSerializer,
+    OrderSummarySerializer
 )
 
-User = get_user_model()
+# Deepest search page served; past this the OFFSET gets expensive (and can overflow).
+MAX_SEARCH_PAGE = 100
 
 
 # ---------- Public Product / Category ----------
 
+def _product_context(request, products):
+    """Serializer context with the products' stock levels, the sharded ones loaded in one query."""
+    return {"request": request, "stock_totals": inventory.display_stock(products)}
+
+
+@condition(etag_func=conditional.product_list_etag, last_modified_func=conditional.product_list_last_modified)
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def product_list(request):
-    qs = Product.objects.filter(is_active=True)
-    serializer = ProductSerializer(qs, many=True, context={"request": request})
-    return Response(serializer.data)
-
-
+    def build():
+        base = Product.objects.filter(is_active=True)
+        groups = build_filters(request.query_params)
+        qs = apply_filters(base, groups).select_related("category")
+        paginator = KeysetPagination()
+        if paginator.is_requested(request):
+            page = paginator.paginate_queryset(qs, request)
+            serializer = ProductSerializer(page, many=True, context=_product_context(request, page))
+            data = paginator.get_paginated_response(serializer.data).data
+            data["facets"] = facet_counts(base, groups)
+            return data
+        products = list(qs)
+        return ProductSerializer(products, many=True, context=_product_context(request, products)).data
+
+    key = catalog_cache.make_key("product_list", request.build_absolute_uri())
+    data = catalog_cache.get_or_build(key, build)
+    # Stock isn't part of the cached catalog (checkouts don't invalidate it); it's read fresh.
+    inventory.refresh_stock(data["results"] if isinstance(data, dict) else data)
+    return Response(data)
+
+
+@condition(etag_func=conditional.product_detail_etag, last_modified_func=conditional.product_detail_last_modified)
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def product_detail(request, pk):
-    product = get_object_or_404(Product, pk=pk, is_active=True)
-    return Response(ProductSerializer(product, context={"request": request}).data)
+    def build():
+        product = get_object_or_404(Product.objects.select_related("category"), pk=pk, is_active=True)
+        return ProductSerializer(product, context=_product_context(request, [product])).data
+
+    key = catalog_cache.make_key("product_detail", pk, request.build_absolute_uri("/"))
+    data = catalog_cache.get_or_build(key, build)
+    inventory.refresh_stock([data])
+    return Response(data)
 
 
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def product_search(request):
+    query = request.query_params.get("q", "").strip()
+    page_size = KeysetPagination().get_page_size(request)
+    try:
+        page = max(1, int(request.query_params.get("page", 1)))
+    except ValueError:
+        page = 1
+    if page > MAX_SEARCH_PAGE:
+        return Response({"detail": f"page must be at most {MAX_SEARCH_PAGE}"}, status=status.HTTP_400_BAD_REQUEST)
+
+    def build():
+        products = search_products(query, limit=page_size + 1, offset=(page - 1) * page_size)
+        has_next = len(products) > page_size
+        url = request.build_absolute_uri()
+        return {
+            "next": replace_query_param(url, "page", page + 1) if has_next else None,
+            "results": ProductSerializer(products[:page_size], many=True, context=_product_context(request, products[:page_size])).data,
+        }
+
+    if not query:
+        return Response({"next": None, "results": []})
+    key = catalog_cache.make_key("product_search", request.build_absolute_uri())
+    data = catalog_cache.get_or_build(key, build)
+    inventory.refresh_stock(data["results"])
+    return Response(data)
+
+
+@condition(etag_func=conditional.category_list_etag, last_modified_func=conditional.category_list_last_modified)
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def category_list(request):
-    qs = Category.objects.all()
-    return Response(CategorySerializer(qs, many=True).data)
+    def build():
+        return CategorySerializer(Category.objects.all(), many=True).data
+
+    key = catalog_cache.make_key("category_list")
+    return Response(catalog_cache.get_or_build(key, build))
 
 
 # ---------- Cart ----------
 
+def _out_of_stock(exc):
+    return Response({"detail": str(exc), "products": [p.pk for p in exc.products]}, status=status.HTTP_409_CONFLICT)
+
+
+def get_user_cart(user):
+    """The user's cart with its total and items loaded in a constant number of queries."""
+    cart = Cart.objects.with_items().filter(user=user).order_by("id").first()
+    if cart is None:
+        Cart.objects.create(user=user)
+        cart = Cart.objects.with_items().filter(user=user).order_by("id").first()
+    return cart
+
+
+def _cart_data(cart):
+    products = [item.product for item in cart.items.all()]
+    return CartSerializer(cart, context=_product_context(None, products)).data
+
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def cart_detail(request):
-    cart, _ = Cart.objects.get_or_create(user=request.user)
-    return Response(CartSerializer(cart).data)
+    return Response(_cart_data(get_user_cart(request.user)))
 
 
 @api_view(["POST"])
@@ -57,113 +149,147 @@ def add_to_cart(request, product_id):
     product = get_object_or_404(Product, pk=product_id, is_active=True)
     cart, _ = Cart.objects.get_or_create(user=request.user)
     qty = int(request.data.get("quantity", 1))
-    item, created = CartItem.objects.get_or_create(cart=cart, product=product)
-    if not created:
-        item.quantity += qty
-    else:
-        item.quantity = qty
-    item.save()
-    return Response(CartSerializer(cart).data, status=status.HTTP_201_CREATED)
+    try:
+        with transaction.atomic():
+            item, created = CartItem.objects.get_or_create(cart=cart, product=product)
+            if not created:
+                item.quantity += qty
+            else:
+                item.quantity = qty
+            reservations.reserve(cart, {product.pk: item.quantity})
+            item.save()
+    except OutOfStock as exc:
+        return _out_of_stock(exc)
+    return Response(_cart_data(get_user_cart(request.user)), status=status.HTTP_201_CREATED)
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def cart_batch(request):
+    """
+    Apply a list of {"op": "set"|"add"|"remove", "product_id", "quantity"}
+    operations in order, in one transaction, and return the cart once.
+    """
+    serializer = CartBatchSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    operations = serializer.validated_data["operations"]
+    product_ids = {op["product_id"] for op in operations}
+    # Only ops that put a product in the cart need it to be live; removing a
+    # product that was deactivated after it was added must still work.
+    wanted = {op["product_id"] for op in operations if op["op"] != "remove"}
+
+    cart, _ = Cart.objects.get_or_create(user=request.user)
+    active = set(Product.objects.filter(pk__in=wanted, is_active=True).values_list("pk", flat=True))
+    missing = sorted(wanted - active)
+    if missing:
+        return Response({"detail": "Unknown or inactive products", "products": missing}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        with transaction.atomic():
+            _apply_cart_operations(cart, operations, product_ids)
+    except OutOfStock as exc:
+        return _out_of_stock(exc)
+    return Response(_cart_data(get_user_cart(request.user)))
+
+
+def _apply_cart_operations(cart, operations, product_ids):
+    """Fold the operations into final quantities, then hold stock and upsert/delete items in bulk."""
+    quantities = dict(
+        CartItem.objects.filter(cart=cart, product_id__in=product_ids).values_list("product_id", "quantity")
+    )
+    for op in operations:
+        pid = op["product_id"]
+        if op["op"] == "remove":
+            quantities[pid] = 0
+        elif op["op"] == "add":
+            quantities[pid] = quantities.get(pid, 0) + op["quantity"]
+        else:
+            quantities[pid] = op["quantity"]
+
+    reservations.reserve(cart, quantities)
+    keep = [CartItem(cart=cart, product_id=pid, quantity=qty) for pid, qty in quantities.items() if qty > 0]
+    drop = [pid for pid, qty in quantities.items() if qty <= 0]
+    if keep:
+        CartItem.objects.bulk_create(
+            keep, update_conflicts=True, unique_fields=["cart", "product"], update_fields=["quantity"]
+        )
+    if drop:
+        CartItem.objects.filter(cart=cart, product_id__in=drop).delete()
 
 
 @api_view(["DELETE"])
 @permission_classes([IsAuthenticated])
 def remove_from_cart(request, item_id):
     item = get_object_or_404(CartItem, pk=item_id, cart__user=request.user)
-    item.delete()
+    with transaction.atomic():
+        reservations.reserve(item.cart, {item.product_id: 0})
+        item.delete()
     return Response({"detail": "removed"}, status=status.HTTP_200_OK)
 
 
 # ---------- Orders ----------
 
+def _order_queryset():
+    # Order items carry a product snapshot, so no catalog joins are needed.
+    return Order.objects.select_related("user").prefetch_related(
+        Prefetch("order_items", queryset=OrderItem.objects.order_by("id"))
+    )
+
+
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def create_order(request):
     shipping_address = request.data.get("shipping_address", "")
     payment_method = request.data.get("payment_method", "COD")
-    cart = get_object_or_404(Cart, user=request.user)
-    if not cart.items.exists():
+    try:
+        order = place_order(request.user, shipping_address, payment_method)
+    except EmptyCart:
         return Response({"detail": "Cart empty"}, status=status.HTTP_400_BAD_REQUEST)
-
-    total = cart.total_price()
-    order = Order.objects.create(
-        user=request.user,
-        shipping_address=shipping_address,
-        payment_method=payment_method,
-        total_amount=Decimal(total),
-        payment_status="Pending",
+    except OutOfStock as exc:
+        return _out_of_stock(exc)
+    # Downstream processing happens in run_order_workers; the client polls order_detail.
+    return Response(
+        {"id": order.pk, "order_status": order.order_status, "total_amount": order.total_amount},
+        status=status.HTTP_202_ACCEPTED,
     )
-    for ci in cart.items.all():
-        OrderItem.objects.create(
-            order=order,
-            product=ci.product,
-            quantity=ci.quantity,
-            unit_price=ci.product.price,
-        )
-    cart.items.all().delete()
-    return Response(OrderSerializer(order).data, status=status.HTTP_201_CREATED)
 
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
-def order_detail(request, order_id):
-    order = get_object_or_404(Order, pk=order_id, user=request.user)
-    return Response(OrderSerializer(order).data)
-
-
-# ---------- Auth: Signup, Login, Profile ----------
+def order_list(request):
+    """The user's orders, newest first, as compact keyset-paginated summaries."""
+    paginator = OrderKeysetPagination()
+    page = paginator.paginate_queryset(Order.objects.filter(user=request.user), request)
+    serializer = OrderSummarySerializer(page, many=True, context={"request": request})
+    return paginator.get_paginated_response(serializer.data)
 
-class SignupAPIView(APIView):
-    permission_classes = [AllowAny]
 
-    def post(self, request):
-        username = request.data.get("username")
-        email = request.data.get("email", "")
-        password = request.data.get("password")
-
-        if not username or not password:
-            return Response({"detail": "Username & password required"}, status=status.HTTP_400_BAD_REQUEST)
-
-        if User.objects.filter(username=username).exists():
-            return Response({"detail": "Username already taken"}, status=status.HTTP_400_BAD_REQUEST)
-
-        user = User.objects.create_user(username=username, email=email, password=password)
-        refresh = RefreshToken.for_user(user)
-        return Response({
-            "user": UserSerializer(user).data,
-            "access": str(refresh.access_token),
-            "refresh": str(refresh)
-        }, status=status.HTTP_201_CREATED)
-
-
-class LoginAPIView(APIView):
-    permission_classes = [AllowAny]
-
-    def post(self, request):
-        username = request.data.get("username")
-        password = request.data.get("password")
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def order_detail(request, order_id):
+    order = get_object_or_404(_order_queryset(), pk=order_id, user=request.user)
+    return Response(OrderSerializer(order, context={"request": request}).data)
 
-        if not username or not password:
-            return Response({"detail": "Username & password required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            user = User.objects.get(username=username)
-        except User.DoesNotExist:
-            return Response({"detail": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
+# ---------- Exports (staff only) ----------
 
-        if not user.check_password(password):
-            return Response({"detail": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def export_data(request, kind, fmt):
+    """Stream every product or order as CSV/JSONL; ``?gzip=1`` compresses on the fly."""
+    if fmt not in exporting.FORMATS:
+        return Response({"detail": f"Format must be one of {', '.join(exporting.FORMATS)}"}, status=status.HTTP_404_NOT_FOUND)
+    gzip = request.query_params.get("gzip") in ("1", "true", "True")
+    response = StreamingHttpResponse(exporting.export(kind, fmt, gzip=gzip), content_type=exporting.content_type(fmt, gzip))
+    response["Content-Disposition"] = f'attachment; filename="{exporting.filename(kind, fmt, gzip)}"'
+    return response
 
-        refresh = RefreshToken.for_user(user)
-        return Response({
-            "user": UserSerializer(user).data,
-            "access": str(refresh.access_token),
-            "refresh": str(refresh)
-        })
 
+# ---------- Auth: Profile (signup/login live in async_views) ----------
 
 class ProfileAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        return Response(UserSerializer(request.user).data)
+        # Tokens carry the profile fields and are revoked when they change.
+        return Response(profile_from_token(request.auth) or UserSerializer(request.user).data)